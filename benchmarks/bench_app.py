@@ -0,0 +1,204 @@
+"""Drive main.app in-process against local stand-ins for Keycloak, the licence gateway, Redis and Vault and
+report throughput and p50/p95/p99 latency per scenario:
+
+    warm          cached tokens and licences, the steady state of an active user
+    cold          a new token and user on every request (introspection, licence fetch, Vault read)
+    licence_miss  cached tokens presenting a licence key the user does not own
+
+Run from the repository root:
+
+    python -m benchmarks.bench_app                   # compare with benchmarks/baselines.json
+    python -m benchmarks.bench_app --save-baseline   # store these results as the new baseline
+    python -m benchmarks.bench_app --check           # exit 1 when a scenario regressed
+
+Baselines are only comparable on the same machine; regenerate them after changing the stand-in latencies.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from unittest.mock import patch
+
+BENCHMARK_ENVIRONMENT = {
+    "API_NAME": "api-credential",
+    "API_TAG_NAME": "credentials",
+    "URL_API_GATEWAY": "http://gateway.local",
+    "KEYCLOAK_HOST": "http://keycloak.local",
+    "KEYCLOAK_REALM": "karned",
+    "KEYCLOAK_CLIENT_ID": "api-credential",
+    "KEYCLOAK_CLIENT_SECRET": "benchmark",
+    "REDIS_HOST": "redis.local",
+    "REDIS_PORT": "6379",
+    "REDIS_DB": "0",
+    "REDIS_PASSWORD": "",
+    "VAULT_HOST": "http://vault.local",
+    "VAULT_PORT": "8200",
+    "VAULT_TOKEN": "benchmark",
+    "VAULT_SECRET_PATH": "secret",
+    "LOG_LEVEL": "WARNING",
+    "REFRESH_AHEAD_ENABLED": "false",
+}
+for name, value in BENCHMARK_ENVIRONMENT.items():
+    os.environ.setdefault(name, value)
+
+import httpx
+
+import main
+from config.config import KEYCLOAK_HOST, KEYCLOAK_REALM, URL_API_GATEWAY, VAULT_SECRET_PATH
+from middlewares import licence_middleware, token_middleware
+from services import http_service
+from services.metrics_service import reset_metrics
+from services.vault_service import vault_client_manager
+from tests.fakes import Behaviour, FakeAsyncRedis, KeycloakStub, LicenceGatewayStub, VaultStub, build_http_client
+
+BASELINES_PATH = Path(__file__).with_name("baselines.json")
+SCENARIOS = ("warm", "cold", "licence_miss")
+
+
+def reset_caches( redis: FakeAsyncRedis ) -> None:
+    redis.values.clear()
+    for cache in (
+            token_middleware.token_l1_cache,
+            licence_middleware.licence_l1_cache,
+            licence_middleware.licence_negative_cache,
+            licence_middleware.licence_refreshed_users,
+    ):
+        cache.clear()
+    reset_metrics()
+
+
+def percentile( sorted_values: list, fraction: float ) -> float:
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def measure( client: httpx.AsyncClient, requests: list, concurrency: int ) -> dict:
+    latencies = []
+    statuses = {}
+    pending = iter(requests)
+
+    async def worker():
+        for url, headers in pending:
+            start = time.perf_counter_ns()
+            response = await client.get(url, headers=headers)
+            latencies.append(time.perf_counter_ns() - start)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50) / 1e6, 3),
+        "p95_ms": round(percentile(latencies, 0.95) / 1e6, 3),
+        "p99_ms": round(percentile(latencies, 0.99) / 1e6, 3),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+
+
+def build_requests( scenario: str, count: int, users: int ) -> list:
+    if scenario == "cold":
+        return [
+            ("/credential/v1/database", {"Authorization": f"Bearer cold-{i}", "X-License-Key": "licence-0"})
+            for i in range(count)
+        ]
+    licence = "licence-unknown" if scenario == "licence_miss" else "licence-0"
+    return [
+        ("/credential/v1/database", {"Authorization": f"Bearer warm-{i % users}", "X-License-Key": licence})
+        for i in range(count)
+    ]
+
+
+async def run_scenarios( args: argparse.Namespace ) -> dict:
+    redis = FakeAsyncRedis()
+    redis.store.behaviour = Behaviour(latency=args.redis_latency, error_rate=args.error_rate, seed=1)
+    keycloak = KeycloakStub(realm=KEYCLOAK_REALM, behaviour=Behaviour(args.http_latency, args.error_rate, seed=2))
+    gateway = LicenceGatewayStub(behaviour=Behaviour(args.http_latency, args.error_rate, seed=3))
+    vault = VaultStub(
+        mount=VAULT_SECRET_PATH, behaviour=Behaviour(args.vault_latency, args.error_rate, seed=4), generate_missing=True
+    )
+    identity = build_http_client({KEYCLOAK_HOST: keycloak.app, URL_API_GATEWAY: gateway.app})
+    results = {}
+    with patch.object(token_middleware, "r_async", redis), \
+         patch.object(licence_middleware, "r_async", redis), \
+         patch.object(http_service, "http_client", identity), \
+         patch.object(vault_client_manager, "get_client", return_value=vault.client()):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            for scenario in args.scenarios:
+                reset_caches(redis)
+                if scenario != "cold":
+                    # Warm every token and licence set once, outside the measurement.
+                    await measure(client, build_requests("warm", args.users, args.users), args.concurrency)
+                results[scenario] = await measure(
+                    client, build_requests(scenario, args.requests, args.users), args.concurrency
+                )
+    await identity.aclose()
+    return results
+
+
+def compare( results: dict, baselines: dict, tolerance: float ) -> list:
+    regressions = []
+    for scenario, result in results.items():
+        baseline = baselines.get(scenario)
+        if baseline is None:
+            continue
+        if result["rps"] < baseline["rps"] * (1 - tolerance):
+            regressions.append(f"{scenario}: {result['rps']} req/s vs baseline {baseline['rps']}")
+        for key in ("p95_ms", "p99_ms"):
+            if result[key] > baseline[key] * (1 + tolerance):
+                regressions.append(f"{scenario}: {key} {result[key]} vs baseline {baseline[key]}")
+    return regressions
+
+
+def report( results: dict ) -> None:
+    print(f"{'scenario':<14} {'requests':>8} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  statuses")
+    for scenario, result in results.items():
+        print(
+            f"{scenario:<14} {result['requests']:>8} {result['rps']:>9} {result['p50_ms']:>9} "
+            f"{result['p95_ms']:>9} {result['p99_ms']:>9}  {result['statuses']}"
+        )
+
+
+def parse_args( argv: list | None = None ) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--users", type=int, default=20, help="distinct cached tokens of the warm scenarios")
+    parser.add_argument("--http-latency", type=float, default=0.005, help="seconds per Keycloak/gateway call")
+    parser.add_argument("--redis-latency", type=float, default=0.0002, help="seconds per Redis command")
+    parser.add_argument("--vault-latency", type=float, default=0.003, help="seconds per Vault call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="failure probability of every stand-in call")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative regression")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 on regression")
+    return parser.parse_args(argv)
+
+
+def run( argv: list | None = None ) -> dict:
+    args = parse_args(argv)
+    results = asyncio.run(run_scenarios(args))
+    report(results)
+
+    baselines = json.loads(BASELINES_PATH.read_text()) if BASELINES_PATH.exists() else {}
+    if args.save_baseline:
+        BASELINES_PATH.write_text(json.dumps({**baselines, **results}, indent=2) + "\n")
+        print(f"Baseline saved to {BASELINES_PATH}")
+        return results
+
+    regressions = compare(results, baselines, args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if regressions and args.check:
+        sys.exit(1)
+    return results
+
+
+if __name__ == "__main__":
+    run()
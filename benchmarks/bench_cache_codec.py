@@ -0,0 +1,69 @@
+"""Compare the per-request decode cost of the legacy repr/eval cache format with the current codec.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cache_codec
+"""
+import ast
+import time
+import timeit
+
+from utils.cache_codec import encode_cache_value, decode_cache_value
+
+
+def build_cache_token( licence_count: int = 20 ) -> dict:
+    now = int(time.time())
+    return {
+        "active": True,
+        "sub": "0b5c4b6e-9d0a-4a51-9a57-2c1b3b7f1d11",
+        "preferred_username": "benchmark-user",
+        "email": "benchmark@karned.bzh",
+        "aud": ["karned", "account"],
+        "iat": now - 60,
+        "exp": now + 3600,
+        "cached_time": now,
+        "licenses": [
+            {
+                "uuid": f"licence-{i}",
+                "type_uuid": "type-1",
+                "name": f"Licence {i}",
+                "iat": now - 86400,
+                "exp": now + 86400,
+                "entity_uuid": f"entity-{i % 3}",
+                "api_roles": [{"api": "credential", "roles": ["read", "write"]}],
+                "app_roles": [],
+                "apps": ["app-1", "app-2"],
+            }
+            for i in range(licence_count)
+        ]
+    }
+
+
+def measure( label: str, func, number: int ) -> float:
+    seconds = min(timeit.repeat(func, number=number, repeat=3))
+    per_call_us = seconds / number * 1_000_000
+    print(f"{label:<28} {per_call_us:10.2f} us/call")
+    return per_call_us
+
+
+def run( number: int = 200 ) -> dict:
+    results = {}
+    for licence_count in (0, 20, 200):
+        cache_token = build_cache_token(licence_count)
+        legacy_payload = str(cache_token)
+        payload = encode_cache_value(cache_token)
+        assert decode_cache_value(payload) == eval(legacy_payload)
+
+        print(f"--- {licence_count} licences ({len(legacy_payload)} B legacy / {len(payload)} B codec)")
+        results[licence_count] = {
+            "eval": measure("legacy eval()", lambda: eval(legacy_payload), number),
+            "literal_eval": measure("legacy ast.literal_eval()", lambda: ast.literal_eval(legacy_payload), number),
+            "codec": measure("decode_cache_value()", lambda: decode_cache_value(payload), number),
+            "encode_legacy": measure("legacy str()", lambda: str(cache_token), number),
+            "encode_codec": measure("encode_cache_value()", lambda: encode_cache_value(cache_token), number),
+        }
+    return results
+
+
+if __name__ == "__main__":
+    run()
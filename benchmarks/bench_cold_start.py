@@ -0,0 +1,136 @@
+"""Measure the cold start of api-credential in a fresh interpreter:
+
+    import_ms          importing main
+    first_response_ms  the first protected GET /credential/v1/{service}, served by the Keycloak, licence
+                       gateway, Redis and Vault stand-ins without the lifespan, so nothing was warmed up and
+                       the request pays for every import and client the start-up deferred (hvac, requests)
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cold_start            # report, with the budgets
+    python -m benchmarks.bench_cold_start --check    # exit 1 when a budget is exceeded
+
+The budgets are wall-clock times and only meaningful on an unloaded machine, which is why they are checked
+here rather than by the unit tests.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+IMPORT_BUDGET_MS = 1500
+FIRST_RESPONSE_BUDGET_MS = 500
+DEFERRED_MODULES = ("hvac", "requests", "jwt", "routers.v0", "services.secret_cache")
+
+COLD_START_SCRIPT = """
+import asyncio, json, sys, time
+
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+import services.inmemory_service as inmemory_service
+deferred_modules = %r
+import_modules = sorted(name for name in deferred_modules if name in sys.modules)
+redis_clients = [inmemory_service.redis_client is not None, inmemory_service.redis_async_client is not None]
+
+from unittest.mock import patch
+import httpx
+from config.config import KEYCLOAK_HOST, KEYCLOAK_REALM, URL_API_GATEWAY, VAULT_SECRET_PATH
+from middlewares import licence_middleware, token_middleware
+from services import http_service, vault_service
+from tests.fakes import FakeAsyncRedis, KeycloakStub, LicenceGatewayStub, build_http_client
+
+
+def create_stand_in_session(pool_size):
+    # Called by the application when it creates its Vault client, after its own deferred hvac import.
+    from tests.fakes import VaultStub
+    return VaultStub(mount=VAULT_SECRET_PATH, generate_missing=True).session()
+
+
+async def first_response():
+    redis = FakeAsyncRedis()
+    http_client = build_http_client({
+        KEYCLOAK_HOST: KeycloakStub(realm=KEYCLOAK_REALM).app,
+        URL_API_GATEWAY: LicenceGatewayStub().app
+    })
+    with patch.object(token_middleware, "r_async", redis), \\
+         patch.object(licence_middleware, "r_async", redis), \\
+         patch.object(vault_service, "r", redis.store), \\
+         patch.object(vault_service, "create_vault_session", create_stand_in_session), \\
+         patch.object(vault_service.vault_client_manager, "url", "http://vault.stand-in:8200"), \\
+         patch.object(http_service, "http_client", http_client):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://cold-start") as client:
+            loaded = {name for name in deferred_modules if name in sys.modules}
+            start = time.perf_counter()
+            response = await client.get(
+                "/credential/v1/database",
+                headers={"Authorization": "Bearer cold-start", "X-License-Key": "licence-0"}
+            )
+            elapsed = time.perf_counter() - start
+            return response.status_code, elapsed, sorted(name for name in deferred_modules
+                                                        if name in sys.modules and name not in loaded)
+
+status, elapsed, first_request_modules = asyncio.run(first_response())
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "first_response_ms": elapsed * 1000,
+    "status": status,
+    "import_modules": import_modules,
+    "first_request_modules": first_request_modules,
+    "redis_clients": redis_clients,
+}))
+"""
+
+
+def measure_cold_start( environ: dict ) -> dict:
+    root = Path(__file__).resolve().parent.parent
+    result = subprocess.run(
+        [sys.executable, "-c", COLD_START_SCRIPT % (DEFERRED_MODULES,)],
+        cwd=root, env={**environ, "LOG_LEVEL": "WARNING"}, capture_output=True, text=True, timeout=60
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def check_budgets( cold_start: dict ) -> list:
+    exceeded = []
+    if cold_start["import_ms"] > IMPORT_BUDGET_MS:
+        exceeded.append(f"import {cold_start['import_ms']:.1f} ms over the {IMPORT_BUDGET_MS} ms budget")
+    if cold_start["first_response_ms"] > FIRST_RESPONSE_BUDGET_MS:
+        exceeded.append(
+            f"first response {cold_start['first_response_ms']:.1f} ms over the {FIRST_RESPONSE_BUDGET_MS} ms budget"
+        )
+    return exceeded
+
+
+def parse_args( argv: list | None = None ) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="exit with status 1 when a budget is exceeded")
+    return parser.parse_args(argv)
+
+
+def run( argv: list | None = None ) -> dict:
+    args = parse_args(argv)
+    # The stand-in environment of the application benchmark, unless the caller already set a variable.
+    from benchmarks.bench_app import BENCHMARK_ENVIRONMENT
+
+    cold_start = measure_cold_start({**BENCHMARK_ENVIRONMENT, **os.environ})
+    print(f"import            {cold_start['import_ms']:>9.1f} ms  (budget {IMPORT_BUDGET_MS} ms)")
+    print(f"first response    {cold_start['first_response_ms']:>9.1f} ms  (budget {FIRST_RESPONSE_BUDGET_MS} ms)"
+          f"  status {cold_start['status']}, loaded {', '.join(cold_start['first_request_modules']) or 'nothing'}")
+
+    exceeded = check_budgets(cold_start)
+    for message in exceeded:
+        print(f"OVER BUDGET {message}")
+    if exceeded and args.check:
+        sys.exit(1)
+    return cold_start
+
+
+if __name__ == "__main__":
+    run()
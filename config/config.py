@@ -1,24 +1,264 @@
 import os
+from typing import Any, Callable, Mapping
 
-API_NAME = os.environ['API_NAME']
-API_TAG_NAME = os.environ['API_TAG_NAME']
+# Every setting is declared once here as name -> (parser, default). Defaults are written as the environment
+# would spell them and go through the same parser; REQUIRED marks variables without a default. The
+# environment is parsed and validated once, when this module is first imported, and each setting is then
+# assigned to its module level name at the bottom of this file. Consumers copy them at their own import
+# (from config.config import REDIS_HOST), so a changed environment only takes effect after a restart.
+REQUIRED = None
 
-URL_API_GATEWAY = os.environ['URL_API_GATEWAY']
 
-KEYCLOAK_HOST = os.environ['KEYCLOAK_HOST']
-KEYCLOAK_REALM = os.environ['KEYCLOAK_REALM']
-KEYCLOAK_CLIENT_ID = os.environ['KEYCLOAK_CLIENT_ID']
-KEYCLOAK_CLIENT_SECRET = os.environ['KEYCLOAK_CLIENT_SECRET']
+LOG_LEVEL_NAMES = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
 
-REDIS_HOST = os.environ['REDIS_HOST']
-REDIS_PORT = int(os.environ['REDIS_PORT'])
-REDIS_DB = int(os.environ['REDIS_DB'])
-REDIS_PASSWORD = os.environ['REDIS_PASSWORD']
 
-VAULT_HOST = os.environ['VAULT_HOST']
-VAULT_PORT = int(os.environ['VAULT_PORT'])
-VAULT_TOKEN = os.environ['VAULT_TOKEN']
-VAULT_SECRET_PATH = os.environ['VAULT_SECRET_PATH']
+def parse_bool( value: str ) -> bool:
+    if value.lower() not in ('true', 'false'):
+        raise ValueError("expected true or false")
+    return value.lower() == 'true'
 
-UNPROTECTED_PATHS = ['/favicon.ico', '/docs', '/credential/openapi.json']
-UNLICENSED_PATHS = []
\ No newline at end of file
+
+def parse_str_list( value: str ) -> list:
+    return value.split(',')
+
+
+def parse_float_list( value: str ) -> list:
+    return [float(item) for item in value.split(',')]
+
+
+def parse_log_level( value: str ) -> str:
+    level = value.strip().upper()
+    if level not in LOG_LEVEL_NAMES:
+        raise ValueError(f"expected one of {', '.join(LOG_LEVEL_NAMES)}")
+    return level
+
+
+def parse_log_levels( value: str ) -> dict:
+    """Parse "middlewares=DEBUG,services.vault_service=WARNING" into {logger name: level}."""
+    levels = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        name, separator, level = item.partition('=')
+        if not separator or not name.strip():
+            raise ValueError(f"invalid entry {item!r}")
+        levels[name.strip()] = parse_log_level(level)
+    return levels
+
+
+SETTINGS: dict[str, tuple[Callable[[str], Any], str | None]] = {
+    'API_NAME': (str, REQUIRED),
+    'API_TAG_NAME': (str, REQUIRED),
+
+    'URL_API_GATEWAY': (str, REQUIRED),
+
+    'HTTP_MAX_CONNECTIONS': (int, '100'),
+    'HTTP_MAX_KEEPALIVE_CONNECTIONS': (int, '20'),
+    'HTTP_KEEPALIVE_EXPIRY': (float, '30'),
+    'HTTP_TIMEOUT': (float, '10'),
+    'HTTP_CONNECT_TIMEOUT': (float, '5'),
+    'HTTP2_ENABLED': (parse_bool, 'false'),
+
+    'KEYCLOAK_HOST': (str, REQUIRED),
+    'KEYCLOAK_REALM': (str, REQUIRED),
+    'KEYCLOAK_CLIENT_ID': (str, REQUIRED),
+    'KEYCLOAK_CLIENT_SECRET': (str, REQUIRED),
+
+    'TOKEN_VERIFICATION_MODE': (str, 'introspection'),
+    'JWKS_ALGORITHMS': (parse_str_list, 'RS256'),
+    'JWKS_MIN_REFRESH_INTERVAL': (int, '30'),
+    'TOKEN_REVOCATION_CHECK_INTERVAL': (int, '0'),
+
+    'TOKEN_L1_CACHE_SIZE': (int, '10000'),
+    'TOKEN_L1_CACHE_TTL': (int, '30'),
+
+    'TOKEN_LOCK_TTL_MS': (int, '0'),
+    'TOKEN_LOCK_POLL_INTERVAL_MS': (int, '25'),
+
+    'REDIS_HOST': (str, REQUIRED),
+    'REDIS_PORT': (int, REQUIRED),
+    'REDIS_DB': (int, REQUIRED),
+    'REDIS_PASSWORD': (str, REQUIRED),
+    'REDIS_MAX_CONNECTIONS': (int, '50'),
+    'REDIS_POOL_TIMEOUT': (float, '5'),
+    'REDIS_SOCKET_TIMEOUT': (float, '5'),
+    'REDIS_SOCKET_CONNECT_TIMEOUT': (float, '5'),
+    'REDIS_HEALTH_CHECK_INTERVAL': (int, '30'),
+    'REDIS_UNIX_SOCKET': (str, ''),
+    'REDIS_RESP3': (parse_bool, 'false'),
+
+    'VAULT_HOST': (str, REQUIRED),
+    'VAULT_PORT': (int, REQUIRED),
+    'VAULT_TOKEN': (str, REQUIRED),
+    'VAULT_SECRET_PATH': (str, REQUIRED),
+    'VAULT_POOL_SIZE': (int, '10'),
+    'VAULT_TOKEN_TTL': (int, '300'),
+    # Defaults to VAULT_POOL_SIZE, see DERIVED_DEFAULTS.
+    'VAULT_MAX_WORKERS': (int, REQUIRED),
+
+    'SECRET_CACHE_ENABLED': (parse_bool, 'false'),
+    'SECRET_CACHE_SIZE': (int, '1000'),
+    'SECRET_CACHE_TTL': (int, '300'),
+    'SECRET_CACHE_MAX_STALENESS': (int, '30'),
+
+    'SECRET_BATCH_MAX_SIZE': (int, '50'),
+    'SECRET_BATCH_WRITE_MAX_SIZE': (int, '1000'),
+    'SECRET_BATCH_WRITE_CONCURRENCY': (int, '10'),
+
+    'LICENCE_NEGATIVE_CACHE_SIZE': (int, '10000'),
+    'LICENCE_NEGATIVE_CACHE_TTL': (int, '30'),
+    'LICENCE_MIN_REFRESH_INTERVAL': (int, '10'),
+    'LICENCE_CACHE_TTL': (int, '3600'),
+    'LICENCE_L1_CACHE_SIZE': (int, '10000'),
+    'LICENCE_L1_CACHE_TTL': (int, '30'),
+
+    'REFRESH_AHEAD_ENABLED': (parse_bool, 'true'),
+    'REFRESH_AHEAD_WINDOW': (int, '60'),
+    'REFRESH_AHEAD_JITTER': (int, '15'),
+    'REFRESH_AHEAD_INTERVAL': (float, '5'),
+    'REFRESH_AHEAD_CONCURRENCY': (int, '4'),
+    'REFRESH_AHEAD_MIN_HITS': (int, '3'),
+    'REFRESH_AHEAD_HOT_TTL': (int, '300'),
+    'REFRESH_AHEAD_MAX_KEYS': (int, '10000'),
+
+    'WARMUP_ENABLED': (parse_bool, 'true'),
+    'WARMUP_TIMEOUT': (float, '5'),
+    'WARMUP_RETRY_INTERVAL': (float, '5'),
+    'WARMUP_REDIS_CONNECTIONS': (int, '4'),
+    'WARMUP_VAULT_CONNECTIONS': (int, '2'),
+    'WARMUP_HTTP_CONNECTIONS': (int, '2'),
+    'WARMUP_PRELOAD_ENABLED': (parse_bool, 'false'),
+    'WARMUP_PRELOAD_MAX_KEYS': (int, '1000'),
+    'WARMUP_HOT_KEYS_TTL': (int, '600'),
+
+    'METRICS_BUCKETS_MS': (parse_float_list, '0.5,1,2.5,5,10,25,50,100,250,500,1000,2500'),
+    'LOG_TIME_SAMPLE_RATE': (float, '0'),
+
+    'LOG_LEVEL': (parse_log_level, 'INFO'),
+    'LOG_LEVELS': (parse_log_levels, ''),
+    'LOG_FORMAT': (str, 'json'),
+}
+
+DERIVED_DEFAULTS = {'VAULT_MAX_WORKERS': 'VAULT_POOL_SIZE'}
+
+CHOICES = {
+    'TOKEN_VERIFICATION_MODE': ('introspection', 'local'),
+    'LOG_FORMAT': ('json', 'text'),
+}
+
+UNPROTECTED_PATHS = ['/favicon.ico', '/docs', '/credential/openapi.json', '/metrics', '/ready']
+UNLICENSED_PATHS = []
+
+
+class SettingsError(ValueError):
+    """Raised at import with every missing or invalid variable, not just the first one."""
+
+
+class Settings:
+    """The parsed configuration, one attribute per entry of SETTINGS."""
+
+    def __init__( self, values: dict ):
+        self.__dict__.update(values)
+
+
+def load_settings( environ: Mapping[str, str] = os.environ ) -> Settings:
+    values = {}
+    errors = []
+    for name, (parse, default) in SETTINGS.items():
+        raw = environ.get(name)
+        if raw is None and name in DERIVED_DEFAULTS:
+            values[name] = values.get(DERIVED_DEFAULTS[name])
+            continue
+        if raw is None:
+            raw = default
+        if raw is None:
+            errors.append(f"{name} is required")
+            continue
+        try:
+            values[name] = parse(raw)
+        except ValueError as e:
+            errors.append(f"{name}={raw!r} is invalid: {e}")
+            continue
+        if name in CHOICES and values[name] not in CHOICES[name]:
+            errors.append(f"{name}={raw!r} must be one of {', '.join(CHOICES[name])}")
+    if errors:
+        raise SettingsError("Invalid configuration: " + "; ".join(errors))
+    return Settings(values)
+
+
+settings = load_settings()
+
+API_NAME = settings.API_NAME
+API_TAG_NAME = settings.API_TAG_NAME
+URL_API_GATEWAY = settings.URL_API_GATEWAY
+HTTP_MAX_CONNECTIONS = settings.HTTP_MAX_CONNECTIONS
+HTTP_MAX_KEEPALIVE_CONNECTIONS = settings.HTTP_MAX_KEEPALIVE_CONNECTIONS
+HTTP_KEEPALIVE_EXPIRY = settings.HTTP_KEEPALIVE_EXPIRY
+HTTP_TIMEOUT = settings.HTTP_TIMEOUT
+HTTP_CONNECT_TIMEOUT = settings.HTTP_CONNECT_TIMEOUT
+HTTP2_ENABLED = settings.HTTP2_ENABLED
+KEYCLOAK_HOST = settings.KEYCLOAK_HOST
+KEYCLOAK_REALM = settings.KEYCLOAK_REALM
+KEYCLOAK_CLIENT_ID = settings.KEYCLOAK_CLIENT_ID
+KEYCLOAK_CLIENT_SECRET = settings.KEYCLOAK_CLIENT_SECRET
+TOKEN_VERIFICATION_MODE = settings.TOKEN_VERIFICATION_MODE
+JWKS_ALGORITHMS = settings.JWKS_ALGORITHMS
+JWKS_MIN_REFRESH_INTERVAL = settings.JWKS_MIN_REFRESH_INTERVAL
+TOKEN_REVOCATION_CHECK_INTERVAL = settings.TOKEN_REVOCATION_CHECK_INTERVAL
+TOKEN_L1_CACHE_SIZE = settings.TOKEN_L1_CACHE_SIZE
+TOKEN_L1_CACHE_TTL = settings.TOKEN_L1_CACHE_TTL
+TOKEN_LOCK_TTL_MS = settings.TOKEN_LOCK_TTL_MS
+TOKEN_LOCK_POLL_INTERVAL_MS = settings.TOKEN_LOCK_POLL_INTERVAL_MS
+REDIS_HOST = settings.REDIS_HOST
+REDIS_PORT = settings.REDIS_PORT
+REDIS_DB = settings.REDIS_DB
+REDIS_PASSWORD = settings.REDIS_PASSWORD
+REDIS_MAX_CONNECTIONS = settings.REDIS_MAX_CONNECTIONS
+REDIS_POOL_TIMEOUT = settings.REDIS_POOL_TIMEOUT
+REDIS_SOCKET_TIMEOUT = settings.REDIS_SOCKET_TIMEOUT
+REDIS_SOCKET_CONNECT_TIMEOUT = settings.REDIS_SOCKET_CONNECT_TIMEOUT
+REDIS_HEALTH_CHECK_INTERVAL = settings.REDIS_HEALTH_CHECK_INTERVAL
+REDIS_UNIX_SOCKET = settings.REDIS_UNIX_SOCKET
+REDIS_RESP3 = settings.REDIS_RESP3
+VAULT_HOST = settings.VAULT_HOST
+VAULT_PORT = settings.VAULT_PORT
+VAULT_TOKEN = settings.VAULT_TOKEN
+VAULT_SECRET_PATH = settings.VAULT_SECRET_PATH
+VAULT_POOL_SIZE = settings.VAULT_POOL_SIZE
+VAULT_TOKEN_TTL = settings.VAULT_TOKEN_TTL
+VAULT_MAX_WORKERS = settings.VAULT_MAX_WORKERS
+SECRET_CACHE_ENABLED = settings.SECRET_CACHE_ENABLED
+SECRET_CACHE_SIZE = settings.SECRET_CACHE_SIZE
+SECRET_CACHE_TTL = settings.SECRET_CACHE_TTL
+SECRET_CACHE_MAX_STALENESS = settings.SECRET_CACHE_MAX_STALENESS
+SECRET_BATCH_MAX_SIZE = settings.SECRET_BATCH_MAX_SIZE
+SECRET_BATCH_WRITE_MAX_SIZE = settings.SECRET_BATCH_WRITE_MAX_SIZE
+SECRET_BATCH_WRITE_CONCURRENCY = settings.SECRET_BATCH_WRITE_CONCURRENCY
+LICENCE_NEGATIVE_CACHE_SIZE = settings.LICENCE_NEGATIVE_CACHE_SIZE
+LICENCE_NEGATIVE_CACHE_TTL = settings.LICENCE_NEGATIVE_CACHE_TTL
+LICENCE_MIN_REFRESH_INTERVAL = settings.LICENCE_MIN_REFRESH_INTERVAL
+LICENCE_CACHE_TTL = settings.LICENCE_CACHE_TTL
+LICENCE_L1_CACHE_SIZE = settings.LICENCE_L1_CACHE_SIZE
+LICENCE_L1_CACHE_TTL = settings.LICENCE_L1_CACHE_TTL
+REFRESH_AHEAD_ENABLED = settings.REFRESH_AHEAD_ENABLED
+REFRESH_AHEAD_WINDOW = settings.REFRESH_AHEAD_WINDOW
+REFRESH_AHEAD_JITTER = settings.REFRESH_AHEAD_JITTER
+REFRESH_AHEAD_INTERVAL = settings.REFRESH_AHEAD_INTERVAL
+REFRESH_AHEAD_CONCURRENCY = settings.REFRESH_AHEAD_CONCURRENCY
+REFRESH_AHEAD_MIN_HITS = settings.REFRESH_AHEAD_MIN_HITS
+REFRESH_AHEAD_HOT_TTL = settings.REFRESH_AHEAD_HOT_TTL
+REFRESH_AHEAD_MAX_KEYS = settings.REFRESH_AHEAD_MAX_KEYS
+WARMUP_ENABLED = settings.WARMUP_ENABLED
+WARMUP_TIMEOUT = settings.WARMUP_TIMEOUT
+WARMUP_RETRY_INTERVAL = settings.WARMUP_RETRY_INTERVAL
+WARMUP_REDIS_CONNECTIONS = settings.WARMUP_REDIS_CONNECTIONS
+WARMUP_VAULT_CONNECTIONS = settings.WARMUP_VAULT_CONNECTIONS
+WARMUP_HTTP_CONNECTIONS = settings.WARMUP_HTTP_CONNECTIONS
+WARMUP_PRELOAD_ENABLED = settings.WARMUP_PRELOAD_ENABLED
+WARMUP_PRELOAD_MAX_KEYS = settings.WARMUP_PRELOAD_MAX_KEYS
+WARMUP_HOT_KEYS_TTL = settings.WARMUP_HOT_KEYS_TTL
+METRICS_BUCKETS_MS = settings.METRICS_BUCKETS_MS
+LOG_TIME_SAMPLE_RATE = settings.LOG_TIME_SAMPLE_RATE
+LOG_LEVEL = settings.LOG_LEVEL
+LOG_LEVELS = settings.LOG_LEVELS
+LOG_FORMAT = settings.LOG_FORMAT
@@ -1,8 +1,11 @@
-import logging
 from fastapi import status, Request, HTTPException
 from functools import wraps
 from typing import List
 
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
 
 def check_roles( list_roles: list, permissions: List[str] ) -> None:
     if not any(perm in list_roles for perm in permissions):
@@ -18,8 +21,8 @@ def check_permissions( permissions: List[str] ):
     def decorator( func ):
         @wraps(func)
         async def wrapper( request: Request, *args, **kwargs ):
-            logging.info(f"Checking permissions {permissions}")
-            logging.info(f"License: {request}")
+            logger.debug("Checking permissions %s", permissions)
+            logger.debug("License: %s", request)
 
             check_roles(request.state.token_info.get('license_roles'), permissions)
 
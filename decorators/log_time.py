@@ -1,32 +1,58 @@
+import functools
 import random
 import time
-import logging
+
+from config.config import LOG_TIME_SAMPLE_RATE
+from services.metrics_service import observe
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def is_log_time_sampled() -> bool:
+    return LOG_TIME_SAMPLE_RATE > 0 and random.random() < LOG_TIME_SAMPLE_RATE
 
 
 def log_time_async( func ):
+    @functools.wraps(func)
     async def wrapper( *args, **kwargs ):
-        id = random.randint(1, 1000000)
-        start_time = time.time()
-        logging.info(f"{func.__name__}: Start {id}")
+        if not is_log_time_sampled():
+            start_time = time.perf_counter_ns()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                observe(func.__name__, time.perf_counter_ns() - start_time)
 
-        result = await func(*args, **kwargs)
+        id = random.randint(1, 1000000)
+        start_time = time.perf_counter_ns()
+        logger.info("%s: Start %s", func.__name__, id)
 
-        end_time = time.time()
-        execution_time = end_time - start_time
-        logging.info(f"{func.__name__}: End {id} | Execution time: {execution_time:.4f} seconds")
-        return result
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            execution_time = time.perf_counter_ns() - start_time
+            observe(func.__name__, execution_time)
+            logger.info("%s: End %s | Execution time: %.4f seconds", func.__name__, id, execution_time / 1e9)
     return wrapper
 
 def log_time( func ):
+    @functools.wraps(func)
     def wrapper( *args, **kwargs ):
-        id = random.randint(1, 1000000)
-        start_time = time.time()
-        logging.info(f"{func.__name__}: Start {id}", id)
+        if not is_log_time_sampled():
+            start_time = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(func.__name__, time.perf_counter_ns() - start_time)
 
-        result = func(*args, **kwargs)
+        id = random.randint(1, 1000000)
+        start_time = time.perf_counter_ns()
+        logger.info("%s: Start %s", func.__name__, id)
 
-        end_time = time.time()
-        execution_time = end_time - start_time
-        logging.info(f"{func.__name__}: End {id} | Execution time: {execution_time:.4f} seconds")
-        return result
-    return wrapper
\ No newline at end of file
+        try:
+            return func(*args, **kwargs)
+        finally:
+            execution_time = time.perf_counter_ns() - start_time
+            observe(func.__name__, execution_time)
+            logger.info("%s: End %s | Execution time: %.4f seconds", func.__name__, id, execution_time / 1e9)
+    return wrapper
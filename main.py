@@ -1,18 +1,42 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.security import HTTPBearer
 from fastapi.openapi.utils import get_openapi
-from middlewares.licence_middleware import LicenceVerificationMiddleware
-from middlewares.token_middleware import TokenVerificationMiddleware
-from routers import v1
-import logging
+from config.config import REFRESH_AHEAD_ENABLED
+from middlewares.auth_middleware import AuthVerificationMiddleware
+from middlewares.licence_middleware import licence_refresh_ahead
+from routers import health, metrics, v1
+from services.http_service import open_http_client, close_http_client
+from services.inmemory_service import close_redis_clients
+from services.vault_service import close_vault_client
+from services.warmup_service import start_warmup, stop_warmup, save_hot_keys
+from utils.logger import configure_logging, get_logger
 
-logging.basicConfig(level=logging.INFO)
-logging.info("Starting API Credential")
+configure_logging()
+logger = get_logger(__name__)
+logger.info("Starting API Credential")
 
 
 bearer_scheme = HTTPBearer()
 
-app = FastAPI(openapi_url="/credential/openapi.json")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await open_http_client()
+    start_warmup()
+    if REFRESH_AHEAD_ENABLED:
+        licence_refresh_ahead.start()
+    yield
+    await stop_warmup()
+    await licence_refresh_ahead.stop()
+    await save_hot_keys()
+    await close_http_client()
+    close_vault_client()
+    await close_redis_clients()
+
+
+app = FastAPI(openapi_url="/credential/openapi.json", lifespan=lifespan)
 def custom_openapi():
     if app.openapi_schema:
         return app.openapi_schema
@@ -44,7 +68,8 @@ def custom_openapi():
     return app.openapi_schema
 
 app.openapi = custom_openapi
-app.add_middleware(LicenceVerificationMiddleware)
-app.add_middleware(TokenVerificationMiddleware)
+app.add_middleware(AuthVerificationMiddleware)
 
 app.include_router(v1.router)
+app.include_router(metrics.router)
+app.include_router(health.router)
@@ -0,0 +1,46 @@
+from fastapi import HTTPException
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from decorators.log_time import log_time_async
+from middlewares.licence_middleware import verify_licence_request
+from middlewares.token_middleware import verify_token_request
+from services.metrics_service import increment
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@log_time_async
+async def authenticate_request(request: Request) -> None:
+    await verify_token_request(request)
+    await verify_licence_request(request)
+
+
+class AuthVerificationMiddleware:
+    """Token, licence and entity verification as one pure ASGI middleware.
+
+    Unlike a BaseHTTPMiddleware, the downstream app is called directly with the original receive/send, so
+    responses are not re-wrapped.
+    request.state is backed by scope["state"], so token_info, user_uuid, licence_uuid and entity_uuid reach the
+    endpoints exactly as before.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        logger.debug("AuthVerificationMiddleware")
+        try:
+            await authenticate_request(Request(scope))
+        except HTTPException as exc:
+            increment("auth_rejections")
+            response = JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -1,19 +1,33 @@
-import logging
 from datetime import datetime, timezone
 
-import httpx
 from fastapi import HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
-from starlette.responses import JSONResponse, Response
-from decorators.log_time import log_time_async
-from middlewares.token_middleware import read_cache_token, write_cache_token
-from services.inmemory_service import get_redis_api_db
-from utils.path_util import is_unprotected_path, is_unlicensed_path
-from config.config import URL_API_GATEWAY
+from services.http_service import get_http_client
+from services.inmemory_service import LazyClient, get_redis_async_api_db
+from services.metrics_service import register_collector, timed
+from utils.cache_codec import encode_cache_value, decode_cache_value
+from utils.logger import get_logger
+from utils.path_util import is_unprotected_request, is_unlicensed_request
+from utils.refresh_ahead import RefreshAhead
+from utils.single_flight import SingleFlight
+from utils.ttl_cache import TTLCache
+from config.config import URL_API_GATEWAY, LICENCE_NEGATIVE_CACHE_SIZE, LICENCE_NEGATIVE_CACHE_TTL, \
+    LICENCE_MIN_REFRESH_INTERVAL, LICENCE_CACHE_TTL, LICENCE_L1_CACHE_SIZE, LICENCE_L1_CACHE_TTL, REFRESH_AHEAD_ENABLED, \
+    REFRESH_AHEAD_WINDOW, REFRESH_AHEAD_JITTER, REFRESH_AHEAD_INTERVAL, REFRESH_AHEAD_CONCURRENCY, REFRESH_AHEAD_MIN_HITS, \
+    REFRESH_AHEAD_HOT_TTL, REFRESH_AHEAD_MAX_KEYS
 
 
-r = get_redis_api_db()
+logger = get_logger(__name__)
+r_async = LazyClient(get_redis_async_api_db)
+licence_l1_cache = TTLCache(maxsize=LICENCE_L1_CACHE_SIZE, ttl=LICENCE_L1_CACHE_TTL)
+licence_flight = SingleFlight()
+licence_negative_cache = TTLCache(maxsize=LICENCE_NEGATIVE_CACHE_SIZE, ttl=LICENCE_NEGATIVE_CACHE_TTL)
+licence_refreshed_users = TTLCache(maxsize=LICENCE_NEGATIVE_CACHE_SIZE, ttl=LICENCE_MIN_REFRESH_INTERVAL)
+licence_refresh_stats = {"refreshes": 0, "suppressed_negative": 0, "suppressed_interval": 0}
+register_collector("licence_l1_cache", licence_l1_cache.stats)
+register_collector("licence_flight", licence_flight.stats)
+register_collector("licence_negative_cache", licence_negative_cache.stats)
+register_collector("licence_refresh", lambda: licence_refresh_stats)
 
 
 def extract_licence(request: Request) -> str:
@@ -32,19 +46,37 @@ def check_headers_licence(request: Request) -> None:
         raise HTTPException(status_code=403, detail="Licence header missing")
 
 
+def index_licences(licences: list | None) -> dict:
+    return {str(lic['uuid']): position for position, lic in enumerate(licences or [])}
+
+
+def store_licences_in_state(request: Request, licences: list | None, licences_index: dict | None = None) -> None:
+    setattr(request.state, 'licenses', licences)
+    setattr(request.state, 'licenses_index', licences_index if licences_index is not None else index_licences(licences))
+
+
+def get_licences_index(request: Request) -> dict:
+    licenses_index = getattr(request.state, 'licenses_index', None)
+    if not isinstance(licenses_index, dict):
+        # Licences set without their index (older cache entries) are indexed once here.
+        licenses_index = index_licences(getattr(request.state, 'licenses', None))
+        setattr(request.state, 'licenses_index', licenses_index)
+    return licenses_index
+
+
 def is_licence_found(request: Request, licence: str) -> bool:
-    logging.info(f"License : is_licence_found")
-    licenses = getattr(request.state, 'licenses', None)
-    if not licenses:
-        return False
-    if not any(licence_data['uuid'] == licence for licence_data in licenses):
-        return False
-    return True
+    logger.debug("License : is_licence_found")
+    return str(licence) in get_licences_index(request)
+
+
+def get_licences_url() -> str:
+    return f"{URL_API_GATEWAY}/license/v1/mine"
+
 
 
-def get_licences(token: str) -> list:
-    logging.info(f"License : get_licences")
-    response = httpx.get(f"{URL_API_GATEWAY}/license/v1/mine", headers={"Authorization": f"Bearer {token}"})
+async def get_licences_async(token: str) -> list:
+    logger.debug("License : get_licences_async")
+    response = await get_http_client().get(get_licences_url(), headers={"Authorization": f"Bearer {token}"})
     if response.status_code != 200:
         raise HTTPException(status_code=500, detail="Licences request failed")
     data = response.json()
@@ -70,61 +102,161 @@ def filter_licences(licences: list) -> list:
     return licences_filtered
 
 
-def prepare_licences(token: str) -> list:
-    licenses = get_licences(token)
+
+async def prepare_licences_async(token: str) -> list:
+    licenses = await get_licences_async(token)
     return filter_licences(licenses)
 
 
-def refresh_cache_token(request: Request) -> dict:
-    logging.info(f"License : refresh_cache_token")
-    cache_token = read_cache_token(getattr(request.state, 'token', None))
-    cache_token['licenses'] = getattr(request.state, 'licenses', None)
-    logging.info(f"cache_token: {cache_token}")
-    return cache_token
+def get_licence_owner(request: Request) -> str:
+    # Licence sets belong to the user, so every token of that user shares one cache entry and one fetch.
+    # Tokens without a subject fall back to a set of their own.
+    return getattr(request.state, 'user_uuid', None) or getattr(request.state, 'token', None)
+
+
+def get_licences_cache_key(owner: str) -> str:
+    return f"licences:{owner}"
+
+
+def get_licences_ttl(licences: list) -> int:
+    """Seconds until the first licence of the set expires, capped by LICENCE_CACHE_TTL."""
+    now = int(datetime.now(timezone.utc).timestamp())
+    return min([LICENCE_CACHE_TTL] + [lic['exp'] - now for lic in licences])
+
+
+def prepare_cache_licences(licences: list) -> dict:
+    expires_at = int(datetime.now(timezone.utc).timestamp()) + get_licences_ttl(licences)
+    return {"licenses": licences, "licenses_index": index_licences(licences), "expires_at": expires_at}
+
+
+def get_cache_licences_remaining_ttl(cache_licences: dict) -> int:
+    """Seconds left before the cached set expires, so a local copy never outlives the first licence exp."""
+    return cache_licences['expires_at'] - int(datetime.now(timezone.utc).timestamp())
+
+
+
+async def read_cache_licences_async(owner: str) -> dict | None:
+    logger.debug("License : read_cache_licences_async")
+    cache_licences = licence_l1_cache.get(owner)
+    if cache_licences is not None:
+        return cache_licences
+    cached_result = await r_async.get(get_licences_cache_key(owner))
+    if cached_result is not None:
+        cache_licences = decode_cache_value(cached_result)
+        licence_l1_cache.set(owner, cache_licences, ttl=get_cache_licences_remaining_ttl(cache_licences))
+        return cache_licences
+    return None
 
 
-def refresh_licences(request: Request) -> None:
-    logging.info(f"License : refresh_licences")
+
+async def write_cache_licences_async(owner: str, cache_licences: dict) -> None:
+    logger.debug("License : write_cache_licences_async")
+    ttl = get_licences_ttl(cache_licences['licenses'])
+    if ttl > 0:
+        await r_async.set(get_licences_cache_key(owner), encode_cache_value(cache_licences), ex=ttl)
+        licence_l1_cache.set(owner, cache_licences, ttl=ttl)
+
+
+def track_licences_read(request: Request, owner: str, cache_licences: dict) -> None:
+    if cache_licences.get('expires_at') is not None:
+        licence_refresh_ahead.track(owner, cache_licences['expires_at'], getattr(request.state, 'token', None))
+
+
+async def load_cached_licences_async(request: Request) -> None:
+    owner = get_licence_owner(request)
+    cache_licences = await read_cache_licences_async(owner)
+    if cache_licences is not None:
+        store_licences_in_state(request, cache_licences.get('licenses'), cache_licences.get('licenses_index'))
+        track_licences_read(request, owner, cache_licences)
+
+
+
+async def fetch_licences_async(token: str, owner: str) -> dict:
+    cache_licences = prepare_cache_licences(await prepare_licences_async(token))
+    await write_cache_licences_async(owner, cache_licences)
+    return cache_licences
+
+
+@timed("licence_refresh")
+async def refresh_licences_async(request: Request) -> None:
+    logger.debug("License : refresh_licences_async")
     token = getattr(request.state, 'token', None)
-    licenses = prepare_licences(token)
-    setattr(request.state, 'licenses', licenses)
-    write_cache_token(token=token, cache_token=refresh_cache_token(request))
+    owner = get_licence_owner(request)
+    cache_licences = await licence_flight.do(owner, lambda: fetch_licences_async(token, owner))
+    store_licences_in_state(request, cache_licences['licenses'], cache_licences['licenses_index'])
+    track_licences_read(request, owner, cache_licences)
+
+
+async def refresh_ahead_licences(owner: str, token: str) -> int:
+    cache_licences = await licence_flight.do(owner, lambda: fetch_licences_async(token, owner))
+    return cache_licences['expires_at']
+
 
+licence_refresh_ahead = RefreshAhead(
+    refresh=refresh_ahead_licences,
+    window=REFRESH_AHEAD_WINDOW,
+    interval=REFRESH_AHEAD_INTERVAL,
+    jitter=REFRESH_AHEAD_JITTER,
+    concurrency=REFRESH_AHEAD_CONCURRENCY,
+    min_hits=REFRESH_AHEAD_MIN_HITS,
+    hot_ttl=REFRESH_AHEAD_HOT_TTL,
+    maxsize=REFRESH_AHEAD_MAX_KEYS if REFRESH_AHEAD_ENABLED else 0
+)
+register_collector("licence_refresh_ahead", licence_refresh_ahead.stats)
 
-def check_licence(request: Request, licence: str) -> None:
+
+def is_licence_refresh_suppressed(owner: str, licence: str) -> bool:
+    if (owner, licence) in licence_negative_cache:
+        licence_refresh_stats["suppressed_negative"] += 1
+        return True
+    if owner in licence_refreshed_users:
+        licence_refresh_stats["suppressed_interval"] += 1
+        return True
+    return False
+
+
+def record_licence_refresh(owner: str) -> None:
+    licence_refresh_stats["refreshes"] += 1
+    licence_refreshed_users.set(owner, True)
+
+
+def record_licence_not_found(owner: str, licence: str) -> None:
+    licence_negative_cache.set((owner, licence), True)
+
+
+
+async def check_licence_async(request: Request, licence: str) -> None:
     if not is_licence_found(request, licence):
-        refresh_licences(request)
+        owner = get_licence_owner(request)
+        if is_licence_refresh_suppressed(owner, licence):
+            raise HTTPException(status_code=403, detail="Licence not found")
+        # Recorded even when the refresh fails, so a failing gateway is not called again on every request.
+        try:
+            await refresh_licences_async(request)
+        finally:
+            record_licence_refresh(owner)
         if not is_licence_found(request, licence):
+            record_licence_not_found(owner, licence)
             raise HTTPException(status_code=403, detail="Licence not found")
 
 
 def extract_entity(request: Request) -> str:
     licenses = getattr(request.state, 'licenses', None)
     license_uuid = getattr(request.state, 'licence_uuid', None)
-    for lic in licenses:
-        if str(lic.get('uuid')) == str(license_uuid):
-            return lic.get('entity_uuid')
-    raise HTTPException(status_code=500, detail="Entity not found")
-
+    position = get_licences_index(request).get(str(license_uuid))
+    if position is None:
+        raise HTTPException(status_code=500, detail="Entity not found")
+    return licenses[position].get('entity_uuid')
 
-class LicenceVerificationMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app):
-        super().__init__(app)
 
-    @log_time_async
-    async def dispatch(self, request: Request, call_next) -> Response:
-        logging.info("LicenceVerificationMiddleware")
-        try:
-            if not is_unprotected_path(request.url.path) and not is_unlicensed_path(request.url.path):
-                check_headers_licence(request)
-                licence_uuid = extract_licence(request)
-                logging.info(f"licence_uuid: {licence_uuid}")
-                check_licence(request, licence_uuid)
-                setattr(request.state, 'licence_uuid', licence_uuid)
-                entity_uuid = extract_entity(request)
-                logging.info(f"entity_uuid: {entity_uuid}")
-                setattr(request.state, 'entity_uuid', entity_uuid)
-            response = await call_next(request)
-            return response
-        except HTTPException as exc:
-            return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
+async def verify_licence_request(request: Request) -> None:
+    if not is_unprotected_request(request.scope) and not is_unlicensed_request(request.scope):
+        check_headers_licence(request)
+        licence_uuid = extract_licence(request)
+        logger.debug("licence_uuid: %s", licence_uuid)
+        await load_cached_licences_async(request)
+        await check_licence_async(request, licence_uuid)
+        setattr(request.state, 'licence_uuid', licence_uuid)
+        entity_uuid = extract_entity(request)
+        logger.debug("entity_uuid: %s", entity_uuid)
+        setattr(request.state, 'entity_uuid', entity_uuid)
@@ -1,21 +1,35 @@
-import logging
+import asyncio
 import time
 from typing import Any
 
 import httpx
 from fastapi import HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
-from starlette.responses import JSONResponse, Response
-from config.config import API_NAME, KEYCLOAK_HOST, KEYCLOAK_REALM, KEYCLOAK_CLIENT_ID, KEYCLOAK_CLIENT_SECRET
-from decorators.log_time import log_time_async
-from services.inmemory_service import get_redis_api_db
-from utils.path_util import is_unprotected_path
-
-r = get_redis_api_db()
+from config.config import API_NAME, KEYCLOAK_HOST, KEYCLOAK_REALM, KEYCLOAK_CLIENT_ID, KEYCLOAK_CLIENT_SECRET, \
+    TOKEN_VERIFICATION_MODE, TOKEN_REVOCATION_CHECK_INTERVAL, TOKEN_L1_CACHE_SIZE, TOKEN_L1_CACHE_TTL, \
+    TOKEN_LOCK_TTL_MS, TOKEN_LOCK_POLL_INTERVAL_MS
+from services.http_service import get_http_client
+from services.inmemory_service import LazyClient, get_redis_api_db, get_redis_async_api_db
+from services.jwks_service import verify_token_locally
+from services.metrics_service import register_collector, timed
+from utils.cache_codec import encode_cache_value, decode_cache_value, is_legacy_cache_value
+from utils.logger import get_logger
+from utils.path_util import is_unprotected_request
+from utils.single_flight import SingleFlight
+from utils.ttl_cache import TTLCache
+
+logger = get_logger(__name__)
+r = LazyClient(get_redis_api_db)
+r_async = LazyClient(get_redis_async_api_db)
+token_l1_cache = TTLCache(maxsize=TOKEN_L1_CACHE_SIZE, ttl=TOKEN_L1_CACHE_TTL)
+token_flight = SingleFlight()
+token_lock_stats = {"acquired": 0, "waited": 0, "coalesced": 0}
+register_collector("token_l1_cache", token_l1_cache.stats)
+register_collector("token_flight", token_flight.stats)
+register_collector("token_lock", lambda: token_lock_stats)
 
 def generate_state_info( token_info: dict ) -> dict:
-    logging.info(f"Token : generate_state_info")
+    logger.debug("Token : generate_state_info")
     return {
         "user_uuid": token_info.get("sub"),
         "user_display_name": token_info.get("preferred_username"),
@@ -45,56 +59,196 @@ def is_token_active( token_info: dict ) -> bool:
     return False
 
 
+def is_revocation_check_enabled() -> bool:
+    return TOKEN_VERIFICATION_MODE == "local" and TOKEN_REVOCATION_CHECK_INTERVAL > 0
+
+
+def cap_token_cache_ttl( ttl: float ) -> float:
+    # A locally verified token is only rechecked against introspection on a cache miss, so with the
+    # revocation check its cache entries must expire after TOKEN_REVOCATION_CHECK_INTERVAL at the latest.
+    if is_revocation_check_enabled():
+        return min(ttl, TOKEN_REVOCATION_CHECK_INTERVAL)
+    return ttl
+
+
+def write_l1_cache_token( token: str, cache_token: dict ):
+    if cache_token.get("exp") is not None:
+        token_l1_cache.set(token, cache_token, ttl=cap_token_cache_ttl(cache_token.get("exp") - time.time()))
+
+
 def read_cache_token( token: str ) -> Any | None:
-    logging.info(f"Token : read_cache_token")
+    logger.debug("Token : read_cache_token")
+    cache_token = token_l1_cache.get(token)
+    if cache_token is not None:
+        return cache_token
     cached_result = r.get(token)
     if cached_result is not None:
-        return eval(cached_result)
+        cache_token = decode_cache_value(cached_result)
+        if is_legacy_cache_value(cached_result):
+            r.set(token, encode_cache_value(cache_token), keepttl=True, xx=True)
+        write_l1_cache_token(token, cache_token)
+        return cache_token
+    return None
+
+
+@timed("token_cache")
+async def read_cache_token_async( token: str ) -> Any | None:
+    logger.debug("Token : read_cache_token_async")
+    cache_token = token_l1_cache.get(token)
+    if cache_token is not None:
+        return cache_token
+    cached_result = await r_async.get(token)
+    if cached_result is not None:
+        cache_token = decode_cache_value(cached_result)
+        if is_legacy_cache_value(cached_result):
+            await r_async.set(token, encode_cache_value(cache_token), keepttl=True, xx=True)
+        write_l1_cache_token(token, cache_token)
+        return cache_token
     return None
 
 
 def write_cache_token( token: str, cache_token: dict ):
-    logging.info(f"Token : write_cache_token")
+    logger.debug("Token : write_cache_token")
     if cache_token.get("exp") is not None:
-        ttl = cache_token.get("exp") - int(time.time())
-        r.set(token, str(cache_token), ex=ttl)
+        ttl = cap_token_cache_ttl(cache_token.get("exp") - int(time.time()))
+        r.set(token, encode_cache_value(cache_token), ex=ttl)
+        write_l1_cache_token(token, cache_token)
 
 
-def introspect_token( token: str ) -> dict:
-    logging.info(f"Token : introspect_token")
-    url = f"{KEYCLOAK_HOST}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/token/introspect"
-    data = {
+async def write_cache_token_async( token: str, cache_token: dict ):
+    logger.debug("Token : write_cache_token_async")
+    if cache_token.get("exp") is not None:
+        ttl = cap_token_cache_ttl(cache_token.get("exp") - int(time.time()))
+        await r_async.set(token, encode_cache_value(cache_token), ex=ttl)
+        write_l1_cache_token(token, cache_token)
+
+
+def get_introspection_url() -> str:
+    return f"{KEYCLOAK_HOST}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/token/introspect"
+
+
+def get_introspection_data( token: str ) -> dict:
+    return {
         "token": token,
         "client_id": KEYCLOAK_CLIENT_ID,
         "client_secret": KEYCLOAK_CLIENT_SECRET
     }
 
-    response = httpx.post(url, data=data)
+
+def introspect_token( token: str ) -> dict:
+    logger.debug("Token : introspect_token")
+    response = httpx.post(get_introspection_url(), data=get_introspection_data(token))
     if response.status_code != 200:
         raise HTTPException(status_code=500, detail="Keycloak introspection failed")
     return response.json()
 
 
+@timed("introspection")
+async def introspect_token_async( token: str ) -> dict:
+    logger.debug("Token : introspect_token_async")
+    response = await get_http_client().post(get_introspection_url(), data=get_introspection_data(token))
+    if response.status_code != 200:
+        raise HTTPException(status_code=500, detail="Keycloak introspection failed")
+    return response.json()
+
+
+@timed("token_verification")
+async def verify_token_async( token: str ) -> dict:
+    if TOKEN_VERIFICATION_MODE == "local":
+        token_info = await verify_token_locally(token)
+        if token_info is not None and is_revocation_check_enabled():
+            # A valid signature says nothing about logout or revocation: Keycloak answers active=false then.
+            introspection = await introspect_token_async(token)
+            if not introspection.get("active"):
+                return introspection
+        if token_info is not None:
+            return token_info
+    return await introspect_token_async(token)
+
+
 def prepare_cache_token(token_info: dict ) -> dict:
     cached_time = int(time.time())
     token_info["cached_time"] = cached_time
     return token_info
 
 
+def fetch_token_info( token: str ) -> dict:
+    response = introspect_token(token)
+    cache_token = prepare_cache_token(response)
+    write_cache_token(token, cache_token)
+    return response
+
+
 def get_token_info( token: str ) -> dict:
     response = read_cache_token(token)
     if not response:
-        response = introspect_token(token)
-        cache_token = prepare_cache_token(response)
-        write_cache_token(token, cache_token)
+        response = fetch_token_info(token)
+    return response
+
+
+async def fetch_token_info_async( token: str ) -> dict:
+    response = await verify_token_async(token)
+    cache_token = prepare_cache_token(response)
+    await write_cache_token_async(token, cache_token)
+    return response
+
+
+def get_token_lock_key( token: str ) -> str:
+    return f"lock:{token}"
+
+
+async def wait_token_info_from_other_worker( token: str ) -> dict | None:
+    deadline = time.monotonic() + TOKEN_LOCK_TTL_MS / 1000
+    while time.monotonic() < deadline:
+        await asyncio.sleep(TOKEN_LOCK_POLL_INTERVAL_MS / 1000)
+        cached_result = await r_async.get(token)
+        if cached_result is not None:
+            return decode_cache_value(cached_result)
+        if not await r_async.exists(get_token_lock_key(token)):
+            return None
+    return None
+
+
+async def fetch_token_info_locked_async( token: str ) -> dict:
+    lock_key = get_token_lock_key(token)
+    if await r_async.set(lock_key, "1", nx=True, px=TOKEN_LOCK_TTL_MS):
+        token_lock_stats["acquired"] += 1
+        try:
+            return await fetch_token_info_async(token)
+        finally:
+            await r_async.delete(lock_key)
+
+    token_lock_stats["waited"] += 1
+    response = await wait_token_info_from_other_worker(token)
+    if response is None:
+        return await fetch_token_info_async(token)
+    token_lock_stats["coalesced"] += 1
+    write_l1_cache_token(token, response)
+    return response
+
+
+async def get_token_info_async( token: str ) -> dict:
+    response = await read_cache_token_async(token)
+    if not response:
+        if TOKEN_LOCK_TTL_MS > 0:
+            response = await token_flight.do(token, lambda: fetch_token_info_locked_async(token))
+        else:
+            response = await token_flight.do(token, lambda: fetch_token_info_async(token))
     return response
 
 
 def delete_cache_token( token: str ):
-    logging.info(f"Token : delete_cache_token")
+    logger.debug("Token : delete_cache_token")
+    token_l1_cache.delete(token)
     r.delete(token)
 
 
+async def delete_cache_token_async( token: str ):
+    logger.debug("Token : delete_cache_token_async")
+    token_l1_cache.delete(token)
+    await r_async.delete(token)
+
+
 def is_headers_token_present( request: Request ) -> bool:
     auth_header = request.headers.get("Authorization")
     if not auth_header:
@@ -111,11 +265,22 @@ def extract_token( request: Request ) -> str:
 
 
 def refresh_cache_token( request: Request ):
-    logging.info(f"Token : refresh_cache_token")
+    logger.debug("Token : refresh_cache_token")
     check_headers_token(request)
     token = extract_token(request)
-    delete_cache_token(token)
-    token_info = get_token_info(token)
+    # The fresh introspection result overwrites the cached entry with a single SET.
+    token_info = fetch_token_info(token)
+    check_token(token_info)
+    state_token_info = generate_state_info(token_info)
+    store_token_info_in_state(state_token_info, request)
+
+
+async def refresh_cache_token_async( request: Request ):
+    logger.debug("Token : refresh_cache_token_async")
+    check_headers_token(request)
+    token = extract_token(request)
+    # The fresh verification result overwrites the cached entry with a single SET.
+    token_info = await token_flight.do(token, lambda: fetch_token_info_async(token))
     check_token(token_info)
     state_token_info = generate_state_info(token_info)
     store_token_info_in_state(state_token_info, request)
@@ -140,24 +305,11 @@ def check_token( token_info ):
         raise HTTPException(status_code=401, detail="Token is not valid for this audience")
 
 
-class TokenVerificationMiddleware(BaseHTTPMiddleware):
-    def __init__( self, app ):
-        super().__init__(app)
-
-    @log_time_async
-    async def dispatch( self, request: Request, call_next ) -> Response:
-        logging.info("TokenVerificationMiddleware")
-
-        try:
-            if not is_unprotected_path(request.url.path):
-                check_headers_token(request)
-                token = extract_token(request)
-                token_info = get_token_info(token)
-                check_token(token_info)
-                state_token_info = generate_state_info(token_info)
-                store_token_info_in_state(state_token_info, request)
-            response = await call_next(request)
-            return response
-        except HTTPException as exc:
-            return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
-
+async def verify_token_request( request: Request ) -> None:
+    if not is_unprotected_request(request.scope):
+        check_headers_token(request)
+        token = extract_token(request)
+        token_info = await get_token_info_async(token)
+        check_token(token_info)
+        state_token_info = generate_state_info(token_info)
+        store_token_info_in_state(state_token_info, request)
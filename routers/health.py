@@ -0,0 +1,14 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from services.warmup_service import is_ready, warmup_status
+
+router = APIRouter()
+
+
+@router.get("/ready", include_in_schema=False)
+async def read_readiness():
+    """200 once the connection pools and caches are warm, 503 with the pending or failed steps until then."""
+    if is_ready():
+        return {"status": "ready", "checks": warmup_status}
+    return JSONResponse(status_code=503, content={"status": "warming", "checks": warmup_status})
@@ -16,8 +16,15 @@ MOUNT_POINT = os.getenv("VAULT_MOUNT", "secret")
 ENTITY_UUID = os.getenv("ENTITY_UUID", "fake-entity-uuid")
 LICENSE_UUID = os.getenv("LICENSE_UUID", "fake-license-uuid")
 
-# Initialise le client Vault
-client = hvac.Client(url=VAULT_URL, token=VAULT_TOKEN)
+# Client Vault, créé au premier appel
+client = None
+
+
+def get_client():
+    global client
+    if client is None:
+        client = hvac.Client(url=VAULT_URL, token=VAULT_TOKEN)
+    return client
 
 # FastAPI Router
 app = FastAPI()
@@ -37,7 +44,7 @@ def create_secret(secret_request: SecretRequest):
 
     try:
         # Check si déjà existant
-        existing = client.secrets.kv.v2.read_secret_version(
+        existing = get_client().secrets.kv.v2.read_secret_version(
             path=path, mount_point=MOUNT_POINT
         )
         return {
@@ -46,7 +53,7 @@ def create_secret(secret_request: SecretRequest):
         }
     except hvac.exceptions.InvalidPath:
         # Crée le secret
-        client.secrets.kv.v2.create_or_update_secret(
+        get_client().secrets.kv.v2.create_or_update_secret(
             path=path,
             mount_point=MOUNT_POINT,
             secret=secret_request.data
@@ -65,7 +72,7 @@ def get_secret(service: str):
     path = f"entities/{ENTITY_UUID}/licenses/{LICENSE_UUID}/{service}"
 
     try:
-        secret = client.secrets.kv.v2.read_secret_version(
+        secret = get_client().secrets.kv.v2.read_secret_version(
             path=path, mount_point=MOUNT_POINT
         )
         return {"data": secret["data"]["data"]}
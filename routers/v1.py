@@ -1,28 +1,105 @@
-from typing import Dict
+import json
+from collections import Counter
+from typing import Annotated, Dict, List
 
 from fastapi import APIRouter, HTTPException, Request, Depends
-from pydantic import BaseModel
+from fastapi.responses import StreamingResponse
+from pydantic import AfterValidator, BaseModel, Field, ValidationError
 
-from config.config import API_TAG_NAME
-from services.items_service import get_secret, create_secret
+from config.config import API_TAG_NAME, SECRET_BATCH_MAX_SIZE, SECRET_BATCH_WRITE_MAX_SIZE
+from services.items_service import get_secret_async, create_secret_async, get_secrets_async, \
+    create_secrets_async, iter_create_secrets_async
+from utils.path_util import is_path_segment
 
 VERSION = "v1"
 api_group_name = f"/{API_TAG_NAME}/{VERSION}/"
 
+def check_service_name(service: str) -> str:
+    # Service names from a body end up in the Vault path, like the {service} path parameter which cannot hold "/".
+    if not is_path_segment(service):
+        raise ValueError("Service name must not contain '/' or be '.' or '..'")
+    return service
+
+ServiceName = Annotated[str, AfterValidator(check_service_name)]
+
 class SecretRequest(BaseModel):
     data: Dict[str, str]
 
+class BatchReadRequest(BaseModel):
+    services: List[ServiceName] = Field(min_length=1)
+
+class SecretItem(BaseModel):
+    service: ServiceName = Field(min_length=1)
+    data: Dict[str, str]
+
+class BatchWriteRequest(BaseModel):
+    secrets: List[SecretItem] = Field(min_length=1)
+
+def check_batch_write(items: List[SecretItem]) -> None:
+    if len(items) > SECRET_BATCH_WRITE_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"Too many secrets, maximum is {SECRET_BATCH_WRITE_MAX_SIZE}")
+    counts = Counter(item.service for item in items)
+    duplicates = sorted(service for service, count in counts.items() if count > 1)
+    if duplicates:
+        raise HTTPException(status_code=400, detail=f"Duplicate services: {', '.join(duplicates)}")
+
+def parse_ndjson_secrets(body: bytes) -> List[SecretItem]:
+    items = []
+    errors = []
+    for line_number, line in enumerate(body.splitlines(), start=1):
+        if not line.strip():
+            continue
+        try:
+            items.append(SecretItem.model_validate_json(line))
+        except ValidationError as e:
+            errors.append({"line": line_number, "errors": [error["msg"] for error in e.errors()]})
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    if not items:
+        raise HTTPException(status_code=422, detail="No secrets provided")
+    return items
+
 router = APIRouter(
     tags=[api_group_name],
     prefix=f"/credential/{VERSION}"
 )
 
+@router.post("/batch")
+async def read_secrets(request: Request, batch_request: BatchReadRequest):
+    if len(batch_request.services) > SECRET_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=400, detail=f"Too many services, maximum is {SECRET_BATCH_MAX_SIZE}")
+    entity_uuid = request.state.entity_uuid
+    licence_uuid = request.state.licence_uuid
+
+    return await get_secrets_async(entity_uuid, licence_uuid, batch_request.services)
+
 @router.get("/{service}")
 async def read_secret(request: Request, service: str):
     entity_uuid = request.state.entity_uuid
     licence_uuid = request.state.licence_uuid
 
-    return get_secret(entity_uuid, licence_uuid, service)
+    return await get_secret_async(entity_uuid, licence_uuid, service)
+
+@router.post("/batch/{license_uuid}")
+async def create_new_secrets(request: Request, license_uuid: str, batch_request: BatchWriteRequest):
+    check_batch_write(batch_request.secrets)
+    entity_uuid = request.state.entity_uuid
+    secrets = [(item.service, item.data) for item in batch_request.secrets]
+
+    return {"results": await create_secrets_async(entity_uuid, license_uuid, secrets)}
+
+@router.post("/batch/{license_uuid}/stream")
+async def stream_new_secrets(request: Request, license_uuid: str):
+    items = parse_ndjson_secrets(await request.body())
+    check_batch_write(items)
+    entity_uuid = request.state.entity_uuid
+    secrets = [(item.service, item.data) for item in items]
+
+    async def stream_results():
+        async for status in iter_create_secrets_async(entity_uuid, license_uuid, secrets):
+            yield json.dumps(status) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
 
 @router.post("/{license_uuid}/{service}")
 async def create_new_secret(
@@ -33,4 +110,4 @@ async def create_new_secret(
 ):
     entity_uuid = request.state.entity_uuid
 
-    return create_secret(entity_uuid, license_uuid, service, secret_request)
+    return await create_secret_async(entity_uuid, license_uuid, service, secret_request)
@@ -1,14 +1,81 @@
 import redis
-from config.config import REDIS_DB, REDIS_HOST, REDIS_PASSWORD, REDIS_PORT
+import redis.asyncio as aioredis
+from config.config import REDIS_DB, REDIS_HOST, REDIS_PASSWORD, REDIS_PORT, REDIS_MAX_CONNECTIONS, REDIS_POOL_TIMEOUT, \
+    REDIS_SOCKET_TIMEOUT, REDIS_SOCKET_CONNECT_TIMEOUT, REDIS_HEALTH_CHECK_INTERVAL, REDIS_UNIX_SOCKET, REDIS_RESP3
 
+# One sync and one asyncio client per process, shared by every module. Both sit on a blocking pool, so a
+# burst of requests waits up to REDIS_POOL_TIMEOUT seconds for a connection instead of opening more than
+# REDIS_MAX_CONNECTIONS of them.
+redis_client: redis.Redis | None = None
+redis_async_client: aioredis.Redis | None = None
 
-def get_redis_api_db():
-    return redis.Redis(
-        host=REDIS_HOST,
-        db=REDIS_DB,
-        port=REDIS_PORT,
-        password=REDIS_PASSWORD,
-        decode_responses=True
+
+def get_redis_connection_kwargs() -> dict:
+    kwargs = {
+        "db": REDIS_DB,
+        "password": REDIS_PASSWORD,
+        "decode_responses": True,
+        "socket_timeout": REDIS_SOCKET_TIMEOUT,
+        "socket_connect_timeout": REDIS_SOCKET_CONNECT_TIMEOUT,
+        "health_check_interval": REDIS_HEALTH_CHECK_INTERVAL,
+        "protocol": 3 if REDIS_RESP3 else 2
+    }
+    if REDIS_UNIX_SOCKET:
+        kwargs["path"] = REDIS_UNIX_SOCKET
+    else:
+        kwargs["host"] = REDIS_HOST
+        kwargs["port"] = REDIS_PORT
+    return kwargs
+
+
+def create_redis_pool() -> redis.BlockingConnectionPool:
+    return redis.BlockingConnectionPool(
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        connection_class=redis.UnixDomainSocketConnection if REDIS_UNIX_SOCKET else redis.Connection,
+        **get_redis_connection_kwargs()
+    )
+
+
+def create_redis_async_pool() -> aioredis.BlockingConnectionPool:
+    return aioredis.BlockingConnectionPool(
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        connection_class=aioredis.UnixDomainSocketConnection if REDIS_UNIX_SOCKET else aioredis.Connection,
+        **get_redis_connection_kwargs()
     )
 
-r = get_redis_api_db()
\ No newline at end of file
+
+def get_redis_api_db() -> redis.Redis:
+    global redis_client
+    if redis_client is None:
+        redis_client = redis.Redis(connection_pool=create_redis_pool())
+    return redis_client
+
+
+def get_redis_async_api_db() -> aioredis.Redis:
+    global redis_async_client
+    if redis_async_client is None:
+        redis_async_client = aioredis.Redis(connection_pool=create_redis_async_pool())
+    return redis_async_client
+
+
+class LazyClient:
+    """Module-level stand-in for a client that is only created by its first command, so importing a module
+    builds no pool."""
+
+    def __init__( self, factory ):
+        self.factory = factory
+
+    def __getattr__( self, name: str ):
+        return getattr(self.factory(), name)
+
+
+async def close_redis_clients() -> None:
+    """Drop the pooled connections on shutdown; the clients reconnect on their next command."""
+    if redis_async_client is not None:
+        await redis_async_client.connection_pool.disconnect()
+    if redis_client is not None:
+        redis_client.connection_pool.disconnect()
+
+r = LazyClient(get_redis_api_db)
@@ -1,53 +1,161 @@
-import logging
-import hvac
-from hvac.exceptions import InvalidPath
+import asyncio
 from fastapi import HTTPException
-from typing import Dict
+from typing import AsyncIterator, Dict, List, Tuple
 
-from config.config import VAULT_HOST, VAULT_PORT, VAULT_TOKEN, VAULT_SECRET_PATH
-from services.inmemory_service import r
+from config.config import VAULT_SECRET_PATH, SECRET_CACHE_ENABLED, SECRET_CACHE_SIZE, SECRET_CACHE_TTL, \
+    SECRET_CACHE_MAX_STALENESS, SECRET_BATCH_WRITE_CONCURRENCY
+from services.metrics_service import register_collector
+from services.vault_service import vault_client_manager, run_in_vault_executor
+from utils.logger import get_logger
+from utils.path_util import is_path_segment
 
-def get_vault_token():
-    token = r.get("VAULT_TOKEN")
-    if token:
-        logging.info("Using VAULT_TOKEN from Redis")
-        return token
+logger = get_logger(__name__)
 
-    logging.info("VAULT_TOKEN not found in Redis, using from config")
-    r.set("VAULT_TOKEN", VAULT_TOKEN)
-    return VAULT_TOKEN
+secret_cache = None
+if SECRET_CACHE_ENABLED:
+    # Imported only when enabled: the cache cipher loads cryptography.
+    from services.secret_cache import SecretCache
 
-def get_vault_client():
-    return hvac.Client(url=f"{VAULT_HOST}:{VAULT_PORT}", token=get_vault_token())
+    secret_cache = SecretCache(
+        maxsize=SECRET_CACHE_SIZE,
+        ttl=SECRET_CACHE_TTL,
+        max_staleness=SECRET_CACHE_MAX_STALENESS
+    )
+    register_collector("secret_cache", secret_cache.stats)
+
+
+def get_secret_path(entity_uuid: str, licence_uuid: str, service: str) -> str:
+    # Each part must stay one segment: Vault resolves "..", which would reach another entity's secrets.
+    if not all(is_path_segment(segment) for segment in (entity_uuid, licence_uuid, service)):
+        raise HTTPException(status_code=400, detail="Invalid secret path")
+    return f"entities/{entity_uuid}/licenses/{licence_uuid}/{service}"
+
+def read_secret_version(path: str) -> dict:
+    return vault_client_manager.call(
+        lambda client: client.secrets.kv.v2.read_secret_version(path=path, mount_point=VAULT_SECRET_PATH)
+    )
+
+def read_secret_current_version(path: str):
+    metadata = vault_client_manager.call(
+        lambda client: client.secrets.kv.v2.read_secret_metadata(path=path, mount_point=VAULT_SECRET_PATH)
+    )
+    return metadata["data"].get("current_version")
+
+def read_cached_secret(key: tuple, path: str) -> Dict[str, str] | None:
+    entry = secret_cache.get(key)
+    if entry is None:
+        return None
+    if secret_cache.is_stale(entry):
+        if read_secret_current_version(path) != entry["version"]:
+            return None
+        secret_cache.mark_verified(entry)
+    return secret_cache.read(key, entry)
 
 def get_secret(entity_uuid: str, licence_uuid: str, service: str) -> Dict[str, str]:
-    logging.info(f"Getting secret for entity {entity_uuid}, license {licence_uuid}, service {service}")
-    path = f"entities/{entity_uuid}/licenses/{licence_uuid}/{service}"
+    from hvac.exceptions import InvalidPath
+
+    logger.info("Getting secret for entity %s, license %s, service %s", entity_uuid, licence_uuid, service)
+    path = get_secret_path(entity_uuid, licence_uuid, service)
+    key = (entity_uuid, licence_uuid, service)
 
     try:
-        client = get_vault_client()
-        secret = client.secrets.kv.v2.read_secret_version(
-            path=path, mount_point=VAULT_SECRET_PATH
-        )
+        if secret_cache is not None:
+            data = read_cached_secret(key, path)
+            if data is not None:
+                return data
+        secret = read_secret_version(path)
+        if secret_cache is not None:
+            secret_cache.set(key, secret["data"]["data"], secret["data"].get("metadata", {}).get("version"))
         return secret["data"]["data"]
     except InvalidPath:
+        if secret_cache is not None:
+            secret_cache.delete(key)
         raise HTTPException(status_code=404, detail="Secret not found")
     except Exception as e:
-        logging.error(f"Error retrieving secret: {str(e)}")
+        logger.error("Error retrieving secret", extra={"fields": {"service": service, "error": str(e)}})
         raise HTTPException(status_code=500, detail=str(e))
 
 def create_secret(entity_uuid: str, license_uuid: str, service: str, secret_data: Dict[str, str]) -> Dict[str, str]:
-    logging.info(f"Creating secret for entity {entity_uuid}, license {license_uuid}, service {service}")
-    path = f"entities/{entity_uuid}/licenses/{license_uuid}/{service}"
+    logger.info("Creating secret for entity %s, license %s, service %s", entity_uuid, license_uuid, service)
+    path = get_secret_path(entity_uuid, license_uuid, service)
+    key = (entity_uuid, license_uuid, service)
 
     try:
-        client = get_vault_client()
-        client.secrets.kv.v2.create_or_update_secret(
-            path=path,
-            mount_point=VAULT_SECRET_PATH,
-            secret=secret_data
+        if secret_cache is not None:
+            secret_cache.delete(key)
+        response = vault_client_manager.call(
+            lambda client: client.secrets.kv.v2.create_or_update_secret(
+                path=path,
+                mount_point=VAULT_SECRET_PATH,
+                secret=secret_data
+            )
         )
+        version = response.get("data", {}).get("version") if isinstance(response, dict) else None
+        if secret_cache is not None and version is not None:
+            secret_cache.set(key, secret_data, version)
         return {"message": "Secret recorded successfully"}
     except Exception as e:
-        logging.error(f"Error creating secret: {str(e)}")
+        logger.error("Error creating secret", extra={"fields": {"service": service, "error": str(e)}})
         raise HTTPException(status_code=500, detail=str(e))
+
+async def get_secret_async(entity_uuid: str, licence_uuid: str, service: str) -> Dict[str, str]:
+    return await run_in_vault_executor(get_secret, entity_uuid, licence_uuid, service)
+
+async def create_secret_async(entity_uuid: str, license_uuid: str, service: str, secret_data: Dict[str, str]) -> Dict[str, str]:
+    return await run_in_vault_executor(create_secret, entity_uuid, license_uuid, service, secret_data)
+
+async def get_secrets_async(entity_uuid: str, licence_uuid: str, services: List[str]) -> Dict[str, dict]:
+    """Read several services concurrently; a failing service is reported in "errors" instead of failing the batch."""
+    services = list(dict.fromkeys(services))
+    results = await asyncio.gather(
+        *(get_secret_async(entity_uuid, licence_uuid, service) for service in services),
+        return_exceptions=True
+    )
+    response = {"data": {}, "errors": {}}
+    for service, result in zip(services, results):
+        if isinstance(result, HTTPException):
+            response["errors"][service] = {"status_code": result.status_code, "detail": result.detail}
+        elif isinstance(result, Exception):
+            response["errors"][service] = {"status_code": 500, "detail": str(result)}
+        else:
+            response["data"][service] = result
+    return response
+
+def get_secret_write_status(service: str, result) -> dict:
+    if isinstance(result, HTTPException):
+        return {"service": service, "status_code": result.status_code, "detail": result.detail}
+    if isinstance(result, Exception):
+        return {"service": service, "status_code": 500, "detail": str(result)}
+    return {"service": service, "status_code": 200, "detail": result.get("message")}
+
+async def iter_create_secrets_async(
+    entity_uuid: str,
+    license_uuid: str,
+    secrets: List[Tuple[str, Dict[str, str]]]
+) -> AsyncIterator[dict]:
+    """Write secrets with at most SECRET_BATCH_WRITE_CONCURRENCY Vault calls in flight, yielding each status as it completes."""
+    semaphore = asyncio.Semaphore(SECRET_BATCH_WRITE_CONCURRENCY)
+
+    async def write(service: str, secret_data: Dict[str, str]) -> dict:
+        async with semaphore:
+            try:
+                result = await create_secret_async(entity_uuid, license_uuid, service, secret_data)
+            except Exception as e:
+                result = e
+        return get_secret_write_status(service, result)
+
+    tasks = [asyncio.ensure_future(write(service, secret_data)) for service, secret_data in secrets]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        for task in tasks:
+            task.cancel()
+
+async def create_secrets_async(
+    entity_uuid: str,
+    license_uuid: str,
+    secrets: List[Tuple[str, Dict[str, str]]]
+) -> List[dict]:
+    statuses = {status["service"]: status async for status in iter_create_secrets_async(entity_uuid, license_uuid, secrets)}
+    return [statuses[service] for service, _ in secrets]
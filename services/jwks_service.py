@@ -0,0 +1,106 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any
+
+from fastapi import HTTPException
+
+from config.config import KEYCLOAK_HOST, KEYCLOAK_REALM, JWKS_ALGORITHMS, JWKS_MIN_REFRESH_INTERVAL
+from services.http_service import get_http_client
+from utils.logger import get_logger
+
+# PyJWT loads cryptography, which only the local verification mode needs: it is imported on first use.
+if TYPE_CHECKING:
+    import jwt
+
+logger = get_logger(__name__)
+jwks_keys: dict[str, "jwt.PyJWK"] = {}
+jwks_fetched_at: float = 0.0
+jwks_lock = asyncio.Lock()
+
+
+def get_jwks_url() -> str:
+    return f"{KEYCLOAK_HOST}/realms/{KEYCLOAK_REALM}/protocol/openid-connect/certs"
+
+
+def parse_jwks( jwks: dict ) -> dict[str, "jwt.PyJWK"]:
+    import jwt
+
+    keys = {}
+    for jwk in jwks.get("keys", []):
+        if jwk.get("use", "sig") != "sig" or not jwk.get("kid"):
+            continue
+        try:
+            key = jwt.PyJWK(jwk)
+        except jwt.PyJWKError:
+            logger.warning("JWKS : skipping unsupported key %s", jwk.get('kid'))
+            continue
+        # PyJWK always resolves an algorithm (RS256 for an RSA key without "alg"): JWKS_ALGORITHMS is the allow-list.
+        if key.algorithm_name not in JWKS_ALGORITHMS:
+            logger.warning("JWKS : skipping key %s with disallowed algorithm %s", jwk.get('kid'), key.algorithm_name)
+            continue
+        keys[jwk["kid"]] = key
+    return keys
+
+
+def is_jwks_refresh_allowed() -> bool:
+    return time.monotonic() - jwks_fetched_at >= JWKS_MIN_REFRESH_INTERVAL or not jwks_keys
+
+
+async def fetch_jwks() -> None:
+    global jwks_keys, jwks_fetched_at
+    logger.info("JWKS : fetch_jwks")
+    response = await get_http_client().get(get_jwks_url())
+    jwks_fetched_at = time.monotonic()
+    if response.status_code != 200:
+        logger.warning("JWKS : fetch failed with status %s", response.status_code)
+        return
+    jwks_keys = parse_jwks(response.json())
+
+
+async def get_signing_key( kid: str ) -> "jwt.PyJWK | None":
+    key = jwks_keys.get(kid)
+    if key is not None:
+        return key
+    async with jwks_lock:
+        # Another request may have refreshed the set while we were waiting.
+        if kid not in jwks_keys and is_jwks_refresh_allowed():
+            await fetch_jwks()
+    return jwks_keys.get(kid)
+
+
+def get_unverified_kid( token: str ) -> str | None:
+    import jwt
+
+    try:
+        return jwt.get_unverified_header(token).get("kid")
+    except jwt.DecodeError:
+        return None
+
+
+def decode_token( token: str, key: "jwt.PyJWK" ) -> dict[str, Any]:
+    import jwt
+
+    # exp, iat and aud are left to check_token so both modes reject tokens with the same errors.
+    try:
+        claims = jwt.decode(
+            token,
+            key=key.key,
+            algorithms=[key.algorithm_name],
+            options={"verify_exp": False, "verify_iat": False, "verify_nbf": False, "verify_aud": False}
+        )
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Token signature is invalid")
+    claims["active"] = True
+    return claims
+
+
+async def verify_token_locally( token: str ) -> dict | None:
+    """Return the token claims, or None when the token cannot be checked against the realm JWKS."""
+    logger.debug("JWKS : verify_token_locally")
+    kid = get_unverified_kid(token)
+    if kid is None:
+        return None
+    key = await get_signing_key(kid)
+    if key is None:
+        return None
+    return decode_token(token, key)
@@ -0,0 +1,117 @@
+import functools
+import inspect
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Tuple
+
+from config.config import METRICS_BUCKETS_MS
+
+METRICS_PREFIX = "api_credential"
+
+
+class Histogram:
+    """Cumulative-at-export histogram of durations in nanoseconds; observe() is a bisect and three increments."""
+
+    def __init__( self, buckets_ns: Tuple[int, ...] ):
+        self.buckets_ns = buckets_ns
+        self.counts = [0] * (len(buckets_ns) + 1)
+        self.sum_ns = 0
+        self.count = 0
+
+    def observe( self, duration_ns: int ) -> None:
+        self.counts[bisect_left(self.buckets_ns, duration_ns)] += 1
+        self.sum_ns += duration_ns
+        self.count += 1
+
+
+buckets_ns = tuple(sorted(int(bucket * 1_000_000) for bucket in METRICS_BUCKETS_MS))
+histograms: Dict[str, Histogram] = {}
+counters: Dict[str, int] = {}
+collectors: Dict[str, Callable[[], dict]] = {}
+
+
+def observe( stage: str, duration_ns: int ) -> None:
+    histogram = histograms.get(stage)
+    if histogram is None:
+        histogram = histograms[stage] = Histogram(buckets_ns)
+    histogram.observe(duration_ns)
+
+
+def increment( name: str, value: int = 1 ) -> None:
+    counters[name] = counters.get(name, 0) + value
+
+
+def register_collector( name: str, collect: Callable[[], dict] ) -> None:
+    """Export the numeric values returned by collect() as <prefix>_<name>_<key> gauges at scrape time."""
+    collectors[name] = collect
+
+
+def timed( stage: str ):
+    """Record the duration of every call of the decorated (sync or async) function in the stage histogram."""
+    def decorator( func ):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper( *args, **kwargs ):
+                start = time.perf_counter_ns()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    observe(stage, time.perf_counter_ns() - start)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper( *args, **kwargs ):
+            start = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(stage, time.perf_counter_ns() - start)
+        return wrapper
+    return decorator
+
+
+def reset_metrics() -> None:
+    histograms.clear()
+    counters.clear()
+
+
+def format_seconds( duration_ns: int ) -> str:
+    return repr(duration_ns / 1_000_000_000)
+
+
+def render_histograms() -> list:
+    name = f"{METRICS_PREFIX}_stage_duration_seconds"
+    lines = [f"# HELP {name} Duration of the request processing stages.", f"# TYPE {name} histogram"]
+    for stage, histogram in sorted(histograms.items()):
+        cumulative = 0
+        for bucket, count in zip(histogram.buckets_ns, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{format_seconds(bucket)}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {format_seconds(histogram.sum_ns)}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+    return lines
+
+
+def render_counters() -> list:
+    lines = []
+    for counter, value in sorted(counters.items()):
+        name = f"{METRICS_PREFIX}_{counter}_total"
+        lines += [f"# TYPE {name} counter", f"{name} {value}"]
+    return lines
+
+
+def render_collectors() -> list:
+    lines = []
+    for collector, collect in sorted(collectors.items()):
+        for key, value in sorted(collect().items()):
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{METRICS_PREFIX}_{collector}_{key}"
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+    return lines
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition (format 0.0.4) of the histograms, counters and registered collectors."""
+    return "\n".join(render_histograms() + render_counters() + render_collectors()) + "\n"
@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+from typing import Any, Hashable
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from utils.cache_codec import encode_json, decode_json
+from utils.ttl_cache import TTLCache
+
+
+class SecretCache:
+    """Bounded in-memory cache of Vault secrets, encrypted with a key that never leaves the process.
+
+    Each entry remembers the KV v2 version it was read at and when that version was last confirmed
+    against Vault, so callers can re-check entries older than ``max_staleness`` seconds.
+    """
+
+    def __init__( self, maxsize: int, ttl: float, max_staleness: float ):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.max_staleness = max_staleness
+        self.cipher = AESGCM(AESGCM.generate_key(bit_length=256))
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_associated_data( key: Hashable ) -> bytes:
+        # Binding the ciphertext to its key stops an entry from being decrypted under another secret's key.
+        return repr(key).encode()
+
+    def encrypt( self, key: Hashable, data: dict ) -> bytes:
+        nonce = os.urandom(12)
+        return nonce + self.cipher.encrypt(nonce, encode_json(data).encode(), self.get_associated_data(key))
+
+    def decrypt( self, key: Hashable, ciphertext: bytes ) -> dict:
+        return decode_json(self.cipher.decrypt(ciphertext[:12], ciphertext[12:], self.get_associated_data(key)))
+
+    def get( self, key: Hashable ) -> dict | None:
+        with self.lock:
+            return self.entries.get(key)
+
+    def is_stale( self, entry: dict ) -> bool:
+        return time.monotonic() - entry["verified_at"] >= self.max_staleness
+
+    def mark_verified( self, entry: dict ) -> None:
+        entry["verified_at"] = time.monotonic()
+
+    def read( self, key: Hashable, entry: dict ) -> dict:
+        return self.decrypt(key, entry["ciphertext"])
+
+    def set( self, key: Hashable, data: dict, version: Any ) -> None:
+        entry = {"ciphertext": self.encrypt(key, data), "version": version, "verified_at": time.monotonic()}
+        with self.lock:
+            self.entries.set(key, entry)
+
+    def delete( self, key: Hashable ) -> None:
+        with self.lock:
+            self.entries.delete(key)
+
+    def stats( self ) -> dict:
+        with self.lock:
+            return self.entries.stats()
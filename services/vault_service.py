@@ -0,0 +1,127 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, TypeVar
+
+from config.config import VAULT_HOST, VAULT_PORT, VAULT_TOKEN, VAULT_POOL_SIZE, VAULT_TOKEN_TTL, VAULT_MAX_WORKERS
+from services.inmemory_service import r
+from services.metrics_service import timed
+from utils.logger import get_logger
+
+# hvac pulls in requests and most of its API tree; it is imported by the first Vault call (the start-up
+# warm-up, normally) rather than when the application is imported.
+if TYPE_CHECKING:
+    import hvac
+    import requests
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+def get_vault_token():
+    token = r.get("VAULT_TOKEN")
+    if token:
+        logger.info("Using VAULT_TOKEN from Redis")
+        return token
+
+    logger.info("VAULT_TOKEN not found in Redis, using from config")
+    r.set("VAULT_TOKEN", VAULT_TOKEN)
+    return VAULT_TOKEN
+
+
+def create_vault_session( pool_size: int ) -> "requests.Session":
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class VaultClientManager:
+    """Long-lived hvac client whose pooled HTTP session is shared by every request and thread.
+
+    The token is re-read at most every ``token_ttl`` seconds, and straight away when Vault rejects it.
+    """
+
+    def __init__( self, url: str, pool_size: int, token_ttl: int ):
+        self.url = url
+        self.pool_size = pool_size
+        self.token_ttl = token_ttl
+        self.client: "hvac.Client | None" = None
+        self.token_loaded_at = 0.0
+        self.lock = threading.Lock()
+
+    def is_token_expired( self ) -> bool:
+        return not self.client.token or time.monotonic() - self.token_loaded_at >= self.token_ttl
+
+    def load_token( self ) -> None:
+        self.client.token = get_vault_token()
+        self.token_loaded_at = time.monotonic()
+
+    def get_client( self ) -> "hvac.Client":
+        with self.lock:
+            if self.client is None:
+                import hvac
+                self.client = hvac.Client(url=self.url, session=create_vault_session(self.pool_size))
+            if self.is_token_expired():
+                self.load_token()
+            return self.client
+
+    def refresh_token( self ) -> None:
+        with self.lock:
+            if self.client is not None:
+                logger.info("Vault rejected the token, reloading it")
+                self.load_token()
+
+    def call( self, func: Callable[["hvac.Client"], T] ) -> T:
+        from hvac.exceptions import Forbidden, Unauthorized
+
+        try:
+            return func(self.get_client())
+        except (Unauthorized, Forbidden):
+            self.refresh_token()
+            return func(self.get_client())
+
+    def close( self ) -> None:
+        with self.lock:
+            if self.client is not None:
+                self.client.adapter.close()
+                self.client = None
+
+
+vault_client_manager = VaultClientManager(
+    url=f"{VAULT_HOST}:{VAULT_PORT}",
+    pool_size=VAULT_POOL_SIZE,
+    token_ttl=VAULT_TOKEN_TTL
+)
+
+
+vault_executor: ThreadPoolExecutor | None = None
+
+
+def get_vault_executor() -> ThreadPoolExecutor:
+    global vault_executor
+    if vault_executor is None:
+        vault_executor = ThreadPoolExecutor(max_workers=VAULT_MAX_WORKERS, thread_name_prefix="vault")
+    return vault_executor
+
+
+@timed("vault")
+async def run_in_vault_executor( func: Callable[..., T], *args: Any ) -> T:
+    """Run a blocking hvac call on the bounded Vault thread pool so the event loop keeps serving requests."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_vault_executor(), functools.partial(func, *args))
+
+
+def close_vault_client() -> None:
+    global vault_executor
+    if vault_executor is not None:
+        vault_executor.shutdown(wait=True)
+        vault_executor = None
+    vault_client_manager.close()
@@ -0,0 +1,150 @@
+import asyncio
+from typing import Awaitable, Callable
+
+from config.config import WARMUP_ENABLED, WARMUP_TIMEOUT, WARMUP_RETRY_INTERVAL, WARMUP_REDIS_CONNECTIONS, \
+    WARMUP_VAULT_CONNECTIONS, WARMUP_HTTP_CONNECTIONS, WARMUP_PRELOAD_ENABLED, WARMUP_PRELOAD_MAX_KEYS, \
+    WARMUP_HOT_KEYS_TTL, KEYCLOAK_HOST, KEYCLOAK_REALM, URL_API_GATEWAY, TOKEN_VERIFICATION_MODE
+from middlewares import licence_middleware, token_middleware
+from services.http_service import get_http_client
+from services.inmemory_service import get_redis_async_api_db
+from services.jwks_service import fetch_jwks
+from services.vault_service import vault_client_manager, run_in_vault_executor
+from utils.cache_codec import encode_cache_value, decode_cache_value
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+HOT_KEYS_CACHE_KEY = "warmup:hot_keys"
+PRELOAD_BATCH_SIZE = 50
+
+# Step name -> "pending", "ok" or the last error. The service reports ready once every step is "ok".
+warmup_status: dict[str, str] = {}
+warmup_task: asyncio.Task | None = None
+
+
+async def warm_redis() -> None:
+    # Concurrent PINGs make the pool open that many connections instead of one.
+    client = get_redis_async_api_db()
+    await asyncio.gather(*(client.ping() for _ in range(WARMUP_REDIS_CONNECTIONS)))
+
+
+def read_vault_health() -> None:
+    # get_client() also loads the Vault token, which reads it from the sync Redis client.
+    vault_client_manager.call(lambda client: client.sys.read_health_status(method="GET"))
+
+
+async def warm_vault() -> None:
+    await asyncio.gather(*(run_in_vault_executor(read_vault_health) for _ in range(WARMUP_VAULT_CONNECTIONS)))
+
+
+async def warm_http( url: str ) -> None:
+    # Any response proves the DNS lookup and handshake are done and leaves the connection in the pool.
+    client = get_http_client()
+    await asyncio.gather(*(client.get(url) for _ in range(WARMUP_HTTP_CONNECTIONS)))
+
+
+async def warm_keycloak() -> None:
+    if TOKEN_VERIFICATION_MODE == "local":
+        await fetch_jwks()
+    await warm_http(f"{KEYCLOAK_HOST}/realms/{KEYCLOAK_REALM}/.well-known/openid-configuration")
+
+
+async def warm_gateway() -> None:
+    await warm_http(URL_API_GATEWAY)
+
+
+def collect_hot_keys() -> dict:
+    """The tokens and licence owners most recently served from the in-process caches, newest last."""
+    owners = list(licence_middleware.licence_l1_cache.entries)
+    owners += [owner for owner in licence_middleware.licence_refresh_ahead.entries if owner not in owners]
+    return {
+        "tokens": list(token_middleware.token_l1_cache.entries)[-WARMUP_PRELOAD_MAX_KEYS:],
+        "owners": owners[-WARMUP_PRELOAD_MAX_KEYS:]
+    }
+
+
+async def save_hot_keys() -> None:
+    """Leave the hot keys in Redis on shutdown so the next process can preload them."""
+    if not WARMUP_PRELOAD_ENABLED:
+        return
+    hot_keys = collect_hot_keys()
+    if not hot_keys["tokens"] and not hot_keys["owners"]:
+        return
+    try:
+        await get_redis_async_api_db().set(HOT_KEYS_CACHE_KEY, encode_cache_value(hot_keys), ex=WARMUP_HOT_KEYS_TTL)
+    except Exception as e:
+        logger.warning("Warm-up : could not save the hot keys: %s", e)
+
+
+async def run_in_batches( read: Callable[[str], Awaitable], keys: list ) -> None:
+    for start in range(0, len(keys), PRELOAD_BATCH_SIZE):
+        await asyncio.gather(*(read(key) for key in keys[start:start + PRELOAD_BATCH_SIZE]))
+
+
+async def preload_hot_keys() -> None:
+    """Copy the cached token info and licence sets of the saved hot keys from Redis into the local caches."""
+    cached_result = await get_redis_async_api_db().get(HOT_KEYS_CACHE_KEY)
+    if cached_result is None:
+        return
+    hot_keys = decode_cache_value(cached_result)
+    tokens = hot_keys.get("tokens", [])[-WARMUP_PRELOAD_MAX_KEYS:]
+    owners = hot_keys.get("owners", [])[-WARMUP_PRELOAD_MAX_KEYS:]
+    await run_in_batches(token_middleware.read_cache_token_async, tokens)
+    await run_in_batches(licence_middleware.read_cache_licences_async, owners)
+    logger.info("Warm-up : preloaded %s tokens and %s licence sets", len(tokens), len(owners))
+
+
+def get_warmup_steps() -> dict[str, Callable[[], Awaitable[None]]]:
+    steps = {
+        "redis": warm_redis,
+        "vault": warm_vault,
+        "keycloak": warm_keycloak,
+        "gateway": warm_gateway
+    }
+    if WARMUP_PRELOAD_ENABLED:
+        steps["preload"] = preload_hot_keys
+    return steps
+
+
+async def run_step( name: str, step: Callable[[], Awaitable[None]] ) -> None:
+    try:
+        await asyncio.wait_for(step(), timeout=WARMUP_TIMEOUT)
+    except Exception as e:
+        warmup_status[name] = f"{type(e).__name__}: {e}"
+        logger.warning("Warm-up : %s failed: %s", name, warmup_status[name])
+        return
+    warmup_status[name] = "ok"
+
+
+async def run_warmup() -> None:
+    """Run every warm-up step concurrently, then retry the failed ones until all of them succeeded."""
+    steps = get_warmup_steps()
+    for name in steps:
+        warmup_status.setdefault(name, "pending")
+    while True:
+        pending = [name for name, status in warmup_status.items() if status != "ok"]
+        await asyncio.gather(*(run_step(name, steps[name]) for name in pending))
+        if is_ready():
+            logger.info("Warm-up : ready")
+            return
+        await asyncio.sleep(WARMUP_RETRY_INTERVAL)
+
+
+def is_ready() -> bool:
+    return all(status == "ok" for status in warmup_status.values())
+
+
+def start_warmup() -> None:
+    global warmup_task
+    if WARMUP_ENABLED and warmup_task is None:
+        # Marked pending before the task first runs, so /ready cannot answer ready in between.
+        warmup_status.update({name: "pending" for name in get_warmup_steps()})
+        warmup_task = asyncio.ensure_future(run_warmup())
+
+
+async def stop_warmup() -> None:
+    global warmup_task
+    if warmup_task is not None:
+        warmup_task.cancel()
+        await asyncio.gather(warmup_task, return_exceptions=True)
+        warmup_task = None
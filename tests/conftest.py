@@ -1,5 +1,10 @@
+import tests.env_setup
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+
+from middlewares.token_middleware import token_l1_cache
+from middlewares.licence_middleware import licence_l1_cache, licence_negative_cache, licence_refreshed_users, \
+    licence_refresh_ahead
 
 @pytest.fixture(autouse=True)
 def mock_redis():
@@ -9,8 +14,26 @@ def mock_redis():
     mock_redis_instance.set.return_value = True
     mock_redis_instance.delete.return_value = True
 
+    mock_async_redis_instance = AsyncMock()
+    mock_async_redis_instance.get.return_value = None
+    mock_async_redis_instance.set.return_value = True
+    mock_async_redis_instance.delete.return_value = True
+
     with patch('redis.Redis', return_value=mock_redis_instance), \
          patch('services.inmemory_service.get_redis_api_db', return_value=mock_redis_instance), \
-         patch('middlewares.licence_middleware.r', mock_redis_instance), \
-         patch('middlewares.token_middleware.r', mock_redis_instance):
+         patch('middlewares.token_middleware.r', mock_redis_instance), \
+         patch('middlewares.licence_middleware.r_async', mock_async_redis_instance), \
+         patch('middlewares.token_middleware.r_async', mock_async_redis_instance):
         yield mock_redis_instance
+
+
+@pytest.fixture(autouse=True)
+def clear_local_caches():
+    """Keep the in-process caches from leaking entries between tests."""
+    local_caches = [token_l1_cache, licence_l1_cache, licence_negative_cache, licence_refreshed_users,
+                    licence_refresh_ahead.entries]
+    for cache in local_caches:
+        cache.clear()
+    yield
+    for cache in local_caches:
+        cache.clear()
@@ -0,0 +1,20 @@
+"""Local stand-ins for the services api-credential depends on, with injectable latency and failures.
+
+They run in-process (ASGI apps behind httpx.ASGITransport, a requests adapter for hvac, a dict for Redis),
+so tests and benchmarks can check timing-dependent behaviour such as caching and request coalescing
+without a network.
+"""
+from tests.fakes.behaviour import Behaviour
+from tests.fakes.gateway import LicenceGatewayStub
+from tests.fakes.transport import HostRoutingTransport, build_http_client
+from tests.fakes.keycloak import KeycloakStub
+from tests.fakes.redis_store import FakeRedis, FakeAsyncRedis
+
+
+def __getattr__( name: str ):
+    # The Vault stand-in loads hvac and requests, which the application only imports on its first Vault call:
+    # it is imported on first use so a cold-start measurement can load the other stand-ins without them.
+    if name in ("VaultStub", "VaultStubAdapter"):
+        from tests.fakes import vault
+        return getattr(vault, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
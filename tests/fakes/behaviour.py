@@ -0,0 +1,33 @@
+import asyncio
+import random
+import time
+
+
+class Behaviour:
+    """Latency and failure injection shared by the stand-ins.
+
+    Each call waits latency seconds, then fails with probability error_rate. The draws come from a private
+    random.Random(seed), so a seeded behaviour fails on the same calls in every run.
+    """
+
+    def __init__( self, latency: float = 0.0, error_rate: float = 0.0, seed: int | None = 0 ):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.errors = 0
+
+    def fails( self ) -> bool:
+        self.calls += 1
+        failed = self.error_rate > 0 and self.random.random() < self.error_rate
+        if failed:
+            self.errors += 1
+        return failed
+
+    async def wait( self ) -> None:
+        if self.latency > 0:
+            await asyncio.sleep(self.latency)
+
+    def wait_sync( self ) -> None:
+        if self.latency > 0:
+            time.sleep(self.latency)
@@ -0,0 +1,50 @@
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from tests.fakes.behaviour import Behaviour
+
+
+class LicenceGatewayStub:
+    """ASGI stand-in for the gateway /license/v1/mine endpoint.
+
+    Every caller owns payload_size licences, licence-0 to licence-<n-1>, each granting api_roles on the
+    credential API and expiring licence_ttl seconds from now.
+    """
+
+    def __init__( self, behaviour: Behaviour | None = None, payload_size: int = 5, licence_ttl: int = 86400 ):
+        self.behaviour = behaviour or Behaviour()
+        self.payload_size = payload_size
+        self.licence_ttl = licence_ttl
+        self.requests = 0
+        self.app = self.build_app()
+
+    def build_licence( self, index: int ) -> dict:
+        now = int(time.time())
+        return {
+            "uuid": f"licence-{index}",
+            "type_uuid": "type-1",
+            "name": f"Licence {index}",
+            "iat": now - 86400,
+            "exp": now + self.licence_ttl,
+            "entity_uuid": f"entity-{index}",
+            "api_roles": [{"api": "credential", "roles": ["read", "write"]}],
+            "app_roles": [],
+            "apps": ["app-1"],
+        }
+
+    def build_app( self ) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/license/v1/mine")
+        async def licences( request: Request ):
+            self.requests += 1
+            await self.behaviour.wait()
+            if self.behaviour.fails():
+                return JSONResponse(status_code=500, content={"error": "stand-in failure"})
+            if not request.headers.get("Authorization", "").startswith("Bearer "):
+                return JSONResponse(status_code=401, content={"error": "missing bearer token"})
+            return {"data": [self.build_licence(i) for i in range(self.payload_size)]}
+
+        return app
@@ -0,0 +1,108 @@
+import json
+import time
+from urllib.parse import parse_qs
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from tests.fakes.behaviour import Behaviour
+
+
+class KeycloakStub:
+    """ASGI stand-in for the realm token introspection, JWKS (certs) and discovery endpoints.
+
+    Any token is active unless it was revoked; tokens minted with issue_token() introspect to their claims
+    and verify against the published key. payload_size pads the claims with that many realm roles.
+    """
+
+    def __init__(
+            self,
+            realm: str = "karned",
+            behaviour: Behaviour | None = None,
+            payload_size: int = 0,
+            audience: tuple = ("karned", "account"),
+            token_ttl: int = 3600,
+            kid: str = "stand-in"
+    ):
+        self.realm = realm
+        self.behaviour = behaviour or Behaviour()
+        self.payload_size = payload_size
+        self.audience = list(audience)
+        self.token_ttl = token_ttl
+        self.kid = kid
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        self.issued: dict[str, dict] = {}
+        self.revoked: set[str] = set()
+        self.introspections = 0
+        self.jwks_requests = 0
+        self.discovery_requests = 0
+        self.app = self.build_app()
+
+    def build_claims( self, subject: str ) -> dict:
+        now = int(time.time())
+        claims = {
+            "sub": subject,
+            "preferred_username": subject,
+            "email": f"{subject}@karned.bzh",
+            "aud": self.audience,
+            "iat": now - 60,
+            "exp": now + self.token_ttl,
+        }
+        if self.payload_size > 0:
+            claims["realm_access"] = {"roles": [f"role-{i}" for i in range(self.payload_size)]}
+        return claims
+
+    def issue_token( self, subject: str, **claims ) -> str:
+        """A token signed with the published key, for the local verification mode."""
+        payload = {**self.build_claims(subject), **claims}
+        token = jwt.encode(payload, self.private_key, algorithm="RS256", headers={"kid": self.kid})
+        self.issued[token] = payload
+        return token
+
+    def introspect( self, token: str ) -> dict:
+        if token in self.revoked:
+            return {"active": False}
+        claims = self.issued.get(token) or self.build_claims(f"user-{token}")
+        return {"active": True, **claims}
+
+    def jwks( self ) -> dict:
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(self.private_key.public_key()))
+        jwk.update({"kid": self.kid, "use": "sig", "alg": "RS256"})
+        return {"keys": [jwk]}
+
+    def build_app( self ) -> FastAPI:
+        app = FastAPI()
+        prefix = f"/realms/{self.realm}/protocol/openid-connect"
+
+        @app.post(f"{prefix}/token/introspect")
+        async def introspect( request: Request ):
+            self.introspections += 1
+            await self.behaviour.wait()
+            if self.behaviour.fails():
+                return JSONResponse(status_code=500, content={"error": "stand-in failure"})
+            # Parsed by hand: FastAPI forms need python-multipart, which the service does not depend on.
+            token = parse_qs((await request.body()).decode()).get("token", [""])[0]
+            return self.introspect(token)
+
+        @app.get(f"{prefix}/certs")
+        async def certs():
+            self.jwks_requests += 1
+            await self.behaviour.wait()
+            if self.behaviour.fails():
+                return JSONResponse(status_code=500, content={"error": "stand-in failure"})
+            return self.jwks()
+
+        @app.get(f"/realms/{self.realm}/.well-known/openid-configuration")
+        async def discovery( request: Request ):
+            self.discovery_requests += 1
+            await self.behaviour.wait()
+            issuer = f"{request.base_url}realms/{self.realm}"
+            return {
+                "issuer": issuer,
+                "introspection_endpoint": f"{issuer}/protocol/openid-connect/token/introspect",
+                "jwks_uri": f"{issuer}/protocol/openid-connect/certs"
+            }
+
+        return app
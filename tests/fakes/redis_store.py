@@ -0,0 +1,145 @@
+import time
+from typing import Callable
+
+from redis.exceptions import ConnectionError
+
+from tests.fakes.behaviour import Behaviour
+
+
+class FakeRedis:
+    """Dict-backed stand-in for the redis.Redis commands the service uses (decode_responses=True).
+
+    Values are stored as strings, like Redis returns them to the service. Expiry is read from clock, which
+    tests can replace to move time forward without sleeping. payload_size has no meaning here: the stored
+    values are whatever the service writes.
+    """
+
+    def __init__( self, behaviour: Behaviour | None = None, clock: Callable[[], float] = time.monotonic ):
+        self.behaviour = behaviour or Behaviour()
+        self.clock = clock
+        self.values: dict[str, tuple[str, float | None]] = {}
+        self.commands: dict[str, int] = {}
+
+    def command( self, name: str ) -> None:
+        self.commands[name] = self.commands.get(name, 0) + 1
+        if self.behaviour.fails():
+            raise ConnectionError("stand-in failure")
+
+    def live( self, key: str ) -> tuple[str, float | None] | None:
+        item = self.values.get(key)
+        if item is not None and item[1] is not None and item[1] <= self.clock():
+            del self.values[key]
+            return None
+        return item
+
+    def encode( self, value ) -> str:
+        if isinstance(value, bytes):
+            return value.decode()
+        return str(value)
+
+    def execute_get( self, key: str ) -> str | None:
+        self.command("get")
+        item = self.live(key)
+        return item[0] if item is not None else None
+
+    def execute_set( self, key, value, ex=None, px=None, nx=False, xx=False, keepttl=False ) -> bool | None:
+        self.command("set")
+        item = self.live(key)
+        if (nx and item is not None) or (xx and item is None):
+            return None
+        expires_at = item[1] if keepttl and item is not None else None
+        if ex is not None:
+            expires_at = self.clock() + ex
+        if px is not None:
+            expires_at = self.clock() + px / 1000
+        self.values[key] = (self.encode(value), expires_at)
+        return True
+
+    def execute_exists( self, *keys: str ) -> int:
+        self.command("exists")
+        return sum(self.live(key) is not None for key in keys)
+
+    def execute_delete( self, *keys: str ) -> int:
+        self.command("delete")
+        return sum(self.values.pop(key, None) is not None for key in keys)
+
+    def execute_ttl( self, key: str ) -> int:
+        self.command("ttl")
+        item = self.live(key)
+        if item is None:
+            return -2
+        if item[1] is None:
+            return -1
+        return max(0, round(item[1] - self.clock()))
+
+    def ping( self ) -> bool:
+        self.behaviour.wait_sync()
+        self.command("ping")
+        return True
+
+    def get( self, key: str ) -> str | None:
+        self.behaviour.wait_sync()
+        return self.execute_get(key)
+
+    def set( self, key, value, ex=None, px=None, nx=False, xx=False, keepttl=False ) -> bool | None:
+        self.behaviour.wait_sync()
+        return self.execute_set(key, value, ex=ex, px=px, nx=nx, xx=xx, keepttl=keepttl)
+
+    def exists( self, *keys: str ) -> int:
+        self.behaviour.wait_sync()
+        return self.execute_exists(*keys)
+
+    def delete( self, *keys: str ) -> int:
+        self.behaviour.wait_sync()
+        return self.execute_delete(*keys)
+
+    def ttl( self, key: str ) -> int:
+        self.behaviour.wait_sync()
+        return self.execute_ttl(key)
+
+    def flushdb( self ) -> bool:
+        self.values.clear()
+        return True
+
+
+class FakeAsyncRedis:
+    """redis.asyncio.Redis counterpart of FakeRedis; both can share one store to mirror r and r_async."""
+
+    def __init__( self, store: FakeRedis | None = None ):
+        self.store = store or FakeRedis()
+
+    @property
+    def values( self ) -> dict:
+        return self.store.values
+
+    @property
+    def commands( self ) -> dict:
+        return self.store.commands
+
+    async def ping( self ) -> bool:
+        await self.store.behaviour.wait()
+        self.store.command("ping")
+        return True
+
+    async def get( self, key: str ) -> str | None:
+        await self.store.behaviour.wait()
+        return self.store.execute_get(key)
+
+    async def set( self, key, value, ex=None, px=None, nx=False, xx=False, keepttl=False ) -> bool | None:
+        await self.store.behaviour.wait()
+        return self.store.execute_set(key, value, ex=ex, px=px, nx=nx, xx=xx, keepttl=keepttl)
+
+    async def exists( self, *keys: str ) -> int:
+        await self.store.behaviour.wait()
+        return self.store.execute_exists(*keys)
+
+    async def delete( self, *keys: str ) -> int:
+        await self.store.behaviour.wait()
+        return self.store.execute_delete(*keys)
+
+    async def ttl( self, key: str ) -> int:
+        await self.store.behaviour.wait()
+        return self.store.execute_ttl(key)
+
+    async def flushdb( self ) -> bool:
+        return self.store.flushdb()
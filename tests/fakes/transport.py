@@ -0,0 +1,23 @@
+from urllib.parse import urlsplit
+
+import httpx
+
+
+class HostRoutingTransport(httpx.AsyncBaseTransport):
+    """Send each request to the ASGI app registered for its host; unknown hosts answer 502."""
+
+    def __init__( self, apps: dict ):
+        self.transports = {host: httpx.ASGITransport(app=app) for host, app in apps.items()}
+
+    async def handle_async_request( self, request: httpx.Request ) -> httpx.Response:
+        transport = self.transports.get(request.url.host)
+        if transport is None:
+            return httpx.Response(502, json={"error": f"no stand-in for {request.url.host}"})
+        return await transport.handle_async_request(request)
+
+
+def build_http_client( apps: dict ) -> httpx.AsyncClient:
+    """An AsyncClient for services.http_service that reaches the stand-ins, keyed by URL or host name."""
+    return httpx.AsyncClient(transport=HostRoutingTransport({
+        urlsplit(url).hostname if "://" in url else url: app for url, app in apps.items()
+    }))
@@ -0,0 +1,146 @@
+import json
+import threading
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+import hvac
+import requests
+from requests.adapters import BaseAdapter
+
+from tests.fakes.behaviour import Behaviour
+
+VAULT_URL = "http://vault.stand-in:8200"
+
+
+class VaultStub:
+    """In-memory KV v2 secrets engine answering the hvac read, metadata, create-or-update and health calls.
+
+    client() returns a real hvac.Client whose requests.Session is served by the stub, so the hvac request
+    and response handling stays in the measured path. Unknown paths answer 404 unless generate_missing is
+    set, in which case they read as a generated secret of payload_size keys. When token is set, requests
+    carrying another X-Vault-Token answer 403.
+    """
+
+    def __init__(
+            self,
+            mount: str = "secret",
+            behaviour: Behaviour | None = None,
+            payload_size: int = 2,
+            generate_missing: bool = False,
+            token: str | None = None
+    ):
+        self.mount = mount
+        self.behaviour = behaviour or Behaviour()
+        self.payload_size = payload_size
+        self.generate_missing = generate_missing
+        self.token = token
+        self.secrets: dict[str, list[dict]] = {}
+        self.reads = 0
+        self.writes = 0
+        self.health_checks = 0
+        self.lock = threading.Lock()
+
+    def put( self, path: str, data: dict ) -> int:
+        """Store a new version of the secret at path and return its version number."""
+        with self.lock:
+            versions = self.secrets.setdefault(path, [])
+            versions.append({
+                "data": dict(data),
+                "created_time": datetime.now(timezone.utc).isoformat(),
+                "version": len(versions) + 1
+            })
+            return len(versions)
+
+    def generate_secret( self ) -> dict:
+        return {f"key-{i}": f"value-{i}" for i in range(self.payload_size)}
+
+    def version_metadata( self, version: dict ) -> dict:
+        return {
+            "created_time": version["created_time"],
+            "deletion_time": "",
+            "destroyed": False,
+            "version": version["version"]
+        }
+
+    def read( self, path: str ) -> tuple[int, dict]:
+        self.reads += 1
+        versions = self.secrets.get(path)
+        if not versions:
+            if not self.generate_missing:
+                return 404, {"errors": []}
+            return 200, {"data": {
+                "data": self.generate_secret(),
+                "metadata": {"created_time": "", "deletion_time": "", "destroyed": False, "version": 1}
+            }}
+        latest = versions[-1]
+        return 200, {"data": {"data": dict(latest["data"]), "metadata": self.version_metadata(latest)}}
+
+    def read_metadata( self, path: str ) -> tuple[int, dict]:
+        self.reads += 1
+        versions = self.secrets.get(path)
+        if not versions:
+            return 404, {"errors": []}
+        return 200, {"data": {
+            "current_version": len(versions),
+            "versions": {str(version["version"]): self.version_metadata(version) for version in versions}
+        }}
+
+    def write( self, path: str, body: dict ) -> tuple[int, dict]:
+        self.writes += 1
+        version = self.put(path, body.get("data", {}))
+        return 200, {"data": self.version_metadata(self.secrets[path][version - 1])}
+
+    def handle( self, method: str, path: str, token: str | None, body: dict | None ) -> tuple[int, dict]:
+        self.behaviour.wait_sync()
+        if self.behaviour.fails():
+            return 500, {"errors": ["stand-in failure"]}
+        if path == "/v1/sys/health":
+            self.health_checks += 1
+            return 200, {"initialized": True, "sealed": False, "standby": False}
+        if self.token is not None and token != self.token:
+            return 403, {"errors": ["permission denied"]}
+
+        data_prefix = f"/v1/{self.mount}/data/"
+        metadata_prefix = f"/v1/{self.mount}/metadata/"
+        if path.startswith(data_prefix) and method == "GET":
+            return self.read(path[len(data_prefix):])
+        if path.startswith(data_prefix) and method in ("POST", "PUT"):
+            return self.write(path[len(data_prefix):], body or {})
+        if path.startswith(metadata_prefix) and method == "GET":
+            return self.read_metadata(path[len(metadata_prefix):])
+        return 404, {"errors": []}
+
+    def session( self ) -> requests.Session:
+        session = requests.Session()
+        adapter = VaultStubAdapter(self)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def client( self, token: str = "stand-in" ) -> hvac.Client:
+        return hvac.Client(url=VAULT_URL, token=token, session=self.session())
+
+
+class VaultStubAdapter(BaseAdapter):
+    """requests transport adapter answering every request from a VaultStub instead of the network."""
+
+    def __init__( self, stub: VaultStub ):
+        super().__init__()
+        self.stub = stub
+
+    def send( self, request: requests.PreparedRequest, **kwargs ) -> requests.Response:
+        body = json.loads(request.body) if request.body else None
+        status, payload = self.stub.handle(
+            request.method, urlsplit(request.url).path, request.headers.get("X-Vault-Token"), body
+        )
+        response = requests.Response()
+        response.status_code = status
+        response._content = json.dumps(payload).encode()
+        response.headers["Content-Type"] = "application/json"
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close( self ) -> None:
+        pass
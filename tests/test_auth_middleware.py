@@ -0,0 +1,117 @@
+import tests.env_setup
+import time
+import pytest
+from unittest.mock import patch, AsyncMock
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from middlewares.auth_middleware import AuthVerificationMiddleware
+
+
+def build_token_info():
+    now = int(time.time())
+    return {
+        "sub": "user-123",
+        "preferred_username": "test_user",
+        "email": "test@example.com",
+        "aud": "karned",
+        "iat": now - 60,
+        "exp": now + 3600
+    }
+
+
+def build_cache_licences():
+    return {
+        "licenses": [{"uuid": "test-license", "entity_uuid": "test-entity"}],
+        "licenses_index": {"test-license": 0}
+    }
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(AuthVerificationMiddleware)
+
+    @app.get("/protected")
+    async def protected(request: Request):
+        return {
+            "user_uuid": request.state.user_uuid,
+            "licence_uuid": request.state.licence_uuid,
+            "entity_uuid": request.state.entity_uuid,
+            "user_display_name": request.state.token_info["user_display_name"]
+        }
+
+    @app.get("/docs-page")
+    async def unprotected():
+        return {"ok": True}
+
+    return TestClient(app)
+
+
+@pytest.fixture
+def token_info():
+    token_info = build_token_info()
+    with patch('middlewares.token_middleware.get_token_info_async', new_callable=AsyncMock) as mock_get_token_info, \
+         patch('middlewares.licence_middleware.read_cache_licences_async', new_callable=AsyncMock) as mock_read_cache:
+        mock_get_token_info.return_value = token_info
+        mock_read_cache.return_value = build_cache_licences()
+        yield mock_get_token_info
+
+
+class TestAuthVerificationMiddleware:
+    def test_protected_path_sets_state(self, client, token_info):
+        # Act
+        response = client.get(
+            "/protected",
+            headers={"Authorization": "Bearer test-token", "X-License-Key": "test-license"}
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == {
+            "user_uuid": "user-123",
+            "licence_uuid": "test-license",
+            "entity_uuid": "test-entity",
+            "user_display_name": "test_user"
+        }
+        token_info.assert_awaited_once_with("test-token")
+
+    def test_missing_token(self, client, token_info):
+        # Act
+        response = client.get("/protected", headers={"X-License-Key": "test-license"})
+
+        # Assert
+        assert response.status_code == 401
+        assert response.json() == {"detail": "Token manquant ou invalide"}
+        token_info.assert_not_called()
+
+    def test_missing_licence_header(self, client, token_info):
+        # Act
+        response = client.get("/protected", headers={"Authorization": "Bearer test-token"})
+
+        # Assert
+        assert response.status_code == 403
+        assert response.json() == {"detail": "Licence header missing"}
+
+    def test_unknown_licence(self, client, token_info):
+        # Act
+        with patch('middlewares.licence_middleware.prepare_licences_async', new_callable=AsyncMock) as mock_prepare:
+            mock_prepare.return_value = []
+            response = client.get(
+                "/protected",
+                headers={"Authorization": "Bearer test-token", "X-License-Key": "other-license"}
+            )
+
+        # Assert
+        assert response.status_code == 403
+        assert response.json() == {"detail": "Licence not found"}
+
+    def test_unprotected_path(self, client, token_info):
+        # Act
+        with patch('middlewares.token_middleware.is_unprotected_request', return_value=True), \
+             patch('middlewares.licence_middleware.is_unprotected_request', return_value=True):
+            response = client.get("/docs-page")
+
+        # Assert
+        assert response.status_code == 200
+        token_info.assert_not_called()
@@ -0,0 +1,45 @@
+import tests.env_setup
+import pytest
+
+from utils.cache_codec import (
+    JSON_CODEC_VERSION,
+    register_codec,
+    encode_cache_value,
+    decode_cache_value,
+    is_legacy_cache_value
+)
+
+
+class TestCacheCodec:
+    def test_round_trip(self):
+        # Arrange
+        value = {"sub": "user-123", "aud": ["karned"], "exp": 1234567890, "licenses": [{"uuid": "l-1"}]}
+
+        # Act
+        payload = encode_cache_value(value)
+
+        # Assert
+        assert payload.startswith(JSON_CODEC_VERSION)
+        assert decode_cache_value(payload) == value
+        assert is_legacy_cache_value(payload) is False
+
+    def test_decode_legacy_repr(self):
+        # Arrange
+        value = {"sub": "user-123", "active": True, "licenses": None}
+
+        # Act
+        result = decode_cache_value(str(value))
+
+        # Assert
+        assert result == value
+        assert is_legacy_cache_value(str(value)) is True
+
+    def test_decode_legacy_rejects_code(self):
+        # Act & Assert
+        with pytest.raises(ValueError):
+            decode_cache_value("__import__('os').system('true')")
+
+    def test_register_codec_rejects_legacy_marker(self):
+        # Act & Assert
+        with pytest.raises(ValueError):
+            register_codec("{", str, str)
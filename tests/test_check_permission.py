@@ -50,13 +50,13 @@ class TestCheckPermission:
             return "success"
         
         # Act
-        with patch('decorators.check_permission.logging') as mock_logging:
+        with patch('decorators.check_permission.logger') as mock_logging:
             result = await test_function(mock_request)
         
         # Assert
         assert result == "success"
-        mock_logging.info.assert_any_call("Checking permissions ['user']")
-        mock_logging.info.assert_any_call(f"License: {mock_request}")
+        mock_logging.debug.assert_any_call("Checking permissions %s", ["user"])
+        mock_logging.debug.assert_any_call("License: %s", mock_request)
     
     @pytest.mark.asyncio
     async def test_check_permissions_decorator_failure(self):
@@ -70,11 +70,11 @@ class TestCheckPermission:
             return "success"
         
         # Act & Assert
-        with patch('decorators.check_permission.logging') as mock_logging:
+        with patch('decorators.check_permission.logger') as mock_logging:
             with pytest.raises(HTTPException) as exc_info:
                 await test_function(mock_request)
         
         assert exc_info.value.status_code == 403
         assert "Insufficient permissions" in exc_info.value.detail
-        mock_logging.info.assert_any_call("Checking permissions ['admin']")
-        mock_logging.info.assert_any_call(f"License: {mock_request}")
\ No newline at end of file
+        mock_logging.debug.assert_any_call("Checking permissions %s", ["admin"])
+        mock_logging.debug.assert_any_call("License: %s", mock_request)
\ No newline at end of file
@@ -0,0 +1,17 @@
+import tests.env_setup
+import os
+
+from benchmarks.bench_cold_start import measure_cold_start
+
+
+class TestColdStart:
+    def test_deferred_imports_and_clients(self):
+        # The wall-clock budgets live in benchmarks/bench_cold_start.py: a loaded CI runner would make them flaky.
+        # Act
+        cold_start = measure_cold_start(dict(os.environ))
+
+        # Assert
+        assert cold_start["status"] == 200, cold_start
+        assert cold_start["import_modules"] == [], cold_start
+        assert cold_start["redis_clients"] == [False, False], cold_start
+        assert cold_start["first_request_modules"] == ["hvac", "requests"], cold_start
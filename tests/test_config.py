@@ -0,0 +1,111 @@
+import tests.env_setup
+import os
+import pytest
+
+import config.config as config
+from config.config import load_settings, parse_log_levels, SettingsError
+
+
+def build_environ(**overrides) -> dict:
+    environ = {name: os.environ[name] for name in (
+        'API_NAME', 'API_TAG_NAME', 'URL_API_GATEWAY', 'KEYCLOAK_HOST', 'KEYCLOAK_REALM', 'KEYCLOAK_CLIENT_ID',
+        'KEYCLOAK_CLIENT_SECRET', 'REDIS_HOST', 'REDIS_PORT', 'REDIS_DB', 'REDIS_PASSWORD', 'VAULT_HOST',
+        'VAULT_PORT', 'VAULT_TOKEN', 'VAULT_SECRET_PATH'
+    )}
+    environ.update(overrides)
+    return environ
+
+
+class TestLoadSettings:
+    def test_parses_values_and_defaults(self):
+        # Act
+        settings = load_settings(build_environ(HTTP2_ENABLED='True', METRICS_BUCKETS_MS='1,10', LOG_LEVEL='debug'))
+
+        # Assert
+        assert settings.REDIS_PORT == 6379
+        assert settings.HTTP2_ENABLED is True
+        assert settings.METRICS_BUCKETS_MS == [1.0, 10.0]
+        assert settings.JWKS_ALGORITHMS == ['RS256']
+        assert settings.LICENCE_CACHE_TTL == 3600
+        assert settings.LOG_LEVEL == 'DEBUG'
+        assert settings.LOG_LEVELS == {}
+
+    def test_vault_max_workers_defaults_to_pool_size(self):
+        # Act
+        derived = load_settings(build_environ(VAULT_POOL_SIZE='4'))
+        explicit = load_settings(build_environ(VAULT_POOL_SIZE='4', VAULT_MAX_WORKERS='8'))
+
+        # Assert
+        assert derived.VAULT_MAX_WORKERS == 4
+        assert explicit.VAULT_MAX_WORKERS == 8
+
+    def test_reports_every_error_at_once(self):
+        # Arrange
+        environ = build_environ(REDIS_PORT='not-a-port', LOG_FORMAT='xml')
+        del environ['API_NAME']
+
+        # Act
+        with pytest.raises(SettingsError) as error:
+            load_settings(environ)
+
+        # Assert
+        message = str(error.value)
+        assert "API_NAME is required" in message
+        assert "REDIS_PORT='not-a-port' is invalid" in message
+        assert "LOG_FORMAT='xml' must be one of json, text" in message
+
+    @pytest.mark.parametrize("value", ['1', 'yes', 'ture', ''])
+    def test_rejects_non_boolean_flag(self, value):
+        # Act / Assert
+        with pytest.raises(SettingsError, match=f"SECRET_CACHE_ENABLED={value!r} is invalid: expected true or false"):
+            load_settings(build_environ(SECRET_CACHE_ENABLED=value))
+
+    def test_rejects_unknown_log_levels(self):
+        # Arrange
+        environ = build_environ(LOG_LEVEL='LOUD', LOG_LEVELS='middlewares=CHATTY')
+
+        # Act
+        with pytest.raises(SettingsError) as error:
+            load_settings(environ)
+
+        # Assert
+        message = str(error.value)
+        assert "LOG_LEVEL='LOUD' is invalid" in message
+        assert "LOG_LEVELS='middlewares=CHATTY' is invalid" in message
+
+    def test_parse_log_levels(self):
+        # Act
+        levels = parse_log_levels("middlewares=debug, services.vault_service=WARNING,")
+
+        # Assert
+        assert levels == {"middlewares": "DEBUG", "services.vault_service": "WARNING"}
+
+    def test_parse_log_levels_rejects_invalid_entry(self):
+        # Act & Assert
+        with pytest.raises(ValueError):
+            parse_log_levels("middlewares")
+
+    def test_rejects_unknown_verification_mode(self):
+        # Act / Assert
+        with pytest.raises(SettingsError, match="TOKEN_VERIFICATION_MODE"):
+            load_settings(build_environ(TOKEN_VERIFICATION_MODE='remote'))
+
+
+class TestModuleAttributes:
+    def test_module_attributes_hold_settings(self):
+        # Act / Assert
+        assert config.settings.API_NAME == os.environ['API_NAME']
+        assert config.API_NAME == os.environ['API_NAME']
+        assert config.REDIS_PORT == int(os.environ['REDIS_PORT'])
+
+    def test_every_setting_has_a_module_name(self):
+        # Act
+        missing = [name for name in config.SETTINGS if vars(config).get(name) is not getattr(config.settings, name)]
+
+        # Assert
+        assert missing == []
+
+    def test_unknown_attribute(self):
+        # Act / Assert
+        with pytest.raises(AttributeError):
+            config.NOT_A_SETTING
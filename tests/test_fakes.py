@@ -0,0 +1,360 @@
+import tests.env_setup
+import asyncio
+import pytest
+import httpx
+import jwt
+from hvac.exceptions import Forbidden, InternalServerError, InvalidPath
+from redis.exceptions import ConnectionError
+from unittest.mock import patch
+
+import main
+from config.config import KEYCLOAK_HOST, URL_API_GATEWAY
+from middlewares import licence_middleware, token_middleware
+from services import http_service
+from services.vault_service import vault_client_manager
+from tests.fakes import Behaviour, FakeRedis, FakeAsyncRedis, KeycloakStub, LicenceGatewayStub, VaultStub, \
+    build_http_client
+
+
+class ManualClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(scope="module")
+def keycloak():
+    # RSA key generation is the slow part of the stub: share one instance and reset its counters per test.
+    return KeycloakStub(realm="test-realm")
+
+
+@pytest.fixture
+def stand_ins(keycloak):
+    keycloak.introspections = 0
+    keycloak.jwks_requests = 0
+    keycloak.behaviour = Behaviour()
+    gateway = LicenceGatewayStub()
+    vault = VaultStub(mount="test-path", generate_missing=True)
+    redis = FakeAsyncRedis()
+    http_client = build_http_client({KEYCLOAK_HOST: keycloak.app, URL_API_GATEWAY: gateway.app})
+    with patch.object(token_middleware, "r_async", redis), \
+         patch.object(licence_middleware, "r_async", redis), \
+         patch.object(http_service, "http_client", http_client), \
+         patch.object(vault_client_manager, "get_client", return_value=vault.client()):
+        yield keycloak, gateway, vault, redis
+
+
+async def get_database(client: httpx.AsyncClient, token: str):
+    return await client.get(
+        "/credential/v1/database",
+        headers={"Authorization": f"Bearer {token}", "X-License-Key": "licence-0"}
+    )
+
+
+class TestBehaviour:
+    def test_seeded_failures_are_reproducible(self):
+        # Arrange
+        first = Behaviour(error_rate=0.3, seed=7)
+        second = Behaviour(error_rate=0.3, seed=7)
+
+        # Act
+        first_draws = [first.fails() for _ in range(50)]
+        second_draws = [second.fails() for _ in range(50)]
+
+        # Assert
+        assert first_draws == second_draws
+        assert 0 < first.errors < 50
+        assert first.calls == 50
+
+    def test_no_failures_without_error_rate(self):
+        # Arrange
+        behaviour = Behaviour()
+
+        # Act
+        draws = [behaviour.fails() for _ in range(50)]
+
+        # Assert
+        assert not any(draws)
+
+
+class TestFakeRedis:
+    def test_set_and_get(self):
+        # Arrange
+        redis = FakeRedis()
+
+        # Act
+        redis.set("key", b"value")
+
+        # Assert
+        assert redis.get("key") == "value"
+        assert redis.exists("key", "missing") == 1
+        assert redis.commands == {"set": 1, "get": 1, "exists": 1}
+
+    def test_set_nx_and_xx(self):
+        # Arrange
+        redis = FakeRedis()
+
+        # Act
+        created = redis.set("key", "first", nx=True)
+        skipped = redis.set("key", "second", nx=True)
+        missing = redis.set("other", "value", xx=True)
+
+        # Assert
+        assert created is True
+        assert skipped is None
+        assert missing is None
+        assert redis.get("key") == "first"
+
+    def test_expiry_follows_clock(self):
+        # Arrange
+        clock = ManualClock()
+        redis = FakeRedis(clock=clock)
+        redis.set("key", "value", ex=10)
+
+        # Act
+        clock.now += 9
+        before = redis.get("key")
+        ttl = redis.ttl("key")
+        clock.now += 1
+        after = redis.get("key")
+
+        # Assert
+        assert before == "value"
+        assert ttl == 1
+        assert after is None
+        assert redis.ttl("key") == -2
+
+    def test_keepttl_keeps_expiry(self):
+        # Arrange
+        clock = ManualClock()
+        redis = FakeRedis(clock=clock)
+        redis.set("key", "value", px=5000)
+
+        # Act
+        redis.set("key", "updated", keepttl=True)
+        clock.now += 5
+
+        # Assert
+        assert redis.get("key") is None
+
+    def test_error_rate_raises_connection_error(self):
+        # Arrange
+        redis = FakeRedis(behaviour=Behaviour(error_rate=1.0))
+
+        # Act / Assert
+        with pytest.raises(ConnectionError):
+            redis.get("key")
+
+    @pytest.mark.asyncio
+    async def test_async_client_shares_store(self):
+        # Arrange
+        store = FakeRedis()
+        redis = FakeAsyncRedis(store)
+
+        # Act
+        await redis.set("key", "value")
+        deleted = await redis.delete("key", "missing")
+
+        # Assert
+        assert store.get("key") is None
+        assert deleted == 1
+
+
+class TestKeycloakStub:
+    @pytest.mark.asyncio
+    async def test_introspection(self):
+        # Arrange
+        stub = KeycloakStub(realm="test-realm", payload_size=3)
+        async with build_http_client({KEYCLOAK_HOST: stub.app}) as client:
+            # Act
+            response = await client.post(
+                f"{KEYCLOAK_HOST}/realms/test-realm/protocol/openid-connect/token/introspect",
+                data={"token": "abc"}
+            )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["active"] is True
+        assert response.json()["sub"] == "user-abc"
+        assert response.json()["realm_access"]["roles"] == ["role-0", "role-1", "role-2"]
+        assert stub.introspections == 1
+
+    def test_revoked_token_is_inactive(self, keycloak):
+        # Arrange
+        keycloak.revoked.add("revoked")
+
+        # Act
+        info = keycloak.introspect("revoked")
+
+        # Assert
+        assert info == {"active": False}
+        keycloak.revoked.clear()
+
+    def test_issued_token_verifies_against_jwks(self, keycloak):
+        # Arrange
+        token = keycloak.issue_token("user-1", email="user-1@example.com")
+        jwk = jwt.PyJWK(keycloak.jwks()["keys"][0])
+
+        # Act
+        claims = jwt.decode(token, key=jwk.key, algorithms=["RS256"], options={"verify_aud": False})
+
+        # Assert
+        assert jwt.get_unverified_header(token)["kid"] == keycloak.kid
+        assert claims["sub"] == "user-1"
+        assert claims["email"] == "user-1@example.com"
+        assert keycloak.introspect(token)["email"] == "user-1@example.com"
+
+    @pytest.mark.asyncio
+    async def test_error_rate_answers_500(self, keycloak):
+        # Arrange
+        keycloak.behaviour = Behaviour(error_rate=1.0)
+        async with build_http_client({KEYCLOAK_HOST: keycloak.app}) as client:
+            # Act
+            response = await client.get(f"{KEYCLOAK_HOST}/realms/test-realm/protocol/openid-connect/certs")
+            unknown = await client.get("http://elsewhere/")
+
+        # Assert
+        assert response.status_code == 500
+        assert unknown.status_code == 502
+        keycloak.behaviour = Behaviour()
+
+
+class TestLicenceGatewayStub:
+    @pytest.mark.asyncio
+    async def test_licences(self):
+        # Arrange
+        gateway = LicenceGatewayStub(payload_size=3)
+        async with build_http_client({URL_API_GATEWAY: gateway.app}) as client:
+            # Act
+            response = await client.get(f"{URL_API_GATEWAY}/license/v1/mine", headers={"Authorization": "Bearer abc"})
+            anonymous = await client.get(f"{URL_API_GATEWAY}/license/v1/mine")
+
+        # Assert
+        assert [licence["uuid"] for licence in response.json()["data"]] == ["licence-0", "licence-1", "licence-2"]
+        assert anonymous.status_code == 401
+        assert gateway.requests == 2
+
+    @pytest.mark.asyncio
+    async def test_latency(self):
+        # Arrange
+        gateway = LicenceGatewayStub(behaviour=Behaviour(latency=0.05))
+        async with build_http_client({URL_API_GATEWAY: gateway.app}) as client:
+            # Act
+            start = asyncio.get_running_loop().time()
+            await client.get(f"{URL_API_GATEWAY}/license/v1/mine", headers={"Authorization": "Bearer abc"})
+            elapsed = asyncio.get_running_loop().time() - start
+
+        # Assert
+        assert elapsed >= 0.05
+
+
+class TestVaultStub:
+    def test_create_and_read_with_hvac(self):
+        # Arrange
+        vault = VaultStub()
+        client = vault.client()
+
+        # Act
+        client.secrets.kv.v2.create_or_update_secret(path="app/db", secret={"password": "one"})
+        written = client.secrets.kv.v2.create_or_update_secret(path="app/db", secret={"password": "two"})
+        secret = client.secrets.kv.v2.read_secret_version(path="app/db", raise_on_deleted_version=True)
+        metadata = client.secrets.kv.v2.read_secret_metadata(path="app/db")
+
+        # Assert
+        assert written["data"]["version"] == 2
+        assert secret["data"]["data"] == {"password": "two"}
+        assert secret["data"]["metadata"]["version"] == 2
+        assert metadata["data"]["current_version"] == 2
+        assert vault.reads == 2
+        assert vault.writes == 2
+
+    def test_missing_secret_raises_invalid_path(self):
+        # Arrange
+        client = VaultStub().client()
+
+        # Act / Assert
+        with pytest.raises(InvalidPath):
+            client.secrets.kv.v2.read_secret_version(path="missing", raise_on_deleted_version=True)
+
+    def test_generate_missing_uses_payload_size(self):
+        # Arrange
+        client = VaultStub(generate_missing=True, payload_size=4).client()
+
+        # Act
+        secret = client.secrets.kv.v2.read_secret_version(path="missing", raise_on_deleted_version=True)
+
+        # Assert
+        assert len(secret["data"]["data"]) == 4
+
+    def test_wrong_token_is_forbidden(self):
+        # Arrange
+        client = VaultStub(token="expected").client(token="other")
+
+        # Act / Assert
+        with pytest.raises(Forbidden):
+            client.secrets.kv.v2.read_secret_metadata(path="app/db")
+
+    def test_error_rate_raises_internal_server_error(self):
+        # Arrange
+        client = VaultStub(behaviour=Behaviour(error_rate=1.0)).client()
+
+        # Act / Assert
+        with pytest.raises(InternalServerError):
+            client.secrets.kv.v2.read_secret_metadata(path="app/db")
+
+
+class TestStandInsWithApplication:
+    @pytest.mark.asyncio
+    async def test_concurrent_requests_share_one_introspection_and_licence_fetch(self, stand_ins):
+        # Arrange
+        keycloak, gateway, vault, redis = stand_ins
+        keycloak.behaviour = Behaviour(latency=0.05)
+        gateway.behaviour = Behaviour(latency=0.05)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Act
+            responses = await asyncio.gather(*(get_database(client, "shared") for _ in range(10)))
+
+        # Assert
+        assert [response.status_code for response in responses] == [200] * 10
+        assert keycloak.introspections == 1
+        assert gateway.requests == 1
+
+    @pytest.mark.asyncio
+    async def test_redis_cache_serves_after_local_caches_are_cleared(self, stand_ins):
+        # Arrange
+        keycloak, gateway, vault, redis = stand_ins
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await get_database(client, "cached")
+            token_middleware.token_l1_cache.clear()
+            licence_middleware.licence_l1_cache.clear()
+
+            # Act
+            response = await get_database(client, "cached")
+
+        # Assert
+        assert response.status_code == 200
+        assert keycloak.introspections == 1
+        assert gateway.requests == 1
+        assert "licences:user-cached" in redis.values
+
+    @pytest.mark.asyncio
+    async def test_keycloak_failure_is_not_cached(self, stand_ins):
+        # Arrange
+        keycloak, gateway, vault, redis = stand_ins
+        keycloak.behaviour = Behaviour(error_rate=1.0)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            failed = await get_database(client, "flaky")
+            keycloak.behaviour = Behaviour()
+
+            # Act
+            response = await get_database(client, "flaky")
+
+        # Assert
+        assert failed.status_code == 500
+        assert response.status_code == 200
+        assert keycloak.introspections == 2
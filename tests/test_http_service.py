@@ -0,0 +1,40 @@
+import tests.env_setup
+import pytest
+
+import services.http_service as http_service
+from services.http_service import get_http_client, open_http_client, close_http_client
+
+
+@pytest.mark.asyncio
+class TestHttpService:
+    async def test_get_http_client_is_shared(self):
+        # Act
+        client = await open_http_client()
+
+        # Assert
+        assert get_http_client() is client
+        await close_http_client()
+
+    async def test_http_client_pool_limits(self):
+        # Act
+        client = get_http_client()
+
+        # Assert
+        pool = client._transport._pool
+        assert pool._max_connections == http_service.HTTP_MAX_CONNECTIONS
+        assert pool._max_keepalive_connections == http_service.HTTP_MAX_KEEPALIVE_CONNECTIONS
+        assert client.timeout.connect == http_service.HTTP_CONNECT_TIMEOUT
+        await close_http_client()
+
+    async def test_close_http_client(self):
+        # Arrange
+        client = get_http_client()
+
+        # Act
+        await close_http_client()
+
+        # Assert
+        assert client.is_closed
+        assert http_service.http_client is None
+        assert get_http_client() is not client
+        await close_http_client()
@@ -0,0 +1,99 @@
+import tests.env_setup
+import pytest
+import redis
+import redis.asyncio as aioredis
+from unittest.mock import patch, AsyncMock, MagicMock
+
+import services.inmemory_service as inmemory_service
+from services.inmemory_service import get_redis_connection_kwargs, create_redis_pool, create_redis_async_pool, \
+    close_redis_clients
+
+
+class TestRedisConnectionKwargs:
+    def test_tcp_connection_uses_host_and_port(self):
+        # Act
+        kwargs = get_redis_connection_kwargs()
+
+        # Assert
+        assert kwargs["host"] == inmemory_service.REDIS_HOST
+        assert kwargs["port"] == inmemory_service.REDIS_PORT
+        assert "path" not in kwargs
+        assert kwargs["decode_responses"] is True
+        assert kwargs["protocol"] == 2
+
+    def test_unix_socket_and_resp3(self):
+        # Arrange
+        with patch('services.inmemory_service.REDIS_UNIX_SOCKET', '/var/run/redis.sock'), \
+             patch('services.inmemory_service.REDIS_RESP3', True):
+            # Act
+            kwargs = get_redis_connection_kwargs()
+            pool = create_redis_pool()
+            async_pool = create_redis_async_pool()
+
+        # Assert
+        assert kwargs["path"] == '/var/run/redis.sock'
+        assert "host" not in kwargs
+        assert kwargs["protocol"] == 3
+        assert pool.connection_class is redis.UnixDomainSocketConnection
+        assert async_pool.connection_class is aioredis.UnixDomainSocketConnection
+
+
+class TestRedisClients:
+    def test_pools_are_bounded_and_blocking(self):
+        # Act
+        pool = create_redis_pool()
+        async_pool = create_redis_async_pool()
+
+        # Assert
+        assert isinstance(pool, redis.BlockingConnectionPool)
+        assert isinstance(async_pool, aioredis.BlockingConnectionPool)
+        assert pool.max_connections == inmemory_service.REDIS_MAX_CONNECTIONS
+        assert async_pool.max_connections == inmemory_service.REDIS_MAX_CONNECTIONS
+
+    def test_clients_are_shared(self):
+        # Arrange
+        with patch('services.inmemory_service.redis_client', None), \
+             patch('services.inmemory_service.redis_async_client', None):
+            # Act
+            first = inmemory_service.get_redis_api_db()
+            second = inmemory_service.get_redis_api_db()
+            first_async = inmemory_service.get_redis_async_api_db()
+            second_async = inmemory_service.get_redis_async_api_db()
+
+        # Assert
+        assert first is second
+        assert first_async is second_async
+
+    @pytest.mark.asyncio
+    async def test_close_redis_clients_disconnects_pools(self):
+        # Arrange
+        client = MagicMock()
+        async_client = MagicMock()
+        async_client.connection_pool.disconnect = AsyncMock()
+
+        # Act
+        with patch('services.inmemory_service.redis_client', client), \
+             patch('services.inmemory_service.redis_async_client', async_client):
+            await close_redis_clients()
+
+        # Assert
+        client.connection_pool.disconnect.assert_called_once()
+        async_client.connection_pool.disconnect.assert_awaited_once()
+
+
+class TestLazyClient:
+    def test_factory_runs_on_first_command(self):
+        # Arrange
+        client = MagicMock()
+        factory = MagicMock(return_value=client)
+        lazy = inmemory_service.LazyClient(factory)
+        factory.assert_not_called()
+
+        # Act
+        lazy.get("key")
+        lazy.set("key", "value")
+
+        # Assert
+        assert factory.call_count == 2
+        client.get.assert_called_once_with("key")
+        client.set.assert_called_once_with("key", "value")
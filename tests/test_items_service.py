@@ -1,15 +1,19 @@
 import tests.env_setup
+import asyncio
 import pytest
 from unittest.mock import patch, MagicMock
 from fastapi import HTTPException
 
-from services.items_service import get_secret, create_secret
+from services.items_service import get_secret, create_secret, get_secret_async, create_secret_async, \
+    get_secrets_async, create_secrets_async
+from services.secret_cache import SecretCache
+from services.vault_service import vault_client_manager
 
 
 @pytest.fixture
 def mock_hvac_client():
-    with patch('services.items_service.client') as mock_client:
-        yield mock_client
+    with patch.object(vault_client_manager, 'get_client') as mock_get_client:
+        yield mock_get_client.return_value
 
 
 class TestItemsService:
@@ -51,6 +55,15 @@ class TestItemsService:
         assert exc_info.value.status_code == 404
         assert exc_info.value.detail == "Secret not found"
 
+    @pytest.mark.parametrize("service", ["../../../victim/licenses/victim-license/db", "..", ".", "a/b", ""])
+    def test_get_secret_rejects_path_traversal(self, mock_hvac_client, service):
+        # Act & Assert
+        with pytest.raises(HTTPException) as exc_info:
+            get_secret("test-entity", "test-license", service)
+
+        assert exc_info.value.status_code == 400
+        mock_hvac_client.secrets.kv.v2.read_secret_version.assert_not_called()
+
     def test_get_secret_general_exception(self, mock_hvac_client):
         # Arrange
         entity_uuid = "test-entity"
@@ -95,3 +108,172 @@ class TestItemsService:
 
         assert exc_info.value.status_code == 500
         assert exc_info.value.detail == "Vault error"
+
+
+@pytest.fixture
+def secret_cache():
+    cache = SecretCache(maxsize=10, ttl=300, max_staleness=30)
+    with patch('services.items_service.secret_cache', cache):
+        yield cache
+
+
+class TestItemsServiceSecretCache:
+    def test_get_secret_read_through(self, mock_hvac_client, secret_cache):
+        # Arrange
+        expected_data = {"username": "test_user", "password": "test_password"}
+        mock_hvac_client.secrets.kv.v2.read_secret_version.return_value = {
+            "data": {"data": expected_data, "metadata": {"version": 2}}
+        }
+
+        # Act
+        first = get_secret("test-entity", "test-license", "test-service")
+        second = get_secret("test-entity", "test-license", "test-service")
+
+        # Assert
+        assert first == expected_data
+        assert second == expected_data
+        mock_hvac_client.secrets.kv.v2.read_secret_version.assert_called_once()
+        mock_hvac_client.secrets.kv.v2.read_secret_metadata.assert_not_called()
+
+    def test_get_secret_stale_entry_same_version(self, mock_hvac_client, secret_cache):
+        # Arrange
+        key = ("test-entity", "test-license", "test-service")
+        secret_cache.set(key, {"password": "cached"}, 2)
+        secret_cache.get(key)["verified_at"] -= 60
+        mock_hvac_client.secrets.kv.v2.read_secret_metadata.return_value = {"data": {"current_version": 2}}
+
+        # Act
+        result = get_secret("test-entity", "test-license", "test-service")
+
+        # Assert
+        assert result == {"password": "cached"}
+        mock_hvac_client.secrets.kv.v2.read_secret_version.assert_not_called()
+        assert secret_cache.is_stale(secret_cache.get(key)) is False
+
+    def test_get_secret_stale_entry_new_version(self, mock_hvac_client, secret_cache):
+        # Arrange
+        key = ("test-entity", "test-license", "test-service")
+        secret_cache.set(key, {"password": "cached"}, 2)
+        secret_cache.get(key)["verified_at"] -= 60
+        mock_hvac_client.secrets.kv.v2.read_secret_metadata.return_value = {"data": {"current_version": 3}}
+        mock_hvac_client.secrets.kv.v2.read_secret_version.return_value = {
+            "data": {"data": {"password": "rotated"}, "metadata": {"version": 3}}
+        }
+
+        # Act
+        result = get_secret("test-entity", "test-license", "test-service")
+
+        # Assert
+        assert result == {"password": "rotated"}
+        assert secret_cache.get(key)["version"] == 3
+
+    def test_create_secret_updates_cache(self, mock_hvac_client, secret_cache):
+        # Arrange
+        key = ("test-entity", "test-license", "test-service")
+        secret_cache.set(key, {"password": "old"}, 1)
+        mock_hvac_client.secrets.kv.v2.create_or_update_secret.return_value = {"data": {"version": 2}}
+
+        # Act
+        create_secret("test-entity", "test-license", "test-service", {"password": "new"})
+
+        # Assert
+        entry = secret_cache.get(key)
+        assert entry["version"] == 2
+        assert secret_cache.read(key, entry) == {"password": "new"}
+
+    def test_create_secret_invalidates_cache_without_version(self, mock_hvac_client, secret_cache):
+        # Arrange
+        key = ("test-entity", "test-license", "test-service")
+        secret_cache.set(key, {"password": "old"}, 1)
+        mock_hvac_client.secrets.kv.v2.create_or_update_secret.return_value = None
+
+        # Act
+        create_secret("test-entity", "test-license", "test-service", {"password": "new"})
+
+        # Assert
+        assert secret_cache.get(key) is None
+
+
+@pytest.mark.asyncio
+class TestItemsServiceAsync:
+    async def test_get_secret_async(self, mock_hvac_client):
+        # Arrange
+        expected_data = {"username": "test_user", "password": "test_password"}
+        mock_hvac_client.secrets.kv.v2.read_secret_version.return_value = {"data": {"data": expected_data}}
+
+        # Act
+        result = await get_secret_async("test-entity", "test-license", "test-service")
+
+        # Assert
+        assert result == expected_data
+        mock_hvac_client.secrets.kv.v2.read_secret_version.assert_called_once_with(
+            path="entities/test-entity/licenses/test-license/test-service", mount_point="test-path"
+        )
+
+    async def test_get_secret_async_not_found(self, mock_hvac_client):
+        # Arrange
+        from hvac.exceptions import InvalidPath
+        mock_hvac_client.secrets.kv.v2.read_secret_version.side_effect = InvalidPath("Secret not found")
+
+        # Act & Assert
+        with pytest.raises(HTTPException) as exc_info:
+            await get_secret_async("test-entity", "test-license", "nonexistent-service")
+
+        assert exc_info.value.status_code == 404
+
+    async def test_create_secret_async(self, mock_hvac_client):
+        # Arrange
+        secret_data = {"username": "new_user", "password": "new_password"}
+
+        # Act
+        result = await create_secret_async("test-entity", "test-license", "test-service", secret_data)
+
+        # Assert
+        assert result == {"message": "Secret recorded successfully"}
+        mock_hvac_client.secrets.kv.v2.create_or_update_secret.assert_called_once()
+
+    async def test_get_secrets_async(self):
+        # Arrange
+        async def fake_get_secret(entity_uuid, licence_uuid, service):
+            if service == "missing":
+                raise HTTPException(status_code=404, detail="Secret not found")
+            return {"password": service}
+
+        # Act
+        with patch('services.items_service.get_secret_async', side_effect=fake_get_secret) as mock_get_secret:
+            result = await get_secrets_async("test-entity", "test-license", ["a", "missing", "a", "b"])
+
+        # Assert
+        assert result == {
+            "data": {"a": {"password": "a"}, "b": {"password": "b"}},
+            "errors": {"missing": {"status_code": 404, "detail": "Secret not found"}}
+        }
+        assert mock_get_secret.call_count == 3
+
+    @patch('services.items_service.SECRET_BATCH_WRITE_CONCURRENCY', 2)
+    async def test_create_secrets_async_bounded_concurrency(self):
+        # Arrange
+        in_flight = 0
+        max_in_flight = 0
+
+        async def fake_create_secret(entity_uuid, license_uuid, service, secret_data):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if service == "broken":
+                raise HTTPException(status_code=500, detail="Vault error")
+            return {"message": "Secret recorded successfully"}
+
+        secrets = [(f"service-{i}", {"password": str(i)}) for i in range(5)] + [("broken", {"password": "x"})]
+
+        # Act
+        with patch('services.items_service.create_secret_async', side_effect=fake_create_secret):
+            result = await create_secrets_async("test-entity", "test-license", secrets)
+
+        # Assert
+        assert max_in_flight == 2
+        assert [status["service"] for status in result] == [service for service, _ in secrets]
+        assert result[0] == {"service": "service-0", "status_code": 200, "detail": "Secret recorded successfully"}
+        assert result[-1] == {"service": "broken", "status_code": 500, "detail": "Vault error"}
@@ -0,0 +1,168 @@
+import tests.env_setup
+import json
+import time
+import pytest
+import jwt
+from unittest.mock import patch, MagicMock, AsyncMock
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+
+import services.jwks_service as jwks_service
+from services.jwks_service import parse_jwks, get_unverified_kid, verify_token_locally
+
+
+def generate_jwk(kid: str):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    public_jwk.update({"kid": kid, "use": "sig", "alg": "RS256"})
+    return private_key, public_jwk
+
+
+def sign_token(private_key, kid: str, claims: dict) -> str:
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.fixture(autouse=True)
+def reset_jwks():
+    jwks_service.jwks_keys = {}
+    jwks_service.jwks_fetched_at = 0.0
+    yield
+    jwks_service.jwks_keys = {}
+    jwks_service.jwks_fetched_at = 0.0
+
+
+@pytest.fixture
+def signing_key():
+    return generate_jwk("kid-1")
+
+
+@pytest.fixture
+def mock_http_client(signing_key):
+    _, public_jwk = signing_key
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {"keys": [public_jwk]}
+    with patch('services.jwks_service.get_http_client') as mock_get_http_client:
+        mock_get_http_client.return_value.get = AsyncMock(return_value=mock_response)
+        yield mock_get_http_client.return_value
+
+
+class TestJwksServiceFunctions:
+    def test_parse_jwks_skips_encryption_keys(self, signing_key):
+        # Arrange
+        _, public_jwk = signing_key
+        encryption_jwk = dict(public_jwk, kid="kid-enc", use="enc")
+
+        # Act
+        result = parse_jwks({"keys": [public_jwk, encryption_jwk]})
+
+        # Assert
+        assert list(result.keys()) == ["kid-1"]
+
+    def test_parse_jwks_skips_disallowed_algorithms(self, signing_key):
+        # Arrange
+        _, public_jwk = signing_key
+        rs512_jwk = dict(public_jwk, kid="kid-rs512", alg="RS512")
+        no_alg_jwk = {name: value for name, value in public_jwk.items() if name != "alg"}
+        no_alg_jwk["kid"] = "kid-no-alg"
+
+        # Act
+        with patch('services.jwks_service.JWKS_ALGORITHMS', ['RS256']):
+            result = parse_jwks({"keys": [public_jwk, rs512_jwk, no_alg_jwk]})
+
+        # Assert
+        assert sorted(result.keys()) == ["kid-1", "kid-no-alg"]
+
+    def test_get_unverified_kid(self, signing_key):
+        # Arrange
+        private_key, _ = signing_key
+        token = sign_token(private_key, "kid-1", {"sub": "user-123"})
+
+        # Act
+        result = get_unverified_kid(token)
+
+        # Assert
+        assert result == "kid-1"
+
+    def test_get_unverified_kid_opaque_token(self):
+        # Act
+        result = get_unverified_kid("opaque-token")
+
+        # Assert
+        assert result is None
+
+
+@pytest.mark.asyncio
+class TestVerifyTokenLocally:
+    async def test_verify_token_locally_success(self, signing_key, mock_http_client):
+        # Arrange
+        private_key, _ = signing_key
+        now = int(time.time())
+        claims = {"sub": "user-123", "aud": "karned", "iat": now - 10, "exp": now + 3600}
+        token = sign_token(private_key, "kid-1", claims)
+
+        # Act
+        result = await verify_token_locally(token)
+
+        # Assert
+        assert result == dict(claims, active=True)
+        mock_http_client.get.assert_awaited_once()
+
+    async def test_verify_token_locally_uses_cached_jwks(self, signing_key, mock_http_client):
+        # Arrange
+        private_key, _ = signing_key
+        token = sign_token(private_key, "kid-1", {"sub": "user-123"})
+
+        # Act
+        await verify_token_locally(token)
+        await verify_token_locally(token)
+
+        # Assert
+        mock_http_client.get.assert_awaited_once()
+
+    async def test_verify_token_locally_refreshes_on_unknown_kid(self, signing_key, mock_http_client):
+        # Arrange
+        private_key, public_jwk = signing_key
+        jwks_service.jwks_keys = parse_jwks({"keys": [dict(public_jwk, kid="old-kid")]})
+        token = sign_token(private_key, "kid-1", {"sub": "user-123"})
+
+        # Act
+        result = await verify_token_locally(token)
+
+        # Assert
+        assert result["sub"] == "user-123"
+        mock_http_client.get.assert_awaited_once()
+
+    async def test_verify_token_locally_unknown_kid_within_refresh_interval(self, signing_key, mock_http_client):
+        # Arrange
+        private_key, _ = signing_key
+        jwks_service.jwks_keys = {"other-kid": MagicMock()}
+        jwks_service.jwks_fetched_at = time.monotonic()
+        token = sign_token(private_key, "kid-1", {"sub": "user-123"})
+
+        # Act
+        result = await verify_token_locally(token)
+
+        # Assert
+        assert result is None
+        mock_http_client.get.assert_not_called()
+
+    async def test_verify_token_locally_opaque_token(self, mock_http_client):
+        # Act
+        result = await verify_token_locally("opaque-token")
+
+        # Assert
+        assert result is None
+        mock_http_client.get.assert_not_called()
+
+    async def test_verify_token_locally_invalid_signature(self, mock_http_client):
+        # Arrange
+        other_private_key, _ = generate_jwk("kid-1")
+        token = sign_token(other_private_key, "kid-1", {"sub": "user-123"})
+
+        # Act & Assert
+        with pytest.raises(HTTPException) as exc_info:
+            await verify_token_locally(token)
+
+        assert exc_info.value.status_code == 401
+        assert exc_info.value.detail == "Token signature is invalid"
@@ -1,24 +1,41 @@
 import tests.env_setup
+import asyncio
+import time
 import pytest
-from unittest.mock import patch, MagicMock, AsyncMock
+from unittest.mock import patch, MagicMock, AsyncMock, ANY
 from fastapi import HTTPException
-from starlette.requests import Request
-from starlette.responses import Response, JSONResponse
 from datetime import datetime, timezone
 
+from utils.cache_codec import encode_cache_value
+
+
+def build_licence(uuid="test-license"):
+    return {"uuid": uuid, "exp": int(datetime.now(timezone.utc).timestamp()) + 3600}
+
 from middlewares.licence_middleware import (
     extract_licence, 
     is_headers_licence_present, 
     check_headers_licence,
     is_licence_found,
     extract_entity,
-    LicenceVerificationMiddleware,
-    get_licences,
+    index_licences,
+    store_licences_in_state,
+    load_cached_licences_async,
+    get_licences_async,
     filter_licences,
-    prepare_licences,
-    refresh_cache_token,
-    refresh_licences,
-    check_licence
+    prepare_licences_async,
+    get_licence_owner,
+    get_licences_cache_key,
+    get_licences_ttl,
+    read_cache_licences_async,
+    write_cache_licences_async,
+    refresh_licences_async,
+    check_licence_async,
+    licence_negative_cache,
+    licence_refreshed_users,
+    licence_l1_cache,
+    licence_refresh_ahead,
+    licence_refresh_stats
 )
 
 
@@ -116,6 +133,47 @@ class TestLicenceMiddlewareFunctions:
         # Assert
         assert result is False
 
+    def test_is_licence_found_uses_index(self):
+        # Arrange
+        mock_request = MagicMock()
+        mock_request.state.licenses = [{"uuid": "test-license-1"}]
+        mock_request.state.licenses_index = {"test-license-2": 0}
+
+        # Act
+        result = is_licence_found(mock_request, "test-license-2")
+
+        # Assert
+        assert result is True
+
+    def test_index_licences(self):
+        # Arrange
+        licences = [{"uuid": "test-license-1"}, {"uuid": 42}]
+
+        # Act
+        result = index_licences(licences)
+
+        # Assert
+        assert result == {"test-license-1": 0, "42": 1}
+
+    def test_index_licences_none(self):
+        # Act
+        result = index_licences(None)
+
+        # Assert
+        assert result == {}
+
+    def test_store_licences_in_state(self):
+        # Arrange
+        mock_request = MagicMock()
+        licences = [{"uuid": "test-license-1"}, {"uuid": "test-license-2"}]
+
+        # Act
+        store_licences_in_state(mock_request, licences)
+
+        # Assert
+        assert mock_request.state.licenses == licences
+        assert mock_request.state.licenses_index == {"test-license-1": 0, "test-license-2": 1}
+
     def test_extract_entity_success(self):
         # Arrange
         mock_request = MagicMock()
@@ -147,36 +205,6 @@ class TestLicenceMiddlewareFunctions:
         assert exc_info.value.status_code == 500
         assert exc_info.value.detail == "Entity not found"
 
-    @patch('middlewares.licence_middleware.httpx')
-    def test_get_licences_success(self, mock_httpx):
-        # Arrange
-        token = "test-token"
-        mock_response = MagicMock()
-        mock_response.status_code = 200
-        mock_response.json.return_value = {"data": [{"uuid": "test-license"}]}
-        mock_httpx.get.return_value = mock_response
-
-        # Act
-        result = get_licences(token)
-
-        # Assert
-        assert result == [{"uuid": "test-license"}]
-        mock_httpx.get.assert_called_once()
-
-    @patch('middlewares.licence_middleware.httpx')
-    def test_get_licences_failure(self, mock_httpx):
-        # Arrange
-        token = "test-token"
-        mock_response = MagicMock()
-        mock_response.status_code = 500
-        mock_httpx.get.return_value = mock_response
-
-        # Act & Assert
-        with pytest.raises(HTTPException) as exc_info:
-            get_licences(token)
-
-        assert exc_info.value.status_code == 500
-        assert exc_info.value.detail == "Licences request failed"
 
     def test_filter_licences_valid(self):
         # Arrange
@@ -203,216 +231,372 @@ class TestLicenceMiddlewareFunctions:
         assert len(result) == 1
         assert result[0]["uuid"] == "valid-license"
 
-    def test_prepare_licences(self):
+
+    def test_get_licence_owner_is_user(self):
+        # Arrange
+        mock_request = MagicMock()
+        mock_request.state.user_uuid = "user-123"
+        mock_request.state.token = "test-token"
+
+        # Act & Assert
+        assert get_licence_owner(mock_request) == "user-123"
+        assert get_licences_cache_key("user-123") == "licences:user-123"
+
+    def test_get_licence_owner_falls_back_to_token(self):
+        # Arrange
+        mock_request = MagicMock()
+        mock_request.state.user_uuid = None
+        mock_request.state.token = "test-token"
+
+        # Act & Assert
+        assert get_licence_owner(mock_request) == "test-token"
+
+    @patch('middlewares.licence_middleware.LICENCE_CACHE_TTL', 3600)
+    def test_get_licences_ttl_uses_earliest_exp(self):
+        # Arrange
+        now = int(datetime.now(timezone.utc).timestamp())
+        licences = [{"uuid": "a", "exp": now + 1000}, {"uuid": "b", "exp": now + 100}]
+
+        # Act
+        ttl = get_licences_ttl(licences)
+
+        # Assert
+        assert 98 <= ttl <= 100
+
+    @patch('middlewares.licence_middleware.LICENCE_CACHE_TTL', 3600)
+    def test_get_licences_ttl_capped(self):
+        # Arrange
+        now = int(datetime.now(timezone.utc).timestamp())
+
+        # Act & Assert
+        assert get_licences_ttl([{"uuid": "a", "exp": now + 100000}]) == 3600
+        assert get_licences_ttl([]) == 3600
+
+
+@pytest.mark.asyncio
+class TestLicenceMiddlewareAsyncFunctions:
+    @patch('middlewares.licence_middleware.get_http_client')
+    async def test_get_licences_async_success(self, mock_get_http_client):
         # Arrange
         token = "test-token"
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"data": [{"uuid": "test-license"}]}
+        mock_get_http_client.return_value.get = AsyncMock(return_value=mock_response)
 
         # Act
-        with patch('middlewares.licence_middleware.get_licences') as mock_get_licences, \
-             patch('middlewares.licence_middleware.filter_licences') as mock_filter_licences:
-            mock_get_licences.return_value = [{"uuid": "test-license"}]
-            mock_filter_licences.return_value = [{"uuid": "filtered-license"}]
+        result = await get_licences_async(token)
 
-            result = prepare_licences(token)
+        # Assert
+        assert result == [{"uuid": "test-license"}]
+        mock_get_http_client.return_value.get.assert_awaited_once_with(
+            "http://test-gateway/license/v1/mine", headers={"Authorization": "Bearer test-token"}
+        )
+
+    @patch('middlewares.licence_middleware.get_http_client')
+    async def test_get_licences_async_failure(self, mock_get_http_client):
+        # Arrange
+        mock_response = MagicMock()
+        mock_response.status_code = 500
+        mock_get_http_client.return_value.get = AsyncMock(return_value=mock_response)
+
+        # Act & Assert
+        with pytest.raises(HTTPException) as exc_info:
+            await get_licences_async("test-token")
+
+        assert exc_info.value.status_code == 500
+        assert exc_info.value.detail == "Licences request failed"
+
+    @patch('middlewares.licence_middleware.get_licences_async', new_callable=AsyncMock)
+    @patch('middlewares.licence_middleware.filter_licences')
+    async def test_prepare_licences_async(self, mock_filter_licences, mock_get_licences):
+        # Arrange
+        mock_get_licences.return_value = [{"uuid": "test-license"}]
+        mock_filter_licences.return_value = [{"uuid": "filtered-license"}]
+
+        # Act
+        result = await prepare_licences_async("test-token")
 
         # Assert
         assert result == [{"uuid": "filtered-license"}]
-        mock_get_licences.assert_called_once_with(token)
         mock_filter_licences.assert_called_once_with([{"uuid": "test-license"}])
 
-    @patch('middlewares.licence_middleware.read_cache_token')
-    def test_refresh_cache_token(self, mock_read_cache_token):
+    async def test_read_cache_licences_async(self, mock_redis):
         # Arrange
-        mock_request = MagicMock()
-        mock_request.state.token = "test-token"
-        mock_request.state.licenses = [{"uuid": "test-license"}]
+        now = int(datetime.now(timezone.utc).timestamp())
+        cache_licences = {"licenses": [{"uuid": "a"}], "licenses_index": {"a": 0}, "expires_at": now + 100}
+        with patch('middlewares.licence_middleware.r_async') as mock_redis_async:
+            mock_redis_async.get = AsyncMock(side_effect=[None, encode_cache_value(cache_licences)])
 
-        mock_read_cache_token.return_value = {"key": "value"}
+            # Act
+            missing = await read_cache_licences_async("user-123")
+            found = await read_cache_licences_async("user-123")
 
-        # Act
-        result = refresh_cache_token(mock_request)
+        # Assert
+        assert missing is None
+        assert found == cache_licences
+        mock_redis_async.get.assert_awaited_with("licences:user-123")
+
+    async def test_read_cache_licences_async_caps_l1_at_set_expiry(self):
+        # Arrange
+        now = int(datetime.now(timezone.utc).timestamp())
+        cache_licences = {"licenses": [{"uuid": "a", "exp": now + 2}], "licenses_index": {"a": 0}, "expires_at": now + 2}
+        with patch('middlewares.licence_middleware.r_async') as mock_redis_async:
+            mock_redis_async.get = AsyncMock(return_value=encode_cache_value(cache_licences))
+
+            # Act
+            found = await read_cache_licences_async("user-123")
+
+        # Assert
+        assert found == cache_licences
+        assert licence_l1_cache.entries["user-123"][1] - time.monotonic() <= 2
+
+    async def test_read_cache_licences_async_skips_l1_for_expired_set(self):
+        # Arrange
+        now = int(datetime.now(timezone.utc).timestamp())
+        cache_licences = {"licenses": [{"uuid": "a", "exp": now}], "licenses_index": {"a": 0}, "expires_at": now}
+        with patch('middlewares.licence_middleware.r_async') as mock_redis_async:
+            mock_redis_async.get = AsyncMock(return_value=encode_cache_value(cache_licences))
+
+            # Act
+            await read_cache_licences_async("user-123")
+
+        # Assert
+        assert "user-123" not in licence_l1_cache
+
+    async def test_write_cache_licences_async(self):
+        # Arrange
+        now = int(datetime.now(timezone.utc).timestamp())
+        cache_licences = {"licenses": [{"uuid": "a", "exp": now + 100}], "licenses_index": {"a": 0}}
+        with patch('middlewares.licence_middleware.r_async') as mock_redis_async:
+            mock_redis_async.set = AsyncMock()
+
+            # Act
+            await write_cache_licences_async("user-123", cache_licences)
 
         # Assert
-        assert result == {"key": "value", "licenses": [{"uuid": "test-license"}]}
-        mock_read_cache_token.assert_called_once_with("test-token")
+        mock_redis_async.set.assert_awaited_once()
+        assert mock_redis_async.set.call_args.args == ("licences:user-123", encode_cache_value(cache_licences))
+        assert licence_l1_cache.get("user-123") == cache_licences
 
-    @patch('middlewares.licence_middleware.prepare_licences')
-    @patch('middlewares.licence_middleware.write_cache_token')
-    @patch('middlewares.licence_middleware.refresh_cache_token')
-    def test_refresh_licences(self, mock_refresh_cache_token, mock_write_cache_token, mock_prepare_licences):
+    @patch('middlewares.licence_middleware.prepare_licences_async', new_callable=AsyncMock)
+    @patch('middlewares.licence_middleware.write_cache_licences_async', new_callable=AsyncMock)
+    async def test_refresh_licences_async(self, mock_write_cache_licences, mock_prepare_licences):
         # Arrange
         mock_request = MagicMock()
         mock_request.state.token = "test-token"
+        mock_request.state.user_uuid = "user-123"
+        licence = build_licence()
+        mock_prepare_licences.return_value = [licence]
 
-        mock_prepare_licences.return_value = [{"uuid": "test-license"}]
-        mock_refresh_cache_token.return_value = {"key": "value", "licenses": [{"uuid": "test-license"}]}
+        # Act
+        await refresh_licences_async(mock_request)
+
+        # Assert
+        assert mock_request.state.licenses == [licence]
+        assert mock_request.state.licenses_index == {"test-license": 0}
+        mock_prepare_licences.assert_awaited_once_with("test-token")
+        mock_write_cache_licences.assert_awaited_once_with(
+            "user-123", {"licenses": [licence], "licenses_index": {"test-license": 0}, "expires_at": ANY}
+        )
+
+    @patch('middlewares.licence_middleware.write_cache_licences_async', new_callable=AsyncMock)
+    async def test_refresh_licences_async_coalesces_tokens_of_same_user(self, mock_write_cache_licences):
+        # Arrange
+        gate = asyncio.Event()
+        licence = build_licence()
+
+        async def slow_prepare_licences(token):
+            await gate.wait()
+            return [licence]
+
+        requests = []
+        for token in ("token-1", "token-2", "token-3"):
+            mock_request = MagicMock()
+            mock_request.state.token = token
+            mock_request.state.user_uuid = "user-123"
+            requests.append(mock_request)
 
         # Act
-        refresh_licences(mock_request)
+        with patch('middlewares.licence_middleware.prepare_licences_async', side_effect=slow_prepare_licences) \
+                as mock_prepare_licences:
+            refreshes = asyncio.gather(*(refresh_licences_async(request) for request in requests))
+            await asyncio.sleep(0)
+            gate.set()
+            await refreshes
 
         # Assert
-        assert mock_request.state.licenses == [{"uuid": "test-license"}]
-        mock_prepare_licences.assert_called_once_with("test-token")
-        mock_refresh_cache_token.assert_called_once_with(mock_request)
-        mock_write_cache_token.assert_called_once_with(token="test-token", cache_token={"key": "value", "licenses": [{"uuid": "test-license"}]})
+        mock_prepare_licences.assert_called_once_with("token-1")
+        mock_write_cache_licences.assert_awaited_once()
+        for request in requests:
+            assert request.state.licenses == [licence]
 
-    def test_check_licence_found(self):
+    async def test_check_licence_async_found(self):
         # Arrange
         mock_request = MagicMock()
-        licence = "test-license"
 
         # Act
-        with patch('middlewares.licence_middleware.is_licence_found') as mock_is_licence_found:
+        with patch('middlewares.licence_middleware.is_licence_found') as mock_is_licence_found, \
+             patch('middlewares.licence_middleware.refresh_licences_async', new_callable=AsyncMock) as mock_refresh:
             mock_is_licence_found.return_value = True
-            check_licence(mock_request, licence)
+            await check_licence_async(mock_request, "test-license")
 
         # Assert
-        mock_is_licence_found.assert_called_once_with(mock_request, licence)
+        mock_is_licence_found.assert_called_once_with(mock_request, "test-license")
+        mock_refresh.assert_not_awaited()
 
-    def test_check_licence_refresh_and_found(self):
+    async def test_check_licence_async_refresh_and_found(self):
         # Arrange
         mock_request = MagicMock()
-        licence = "test-license"
 
         # Act
         with patch('middlewares.licence_middleware.is_licence_found') as mock_is_licence_found, \
-             patch('middlewares.licence_middleware.refresh_licences') as mock_refresh_licences:
+             patch('middlewares.licence_middleware.refresh_licences_async', new_callable=AsyncMock) as mock_refresh:
             mock_is_licence_found.side_effect = [False, True]
-            check_licence(mock_request, licence)
+            await check_licence_async(mock_request, "test-license")
 
         # Assert
         assert mock_is_licence_found.call_count == 2
-        mock_refresh_licences.assert_called_once_with(mock_request)
+        mock_refresh.assert_awaited_once_with(mock_request)
 
-    def test_check_licence_not_found(self):
+    async def test_check_licence_async_not_found(self):
         # Arrange
         mock_request = MagicMock()
-        licence = "test-license"
 
         # Act & Assert
         with patch('middlewares.licence_middleware.is_licence_found') as mock_is_licence_found, \
-             patch('middlewares.licence_middleware.refresh_licences') as mock_refresh_licences:
+             patch('middlewares.licence_middleware.refresh_licences_async', new_callable=AsyncMock):
             mock_is_licence_found.return_value = False
 
             with pytest.raises(HTTPException) as exc_info:
-                check_licence(mock_request, licence)
+                await check_licence_async(mock_request, "test-license")
 
             assert exc_info.value.status_code == 403
-            assert exc_info.value.detail == "Licence not found"
-
-        assert mock_is_licence_found.call_count == 2
-        mock_refresh_licences.assert_called_once_with(mock_request)
-
 
-@pytest.mark.asyncio
-class TestLicenceVerificationMiddleware:
-    @patch('middlewares.licence_middleware.is_unprotected_path')
-    @patch('middlewares.licence_middleware.is_unlicensed_path')
-    async def test_dispatch_unprotected_path(self, mock_is_unlicensed_path, mock_is_unprotected_path):
+    async def test_check_licence_async_negative_cache(self):
         # Arrange
-        mock_is_unprotected_path.return_value = True
-        mock_is_unlicensed_path.return_value = False
+        mock_request = MagicMock()
+        mock_request.state.token = "test-token"
+        mock_request.state.user_uuid = "user-123"
+        suppressed_before = licence_refresh_stats["suppressed_negative"]
 
-        mock_app = MagicMock()
-        middleware = LicenceVerificationMiddleware(mock_app)
+        # Act
+        with patch('middlewares.licence_middleware.is_licence_found') as mock_is_licence_found, \
+             patch('middlewares.licence_middleware.refresh_licences_async', new_callable=AsyncMock) as mock_refresh:
+            mock_is_licence_found.return_value = False
+            for _ in range(3):
+                with pytest.raises(HTTPException):
+                    await check_licence_async(mock_request, "wrong-license")
 
-        mock_request = MagicMock()
-        mock_request.url.path = "/docs"
+        # Assert
+        mock_refresh.assert_awaited_once_with(mock_request)
+        assert ("user-123", "wrong-license") in licence_negative_cache
+        assert licence_refresh_stats["suppressed_negative"] - suppressed_before == 2
 
-        mock_call_next = AsyncMock()
-        mock_response = Response(content="Test response")
-        mock_call_next.return_value = mock_response
+    async def test_check_licence_async_failed_refresh_counts_for_min_refresh_interval(self):
+        # Arrange
+        mock_request = MagicMock()
+        mock_request.state.token = "test-token"
+        mock_request.state.user_uuid = "user-123"
+        gateway_error = HTTPException(status_code=500, detail="Licences request failed")
 
         # Act
-        response = await middleware.dispatch(mock_request, mock_call_next)
+        with patch('middlewares.licence_middleware.is_licence_found', return_value=False), \
+             patch('middlewares.licence_middleware.get_licences_async', new_callable=AsyncMock) as mock_get_licences:
+            mock_get_licences.side_effect = gateway_error
+            with pytest.raises(HTTPException) as first:
+                await check_licence_async(mock_request, "test-license")
+            with pytest.raises(HTTPException) as second:
+                await check_licence_async(mock_request, "test-license")
 
         # Assert
-        assert response == mock_response
-        mock_call_next.assert_called_once_with(mock_request)
+        assert first.value.status_code == 500
+        assert second.value.status_code == 403
+        mock_get_licences.assert_awaited_once_with("test-token")
+        assert "user-123" in licence_refreshed_users
 
-    @patch('middlewares.licence_middleware.is_unprotected_path')
-    @patch('middlewares.licence_middleware.is_unlicensed_path')
-    async def test_dispatch_unlicensed_path(self, mock_is_unlicensed_path, mock_is_unprotected_path):
+    async def test_check_licence_async_min_refresh_interval(self):
         # Arrange
-        mock_is_unprotected_path.return_value = False
-        mock_is_unlicensed_path.return_value = True
+        mock_request = MagicMock()
+        mock_request.state.token = "test-token"
+        mock_request.state.user_uuid = "user-123"
+        licence_refreshed_users.set("user-123", True)
+        suppressed_before = licence_refresh_stats["suppressed_interval"]
 
-        mock_app = MagicMock()
-        middleware = LicenceVerificationMiddleware(mock_app)
+        # Act & Assert
+        with patch('middlewares.licence_middleware.is_licence_found') as mock_is_licence_found, \
+             patch('middlewares.licence_middleware.refresh_licences_async', new_callable=AsyncMock) as mock_refresh:
+            mock_is_licence_found.return_value = False
+            with pytest.raises(HTTPException) as exc_info:
+                await check_licence_async(mock_request, "other-license")
 
-        mock_request = MagicMock()
-        mock_request.url.path = "/unlicensed-path"
+            assert exc_info.value.status_code == 403
+            mock_refresh.assert_not_awaited()
+
+        assert licence_refresh_stats["suppressed_interval"] - suppressed_before == 1
 
-        mock_call_next = AsyncMock()
-        mock_response = Response(content="Test response")
-        mock_call_next.return_value = mock_response
+    @patch('middlewares.licence_middleware.read_cache_licences_async', new_callable=AsyncMock)
+    async def test_load_cached_licences_async(self, mock_read_cache_licences):
+        # Arrange
+        mock_request = MagicMock()
+        mock_request.state.token = "test-token"
+        mock_request.state.user_uuid = "user-123"
+        mock_read_cache_licences.return_value = {
+            "licenses": [{"uuid": "test-license", "entity_uuid": "entity-1"}],
+            "licenses_index": {"test-license": 0}
+        }
 
         # Act
-        response = await middleware.dispatch(mock_request, mock_call_next)
+        await load_cached_licences_async(mock_request)
 
         # Assert
-        assert response == mock_response
-        mock_call_next.assert_called_once_with(mock_request)
-
-    @patch('middlewares.licence_middleware.is_unprotected_path')
-    @patch('middlewares.licence_middleware.is_unlicensed_path')
-    @patch('middlewares.licence_middleware.check_headers_licence')
-    @patch('middlewares.licence_middleware.extract_licence')
-    @patch('middlewares.licence_middleware.check_licence')
-    @patch('middlewares.licence_middleware.extract_entity')
-    async def test_dispatch_protected_path(self, mock_extract_entity, mock_check_licence, 
-                                          mock_extract_licence, mock_check_headers_licence,
-                                          mock_is_unlicensed_path, mock_is_unprotected_path):
-        # Arrange
-        mock_is_unprotected_path.return_value = False
-        mock_is_unlicensed_path.return_value = False
-        mock_extract_licence.return_value = "test-license"
-        mock_extract_entity.return_value = "test-entity"
-
-        mock_app = MagicMock()
-        middleware = LicenceVerificationMiddleware(mock_app)
+        assert mock_request.state.licenses == [{"uuid": "test-license", "entity_uuid": "entity-1"}]
+        assert mock_request.state.licenses_index == {"test-license": 0}
+        mock_read_cache_licences.assert_awaited_once_with("user-123")
 
+    @patch('middlewares.licence_middleware.read_cache_licences_async', new_callable=AsyncMock)
+    async def test_load_cached_licences_async_tracks_refresh_ahead(self, mock_read_cache_licences):
+        # Arrange
         mock_request = MagicMock()
-        mock_request.url.path = "/protected-path"
-
-        mock_call_next = AsyncMock()
-        mock_response = Response(content="Test response")
-        mock_call_next.return_value = mock_response
+        mock_request.state.token = "test-token"
+        mock_request.state.user_uuid = "user-123"
+        mock_read_cache_licences.return_value = {
+            "licenses": [{"uuid": "test-license"}],
+            "licenses_index": {"test-license": 0},
+            "expires_at": 1900000000
+        }
 
         # Act
-        response = await middleware.dispatch(mock_request, mock_call_next)
+        await load_cached_licences_async(mock_request)
+        await load_cached_licences_async(mock_request)
 
         # Assert
-        assert response == mock_response
-        mock_check_headers_licence.assert_called_once_with(mock_request)
-        mock_extract_licence.assert_called_once_with(mock_request)
-        mock_check_licence.assert_called_once_with(mock_request, "test-license")
-        assert mock_request.state.licence_uuid == "test-license"
-        mock_extract_entity.assert_called_once_with(mock_request)
-        assert mock_request.state.entity_uuid == "test-entity"
-        mock_call_next.assert_called_once_with(mock_request)
+        entry = licence_refresh_ahead.entries["user-123"]
+        assert entry["hits"] == 2
+        assert entry["expires_at"] == 1900000000
+        assert entry["context"] == "test-token"
 
-    @patch('middlewares.licence_middleware.is_unprotected_path')
-    @patch('middlewares.licence_middleware.is_unlicensed_path')
-    async def test_dispatch_exception_handling(self, mock_is_unlicensed_path, mock_is_unprotected_path):
+    @patch('middlewares.licence_middleware.read_cache_licences_async', new_callable=AsyncMock)
+    async def test_load_cached_licences_async_without_index(self, mock_read_cache_token):
         # Arrange
-        mock_is_unprotected_path.return_value = False
-        mock_is_unlicensed_path.return_value = False
+        mock_request = MagicMock()
+        mock_read_cache_token.return_value = {"licenses": [{"uuid": "test-license"}]}
 
-        mock_app = MagicMock()
-        middleware = LicenceVerificationMiddleware(mock_app)
+        # Act
+        await load_cached_licences_async(mock_request)
 
-        mock_request = MagicMock()
-        mock_request.url.path = "/protected-path"
-        mock_request.headers = {}  # This will cause check_headers_licence to raise an exception
+        # Assert
+        assert mock_request.state.licenses_index == {"test-license": 0}
 
-        mock_call_next = AsyncMock()
+    @patch('middlewares.licence_middleware.read_cache_licences_async', new_callable=AsyncMock)
+    async def test_load_cached_licences_async_no_licences(self, mock_read_cache_token):
+        # Arrange
+        mock_request = MagicMock()
+        mock_request.state = MagicMock(spec=[])
+        mock_read_cache_token.return_value = None
 
         # Act
-        response = await middleware.dispatch(mock_request, mock_call_next)
+        await load_cached_licences_async(mock_request)
 
         # Assert
-        assert isinstance(response, JSONResponse)
-        assert response.status_code == 403
-        assert response.body == b'{"detail":"Licence header missing"}'
-        mock_call_next.assert_not_called()
+        assert not hasattr(mock_request.state, 'licenses')
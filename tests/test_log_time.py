@@ -3,16 +3,22 @@ import pytest
 import asyncio
 from unittest.mock import patch, MagicMock
 from decorators.log_time import log_time, log_time_async
+from services.metrics_service import histograms, reset_metrics
 
 
 class TestLogTime:
-    @patch('decorators.log_time.logging')
+    def setup_method(self):
+        reset_metrics()
+
+    @patch('decorators.log_time.LOG_TIME_SAMPLE_RATE', 1.0)
+    @patch('decorators.log_time.logger')
     @patch('decorators.log_time.time')
     @patch('decorators.log_time.random')
     def test_log_time_decorator(self, mock_random, mock_time, mock_logging):
         # Arrange
+        mock_random.random.return_value = 0.5
         mock_random.randint.return_value = 12345
-        mock_time.time.side_effect = [100.0, 105.0]  # Start time, end time
+        mock_time.perf_counter_ns.side_effect = [100_000_000_000, 105_000_000_000]  # Start time, end time
         
         # Create a test function
         @log_time
@@ -25,18 +31,21 @@ class TestLogTime:
         # Assert
         assert result == 7
         mock_random.randint.assert_called_once_with(1, 1000000)
-        assert mock_time.time.call_count == 2
-        mock_logging.info.assert_any_call("test_function: Start 12345", 12345)
-        mock_logging.info.assert_any_call("test_function: End 12345 | Execution time: 5.0000 seconds")
+        assert mock_time.perf_counter_ns.call_count == 2
+        mock_logging.info.assert_any_call("%s: Start %s", "test_function", 12345)
+        mock_logging.info.assert_any_call("%s: End %s | Execution time: %.4f seconds", "test_function", 12345, 5.0)
+        assert histograms["test_function"].sum_ns == 5_000_000_000
     
     @pytest.mark.asyncio
-    @patch('decorators.log_time.logging')
+    @patch('decorators.log_time.LOG_TIME_SAMPLE_RATE', 1.0)
+    @patch('decorators.log_time.logger')
     @patch('decorators.log_time.time')
     @patch('decorators.log_time.random')
     async def test_log_time_async_decorator(self, mock_random, mock_time, mock_logging):
         # Arrange
+        mock_random.random.return_value = 0.5
         mock_random.randint.return_value = 67890
-        mock_time.time.side_effect = [200.0, 203.0]  # Start time, end time
+        mock_time.perf_counter_ns.side_effect = [200_000_000_000, 203_000_000_000]  # Start time, end time
         
         # Create a test async function
         @log_time_async
@@ -50,6 +59,38 @@ class TestLogTime:
         # Assert
         assert result == 30
         mock_random.randint.assert_called_once_with(1, 1000000)
-        assert mock_time.time.call_count == 2
-        mock_logging.info.assert_any_call("test_async_function: Start 67890")
-        mock_logging.info.assert_any_call("test_async_function: End 67890 | Execution time: 3.0000 seconds")
\ No newline at end of file
+        assert mock_time.perf_counter_ns.call_count == 2
+        mock_logging.info.assert_any_call("%s: Start %s", "test_async_function", 67890)
+        mock_logging.info.assert_any_call("%s: End %s | Execution time: %.4f seconds", "test_async_function", 67890, 3.0)
+        assert histograms["test_async_function"].count == 1
+
+    @pytest.mark.asyncio
+    @patch('decorators.log_time.LOG_TIME_SAMPLE_RATE', 0.0)
+    @patch('decorators.log_time.logger')
+    async def test_log_time_async_not_sampled_only_records_metrics(self, mock_logging):
+        # Arrange
+        @log_time_async
+        async def test_async_function():
+            return "done"
+
+        # Act
+        result = await test_async_function()
+
+        # Assert
+        assert result == "done"
+        mock_logging.info.assert_not_called()
+        assert histograms["test_async_function"].count == 1
+
+    @patch('decorators.log_time.LOG_TIME_SAMPLE_RATE', 0.0)
+    @patch('decorators.log_time.logger')
+    def test_log_time_records_metrics_when_function_raises(self, mock_logging):
+        # Arrange
+        @log_time
+        def test_function():
+            raise ValueError("boom")
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            test_function()
+        mock_logging.info.assert_not_called()
+        assert histograms["test_function"].count == 1
@@ -0,0 +1,89 @@
+import tests.env_setup
+import json
+import logging
+import pytest
+from unittest.mock import patch
+
+from utils.logger import JsonFormatter, TextFormatter, get_logger, configure_logging
+
+
+def make_record(msg, args=(), fields=None, level=logging.INFO):
+    record = logging.LogRecord("middlewares.token_middleware", level, __file__, 1, msg, args, None)
+    if fields is not None:
+        record.fields = fields
+    return record
+
+
+class TestFormatters:
+    def test_json_formatter_outputs_message_and_fields(self):
+        # Arrange
+        record = make_record("cache_token: %s", ({"sub": "user"},), fields={"service": "db"})
+
+        # Act
+        entry = json.loads(JsonFormatter().format(record))
+
+        # Assert
+        assert entry["level"] == "INFO"
+        assert entry["logger"] == "middlewares.token_middleware"
+        assert entry["message"] == "cache_token: {'sub': 'user'}"
+        assert entry["service"] == "db"
+        assert "time" in entry
+
+    def test_json_formatter_serializes_unknown_types_as_strings(self):
+        # Arrange
+        record = make_record("Error", fields={"error": ValueError("boom")})
+
+        # Act
+        entry = json.loads(JsonFormatter().format(record))
+
+        # Assert
+        assert entry["error"] == "boom"
+
+    def test_text_formatter_appends_fields(self):
+        # Arrange
+        record = make_record("Error creating secret", fields={"service": "db", "error": "boom"})
+
+        # Act
+        line = TextFormatter().format(record)
+
+        # Assert
+        assert line == "INFO:middlewares.token_middleware:Error creating secret service=db error=boom"
+
+
+class TestLogLevels:
+    def test_configure_logging_applies_per_module_levels(self):
+        # Arrange
+        root = logging.getLogger()
+        handlers, level = root.handlers[:], root.level
+        module_logger = get_logger("tests.logger_module")
+
+        # Act
+        try:
+            with patch('utils.logger.LOG_LEVELS', {'tests.logger_module': 'DEBUG'}), \
+                 patch('utils.logger.LOG_LEVEL', 'WARNING'):
+                configure_logging()
+
+            # Assert
+            assert root.level == logging.WARNING
+            assert isinstance(root.handlers[0].formatter, JsonFormatter)
+            assert module_logger.isEnabledFor(logging.DEBUG)
+            assert not get_logger("tests.other_module").isEnabledFor(logging.INFO)
+        finally:
+            root.handlers[:] = handlers
+            root.setLevel(level)
+            module_logger.setLevel(logging.NOTSET)
+
+    def test_disabled_level_does_not_format_arguments(self):
+        # Arrange
+        module_logger = get_logger("tests.lazy_module")
+        module_logger.setLevel(logging.INFO)
+
+        class Expensive:
+            def __str__(self):
+                raise AssertionError("formatted while DEBUG is disabled")
+
+        # Act & Assert
+        try:
+            module_logger.debug("cache_token: %s", Expensive())
+        finally:
+            module_logger.setLevel(logging.NOTSET)
@@ -0,0 +1,95 @@
+import tests.env_setup
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from services.metrics_service import Histogram, histograms, counters, collectors, observe, increment, \
+    register_collector, timed, reset_metrics, render_metrics
+
+
+class TestHistogram:
+    def test_observe_places_value_in_first_bucket_not_below_it(self):
+        # Arrange
+        histogram = Histogram((1_000, 10_000))
+
+        # Act
+        histogram.observe(500)
+        histogram.observe(1_000)
+        histogram.observe(5_000)
+        histogram.observe(50_000)
+
+        # Assert
+        assert histogram.counts == [2, 1, 1]
+        assert histogram.count == 4
+        assert histogram.sum_ns == 56_500
+
+
+class TestMetricsService:
+    def setup_method(self):
+        reset_metrics()
+
+    def teardown_method(self):
+        collectors.pop("test", None)
+
+    def test_timed_records_sync_calls(self):
+        # Arrange
+        @timed("sync_stage")
+        def add(a, b):
+            return a + b
+
+        # Act
+        result = add(1, 2)
+
+        # Assert
+        assert result == 3
+        assert add.__name__ == "add"
+        assert histograms["sync_stage"].count == 1
+
+    @pytest.mark.asyncio
+    async def test_timed_records_async_calls_even_on_error(self):
+        # Arrange
+        @timed("async_stage")
+        async def fail():
+            raise RuntimeError("boom")
+
+        # Act
+        with pytest.raises(RuntimeError):
+            await fail()
+
+        # Assert
+        assert histograms["async_stage"].count == 1
+
+    def test_render_metrics_exports_prometheus_text(self):
+        # Arrange
+        observe("vault", 3_000_000)
+        increment("auth_rejections")
+        register_collector("test", lambda: {"hits": 4, "enabled": True, "name": "ignored"})
+
+        # Act
+        text = render_metrics()
+
+        # Assert
+        assert "# TYPE api_credential_stage_duration_seconds histogram" in text
+        assert 'api_credential_stage_duration_seconds_bucket{stage="vault",le="0.0025"} 0' in text
+        assert 'api_credential_stage_duration_seconds_bucket{stage="vault",le="0.005"} 1' in text
+        assert 'api_credential_stage_duration_seconds_bucket{stage="vault",le="+Inf"} 1' in text
+        assert 'api_credential_stage_duration_seconds_sum{stage="vault"} 0.003' in text
+        assert 'api_credential_stage_duration_seconds_count{stage="vault"} 1' in text
+        assert "api_credential_auth_rejections_total 1" in text
+        assert "api_credential_test_hits 4" in text
+        assert "api_credential_test_enabled" not in text
+        assert "api_credential_test_name" not in text
+
+    def test_metrics_endpoint_is_unprotected(self):
+        # Arrange
+        client = TestClient(main.app)
+        observe("token_cache", 1_000)
+
+        # Act
+        response = client.get("/metrics")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert 'stage="token_cache"' in response.text
+        assert "api_credential_token_l1_cache_hits" in response.text
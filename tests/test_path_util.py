@@ -1,6 +1,7 @@
 import tests.env_setup
 import pytest
-from utils.path_util import is_unprotected_path, is_unlicensed_path
+from utils.path_util import is_unprotected_path, is_unlicensed_path, PathMatcher, classify_request, \
+    is_unprotected_request, is_unlicensed_request, is_path_segment, PATH_ACCESS_SCOPE_KEY
 from config.config import UNPROTECTED_PATHS, UNLICENSED_PATHS
 
 
@@ -16,9 +17,86 @@ class TestPathUtil:
     def test_is_unlicensed_path_true(self):
         # Since UNLICENSED_PATHS might be empty, we'll mock it for this test
         with pytest.MonkeyPatch().context() as m:
-            m.setattr("utils.path_util.UNLICENSED_PATHS", ["/unlicensed-path"])
+            m.setattr("utils.path_util.unlicensed_paths", PathMatcher(["/unlicensed-path"]))
             assert is_unlicensed_path("/unlicensed-path") is True
 
     def test_is_unlicensed_path_false(self):
         # Test with a path that is not in UNLICENSED_PATHS
         assert is_unlicensed_path("/some-random-path") is False
+
+    def test_is_unprotected_path_ignores_case(self):
+        # Test that matching is case-insensitive like the previous lowercase lookup
+        assert is_unprotected_path("/DOCS") is True
+
+
+class TestPathMatcher:
+    def test_exact_rules_use_frozenset(self):
+        # Arrange
+        matcher = PathMatcher(["/Metrics", "/ready"])
+
+        # Assert
+        assert matcher.exact == frozenset({"/metrics", "/ready"})
+        assert matcher.pattern is None
+        assert matcher.matches("/metrics") is True
+        assert matcher.matches("/metrics/extra") is False
+
+    def test_trailing_star_is_a_prefix_rule(self):
+        # Arrange
+        matcher = PathMatcher(["/docs/*"])
+
+        # Assert
+        assert matcher.matches("/docs/oauth2-redirect") is True
+        assert matcher.matches("/docs/nested/page") is True
+        assert matcher.matches("/docs") is False
+        assert matcher.matches("/docsx/page") is False
+
+    def test_inner_wildcards_stay_within_a_segment(self):
+        # Arrange
+        matcher = PathMatcher(["/credential/*/health", "/credential/v?/status"])
+
+        # Assert
+        assert matcher.matches("/credential/v1/health") is True
+        assert matcher.matches("/credential/v1/extra/health") is False
+        assert matcher.matches("/credential/v2/status") is True
+        assert matcher.matches("/credential/v10/status") is False
+
+    def test_rule_characters_are_escaped(self):
+        # Arrange
+        matcher = PathMatcher(["/credential/openapi.json*"])
+
+        # Assert
+        assert matcher.matches("/credential/openapi.json") is True
+        assert matcher.matches("/credential/openapiXjson") is False
+
+
+class TestClassifyRequest:
+    def test_classification_is_cached_on_scope(self):
+        # Arrange
+        scope = {"type": "http", "path": "/docs"}
+
+        # Act
+        first = classify_request(scope)
+        scope["path"] = "/protected"
+        second = classify_request(scope)
+
+        # Assert
+        assert first == (True, False)
+        assert second is first
+        assert scope[PATH_ACCESS_SCOPE_KEY] == (True, False)
+
+    def test_request_helpers(self):
+        # Arrange
+        scope = {"type": "http", "path": "/credential/v1/database"}
+
+        # Assert
+        assert is_unprotected_request(scope) is False
+        assert is_unlicensed_request(scope) is False
+
+    def test_is_path_segment(self):
+        # Assert
+        assert is_path_segment("database") is True
+        assert is_path_segment("db..backup") is True
+        assert is_path_segment("a/b") is False
+        assert is_path_segment("..") is False
+        assert is_path_segment(".") is False
+        assert is_path_segment("") is False
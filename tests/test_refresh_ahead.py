@@ -0,0 +1,194 @@
+import tests.env_setup
+import asyncio
+import pytest
+from unittest.mock import patch, AsyncMock
+
+from utils.refresh_ahead import RefreshAhead
+
+
+def build_refresh_ahead(refresh=None, **overrides):
+    options = {
+        "window": 60,
+        "interval": 0.01,
+        "jitter": 0,
+        "concurrency": 2,
+        "min_hits": 2,
+        "hot_ttl": 300,
+        "maxsize": 100
+    }
+    options.update(overrides)
+    return RefreshAhead(refresh=refresh or AsyncMock(return_value=None), **options)
+
+
+class TestRefreshAheadTracking:
+    @patch('utils.refresh_ahead.time')
+    def test_key_is_due_once_hot_and_close_to_expiry(self, mock_time):
+        # Arrange
+        mock_time.time.return_value = 1000
+        refresh_ahead = build_refresh_ahead()
+
+        # Act
+        refresh_ahead.track("user-1", 1030, "token-1")
+        due_after_one_hit = refresh_ahead.due_keys(1000)
+        refresh_ahead.track("user-1", 1030, "token-2")
+        due_after_two_hits = refresh_ahead.due_keys(1000)
+
+        # Assert
+        assert due_after_one_hit == []
+        assert due_after_two_hits == ["user-1"]
+        assert refresh_ahead.entries["user-1"]["context"] == "token-2"
+
+    @patch('utils.refresh_ahead.time')
+    def test_key_far_from_expiry_is_not_due(self, mock_time):
+        # Arrange
+        mock_time.time.return_value = 1000
+        refresh_ahead = build_refresh_ahead()
+        refresh_ahead.track("user-1", 5000)
+        refresh_ahead.track("user-1", 5000)
+
+        # Act & Assert
+        assert refresh_ahead.due_keys(1000) == []
+
+    @patch('utils.refresh_ahead.time')
+    def test_cold_key_restarts_hit_count_and_is_dropped(self, mock_time):
+        # Arrange
+        refresh_ahead = build_refresh_ahead()
+        mock_time.time.return_value = 1000
+        refresh_ahead.track("user-1", 5000)
+        mock_time.time.return_value = 1400
+
+        # Act
+        refresh_ahead.track("user-1", 5000)
+        hits = refresh_ahead.entries["user-1"]["hits"]
+        due = refresh_ahead.due_keys(1800)
+
+        # Assert
+        assert hits == 1
+        assert due == []
+        assert "user-1" not in refresh_ahead.entries
+
+    @patch('utils.refresh_ahead.time')
+    def test_maxsize_evicts_least_recently_read(self, mock_time):
+        # Arrange
+        mock_time.time.return_value = 1000
+        refresh_ahead = build_refresh_ahead(maxsize=2)
+
+        # Act
+        refresh_ahead.track("user-1", 5000)
+        refresh_ahead.track("user-2", 5000)
+        refresh_ahead.track("user-1", 5000)
+        refresh_ahead.track("user-3", 5000)
+
+        # Assert
+        assert list(refresh_ahead.entries) == ["user-1", "user-3"]
+
+    def test_disabled_when_maxsize_is_zero(self):
+        # Arrange
+        refresh_ahead = build_refresh_ahead(maxsize=0)
+
+        # Act
+        refresh_ahead.track("user-1", 5000)
+
+        # Assert
+        assert len(refresh_ahead.entries) == 0
+
+
+@pytest.mark.asyncio
+class TestRefreshAheadScheduling:
+    async def test_run_once_refreshes_due_keys_and_extends_expiry(self):
+        # Arrange
+        now = 1000
+        refresh = AsyncMock(return_value=now + 3600)
+        refresh_ahead = build_refresh_ahead(refresh)
+        with patch('utils.refresh_ahead.time') as mock_time:
+            mock_time.time.return_value = now
+            refresh_ahead.track("user-1", now + 30, "token-1")
+            refresh_ahead.track("user-1", now + 30, "token-1")
+
+            # Act
+            refresh_ahead.run_once()
+            await asyncio.gather(*refresh_ahead.refreshing.values())
+
+        # Assert
+        refresh.assert_awaited_once_with("user-1", "token-1")
+        assert refresh_ahead.entries["user-1"]["expires_at"] == now + 3600
+        assert refresh_ahead.stats()["refreshed"] == 1
+        assert refresh_ahead.refreshing == {}
+
+    async def test_refresh_that_does_not_extend_expiry_is_not_repeated(self):
+        # Arrange
+        now = 1000
+        refresh = AsyncMock(return_value=now + 30)
+        refresh_ahead = build_refresh_ahead(refresh)
+        with patch('utils.refresh_ahead.time') as mock_time:
+            mock_time.time.return_value = now
+            refresh_ahead.track("user-1", now + 30)
+            refresh_ahead.track("user-1", now + 30)
+
+            # Act
+            refresh_ahead.run_once()
+            await asyncio.gather(*refresh_ahead.refreshing.values())
+            refresh_ahead.track("user-1", now + 30)
+            refresh_ahead.run_once()
+
+        # Assert
+        refresh.assert_awaited_once()
+        assert refresh_ahead.refreshing == {}
+
+    async def test_failed_refresh_drops_key(self):
+        # Arrange
+        refresh = AsyncMock(side_effect=RuntimeError("gateway down"))
+        refresh_ahead = build_refresh_ahead(refresh)
+        with patch('utils.refresh_ahead.time') as mock_time:
+            mock_time.time.return_value = 1000
+            refresh_ahead.track("user-1", 1030)
+            refresh_ahead.track("user-1", 1030)
+
+            # Act
+            refresh_ahead.run_once()
+            await asyncio.gather(*refresh_ahead.refreshing.values())
+
+        # Assert
+        assert "user-1" not in refresh_ahead.entries
+        assert refresh_ahead.stats()["failed"] == 1
+
+    async def test_concurrency_is_capped(self):
+        # Arrange
+        running = 0
+        max_running = 0
+
+        async def refresh(key, context):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return 5000
+
+        refresh_ahead = build_refresh_ahead(refresh, concurrency=2, min_hits=1)
+        with patch('utils.refresh_ahead.time') as mock_time:
+            mock_time.time.return_value = 1000
+            for user in range(5):
+                refresh_ahead.track(f"user-{user}", 1030)
+
+            # Act
+            refresh_ahead.run_once()
+            await asyncio.gather(*refresh_ahead.refreshing.values())
+
+        # Assert
+        assert max_running == 2
+        assert refresh_ahead.stats()["refreshed"] == 5
+
+    async def test_start_and_stop(self):
+        # Arrange
+        refresh_ahead = build_refresh_ahead()
+
+        # Act
+        refresh_ahead.start()
+        task = refresh_ahead.task
+        await asyncio.sleep(0.02)
+        await refresh_ahead.stop()
+
+        # Assert
+        assert task.cancelled()
+        assert refresh_ahead.task is None
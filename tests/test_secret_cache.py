@@ -0,0 +1,82 @@
+import tests.env_setup
+import pytest
+from unittest.mock import patch
+from cryptography.exceptions import InvalidTag
+
+from services.secret_cache import SecretCache
+
+
+@pytest.fixture
+def cache():
+    return SecretCache(maxsize=10, ttl=300, max_staleness=30)
+
+
+class TestSecretCache:
+    def test_set_and_read(self, cache):
+        # Arrange
+        key = ("entity", "licence", "service")
+        cache.set(key, {"password": "secret"}, 3)
+
+        # Act
+        entry = cache.get(key)
+
+        # Assert
+        assert entry["version"] == 3
+        assert cache.read(key, entry) == {"password": "secret"}
+
+    def test_entry_is_encrypted(self, cache):
+        # Arrange
+        key = ("entity", "licence", "service")
+
+        # Act
+        cache.set(key, {"password": "very-secret-value"}, 1)
+
+        # Assert
+        assert b"very-secret-value" not in cache.get(key)["ciphertext"]
+
+    def test_ciphertext_bound_to_key(self, cache):
+        # Arrange
+        key = ("entity", "licence", "service")
+        cache.set(key, {"password": "secret"}, 1)
+        entry = cache.get(key)
+
+        # Act & Assert
+        with pytest.raises(InvalidTag):
+            cache.read(("entity", "licence", "other-service"), entry)
+
+    def test_key_is_per_instance(self, cache):
+        # Arrange
+        key = ("entity", "licence", "service")
+        cache.set(key, {"password": "secret"}, 1)
+        other_cache = SecretCache(maxsize=10, ttl=300, max_staleness=30)
+
+        # Act & Assert
+        with pytest.raises(InvalidTag):
+            other_cache.read(key, cache.get(key))
+
+    @patch('services.secret_cache.time')
+    def test_is_stale(self, mock_time, cache):
+        # Arrange
+        key = ("entity", "licence", "service")
+        mock_time.monotonic.return_value = 1000.0
+        cache.set(key, {"password": "secret"}, 1)
+        entry = cache.get(key)
+
+        # Act & Assert
+        mock_time.monotonic.return_value = 1029.0
+        assert cache.is_stale(entry) is False
+        mock_time.monotonic.return_value = 1030.0
+        assert cache.is_stale(entry) is True
+        cache.mark_verified(entry)
+        assert cache.is_stale(entry) is False
+
+    def test_delete(self, cache):
+        # Arrange
+        key = ("entity", "licence", "service")
+        cache.set(key, {"password": "secret"}, 1)
+
+        # Act
+        cache.delete(key)
+
+        # Assert
+        assert cache.get(key) is None
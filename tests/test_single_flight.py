@@ -0,0 +1,77 @@
+import tests.env_setup
+import asyncio
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    async def test_concurrent_calls_are_coalesced(self):
+        # Arrange
+        flight = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"active": True}
+
+        # Act
+        results = await asyncio.gather(*(flight.do("token", fetch) for _ in range(5)))
+
+        # Assert
+        assert calls == 1
+        assert results == [{"active": True}] * 5
+        assert flight.stats() == {"in_flight": 0, "executed": 1, "coalesced": 4}
+
+    async def test_different_keys_are_not_coalesced(self):
+        # Arrange
+        flight = SingleFlight()
+
+        async def fetch(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        # Act
+        results = await asyncio.gather(flight.do("a", lambda: fetch("a")), flight.do("b", lambda: fetch("b")))
+
+        # Assert
+        assert results == ["a", "b"]
+        assert flight.stats()["executed"] == 2
+
+    async def test_exception_is_shared_and_key_released(self):
+        # Arrange
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        # Act
+        results = await asyncio.gather(flight.do("token", fetch), flight.do("token", fetch), return_exceptions=True)
+        await asyncio.sleep(0)
+
+        # Assert
+        assert all(isinstance(result, ValueError) for result in results)
+        assert flight.stats()["in_flight"] == 0
+
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        # Arrange
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.02)
+            return "done"
+
+        first = asyncio.ensure_future(flight.do("token", fetch))
+        second = asyncio.ensure_future(flight.do("token", fetch))
+        await asyncio.sleep(0)
+
+        # Act
+        first.cancel()
+        result = await second
+
+        # Assert
+        assert result == "done"
@@ -1,28 +1,38 @@
 import tests.env_setup
+import asyncio
 import pytest
 import time
 from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi import HTTPException
-from starlette.requests import Request
-from starlette.responses import Response, JSONResponse
 
+from utils.cache_codec import encode_cache_value
 from middlewares.token_middleware import (
     generate_state_info,
     is_token_valid_audience,
     is_token_active,
     read_cache_token,
+    read_cache_token_async,
     write_cache_token,
+    write_cache_token_async,
     introspect_token,
+    introspect_token_async,
+    verify_token_async,
     prepare_cache_token,
     get_token_info,
+    get_token_info_async,
+    fetch_token_info_locked_async,
     delete_cache_token,
+    delete_cache_token_async,
     is_headers_token_present,
     extract_token,
     refresh_cache_token,
+    refresh_cache_token_async,
     store_token_info_in_state,
     check_headers_token,
     check_token,
-    TokenVerificationMiddleware
+    token_l1_cache,
+    token_flight,
+    token_lock_stats,
 )
 
 
@@ -164,6 +174,80 @@ class TestTokenMiddlewareFunctions:
         assert result == {'key': 'value'}
         mock_redis.get.assert_called_once_with(token)
 
+    @patch('middlewares.token_middleware.r')
+    def test_read_cache_token_migrates_legacy_entry(self, mock_redis):
+        # Arrange
+        token = "test-token"
+        mock_redis.get.return_value = "{'key': 'value'}"
+
+        # Act
+        read_cache_token(token)
+
+        # Assert
+        mock_redis.set.assert_called_once_with(token, encode_cache_value({'key': 'value'}), keepttl=True, xx=True)
+
+    @patch('middlewares.token_middleware.r')
+    def test_read_cache_token_codec_entry(self, mock_redis):
+        # Arrange
+        token = "test-token"
+        mock_redis.get.return_value = encode_cache_value({'key': 'value'})
+
+        # Act
+        result = read_cache_token(token)
+
+        # Assert
+        assert result == {'key': 'value'}
+        mock_redis.set.assert_not_called()
+
+    @patch('middlewares.token_middleware.r')
+    def test_read_cache_token_does_not_evaluate_code(self, mock_redis):
+        # Arrange
+        token = "test-token"
+        mock_redis.get.return_value = "__import__('os').getcwd()"
+
+        # Act & Assert
+        with pytest.raises(ValueError):
+            read_cache_token(token)
+
+    @patch('middlewares.token_middleware.r')
+    def test_read_cache_token_from_l1_cache(self, mock_redis):
+        # Arrange
+        token = "test-token"
+        token_l1_cache.set(token, {'key': 'value'})
+
+        # Act
+        result = read_cache_token(token)
+
+        # Assert
+        assert result == {'key': 'value'}
+        mock_redis.get.assert_not_called()
+
+    @patch('middlewares.token_middleware.r')
+    def test_read_cache_token_populates_l1_cache(self, mock_redis):
+        # Arrange
+        token = "test-token"
+        mock_redis.get.return_value = str({'key': 'value', 'exp': int(time.time()) + 3600})
+
+        # Act
+        read_cache_token(token)
+        result = read_cache_token(token)
+
+        # Assert
+        assert result['key'] == 'value'
+        mock_redis.get.assert_called_once_with(token)
+
+    @patch('middlewares.token_middleware.r')
+    def test_read_cache_token_expired_token_not_kept_in_l1_cache(self, mock_redis):
+        # Arrange
+        token = "test-token"
+        mock_redis.get.return_value = str({'key': 'value', 'exp': int(time.time()) - 10})
+
+        # Act
+        read_cache_token(token)
+
+        # Assert
+        assert token not in token_l1_cache
+
     @patch('middlewares.token_middleware.r')
     def test_read_cache_token_not_found(self, mock_redis):
         # Arrange
@@ -189,7 +273,7 @@ class TestTokenMiddlewareFunctions:
         write_cache_token(token, cache_token)
 
         # Assert
-        mock_redis.set.assert_called_once_with(token, str(cache_token), ex=890)
+        mock_redis.set.assert_called_once_with(token, encode_cache_value(cache_token), ex=890)
 
     @patch('middlewares.token_middleware.r')
     @patch('middlewares.token_middleware.time')
@@ -293,12 +377,14 @@ class TestTokenMiddlewareFunctions:
     def test_delete_cache_token(self, mock_redis):
         # Arrange
         token = "test-token"
+        token_l1_cache.set(token, {'key': 'value'})
 
         # Act
         delete_cache_token(token)
 
         # Assert
         mock_redis.delete.assert_called_once_with(token)
+        assert token not in token_l1_cache
 
     def test_is_headers_token_present_true(self):
         # Arrange
@@ -347,7 +433,7 @@ class TestTokenMiddlewareFunctions:
     @patch('middlewares.token_middleware.check_headers_token')
     @patch('middlewares.token_middleware.extract_token')
     @patch('middlewares.token_middleware.delete_cache_token')
-    @patch('middlewares.token_middleware.get_token_info')
+    @patch('middlewares.token_middleware.fetch_token_info')
     @patch('middlewares.token_middleware.check_token')
     @patch('middlewares.token_middleware.generate_state_info')
     @patch('middlewares.token_middleware.store_token_info_in_state')
@@ -366,7 +452,7 @@ class TestTokenMiddlewareFunctions:
         # Assert
         mock_check_headers_token.assert_called_once_with(mock_request)
         mock_extract_token.assert_called_once_with(mock_request)
-        mock_delete_cache_token.assert_called_once_with("test-token")
+        mock_delete_cache_token.assert_not_called()
         mock_get_token_info.assert_called_once_with("test-token")
         mock_check_token.assert_called_once_with({"active": True})
         mock_generate_state_info.assert_called_once_with({"active": True})
@@ -474,89 +560,359 @@ class TestTokenMiddlewareFunctions:
 
 
 @pytest.mark.asyncio
-class TestTokenVerificationMiddleware:
-    @patch('middlewares.token_middleware.is_unprotected_path')
-    async def test_dispatch_unprotected_path(self, mock_is_unprotected_path):
+class TestTokenMiddlewareAsyncFunctions:
+    @patch('middlewares.token_middleware.r_async')
+    async def test_read_cache_token_async_found(self, mock_redis):
         # Arrange
-        mock_is_unprotected_path.return_value = True
+        token = "test-token"
+        mock_redis.get = AsyncMock(return_value=encode_cache_value({'key': 'value'}))
+        mock_redis.set = AsyncMock()
 
-        mock_app = MagicMock()
-        middleware = TokenVerificationMiddleware(mock_app)
+        # Act
+        result = await read_cache_token_async(token)
 
-        mock_request = MagicMock()
-        mock_request.url.path = "/docs"
+        # Assert
+        assert result == {'key': 'value'}
+        mock_redis.get.assert_awaited_once_with(token)
+        mock_redis.set.assert_not_called()
 
-        mock_call_next = AsyncMock()
-        mock_response = Response(content="Test response")
-        mock_call_next.return_value = mock_response
+    @patch('middlewares.token_middleware.r_async')
+    async def test_read_cache_token_async_migrates_legacy_entry(self, mock_redis):
+        # Arrange
+        token = "test-token"
+        mock_redis.get = AsyncMock(return_value="{'key': 'value'}")
+        mock_redis.set = AsyncMock()
 
         # Act
-        response = await middleware.dispatch(mock_request, mock_call_next)
+        result = await read_cache_token_async(token)
 
         # Assert
-        assert response == mock_response
-        mock_is_unprotected_path.assert_called_once_with("/docs")
-        mock_call_next.assert_called_once_with(mock_request)
+        assert result == {'key': 'value'}
+        mock_redis.set.assert_awaited_once_with(token, encode_cache_value({'key': 'value'}), keepttl=True, xx=True)
 
-    @patch('middlewares.token_middleware.is_unprotected_path')
-    @patch('middlewares.token_middleware.check_headers_token')
-    @patch('middlewares.token_middleware.extract_token')
-    @patch('middlewares.token_middleware.get_token_info')
-    @patch('middlewares.token_middleware.check_token')
-    @patch('middlewares.token_middleware.generate_state_info')
-    @patch('middlewares.token_middleware.store_token_info_in_state')
-    async def test_dispatch_protected_path(self, mock_store_token_info_in_state, mock_generate_state_info,
-                                          mock_check_token, mock_get_token_info, mock_extract_token,
-                                          mock_check_headers_token, mock_is_unprotected_path):
+    @patch('middlewares.token_middleware.r_async')
+    async def test_read_cache_token_async_not_found(self, mock_redis):
         # Arrange
-        mock_is_unprotected_path.return_value = False
-        mock_extract_token.return_value = "test-token"
-        mock_get_token_info.return_value = {"active": True}
-        mock_generate_state_info.return_value = {"user_uuid": "user-123"}
+        token = "test-token"
+        mock_redis.get = AsyncMock(return_value=None)
 
-        mock_app = MagicMock()
-        middleware = TokenVerificationMiddleware(mock_app)
+        # Act
+        result = await read_cache_token_async(token)
 
-        mock_request = MagicMock()
-        mock_request.url.path = "/protected-path"
+        # Assert
+        assert result is None
 
-        mock_call_next = AsyncMock()
-        mock_response = Response(content="Test response")
-        mock_call_next.return_value = mock_response
+    @patch('middlewares.token_middleware.r_async')
+    @patch('middlewares.token_middleware.time')
+    async def test_write_cache_token_async(self, mock_time, mock_redis):
+        # Arrange
+        token = "test-token"
+        cache_token = {"key": "value", "exp": 1234567890}
+        mock_time.time.return_value = 1234567000
+        mock_redis.set = AsyncMock()
 
         # Act
-        response = await middleware.dispatch(mock_request, mock_call_next)
+        await write_cache_token_async(token, cache_token)
 
         # Assert
-        assert response == mock_response
-        mock_is_unprotected_path.assert_called_once_with("/protected-path")
-        mock_check_headers_token.assert_called_once_with(mock_request)
-        mock_extract_token.assert_called_once_with(mock_request)
-        mock_get_token_info.assert_called_once_with("test-token")
-        mock_check_token.assert_called_once_with({"active": True})
-        mock_generate_state_info.assert_called_once_with({"active": True})
-        mock_store_token_info_in_state.assert_called_once_with({"user_uuid": "user-123"}, mock_request)
-        mock_call_next.assert_called_once_with(mock_request)
+        mock_redis.set.assert_awaited_once_with(token, encode_cache_value(cache_token), ex=890)
+        assert token_l1_cache.get(token) == cache_token
 
-    @patch('middlewares.token_middleware.is_unprotected_path')
-    async def test_dispatch_exception_handling(self, mock_is_unprotected_path):
+    @patch('middlewares.token_middleware.TOKEN_VERIFICATION_MODE', 'local')
+    @patch('middlewares.token_middleware.TOKEN_REVOCATION_CHECK_INTERVAL', 60)
+    @patch('middlewares.token_middleware.r_async')
+    @patch('middlewares.token_middleware.time')
+    async def test_write_cache_token_async_capped_by_revocation_check(self, mock_time, mock_redis):
         # Arrange
-        mock_is_unprotected_path.return_value = False
+        token = "test-token"
+        cache_token = {"key": "value", "exp": 1234567890}
+        mock_time.time.return_value = 1234567000
+        mock_redis.set = AsyncMock()
 
-        mock_app = MagicMock()
-        middleware = TokenVerificationMiddleware(mock_app)
+        # Act
+        await write_cache_token_async(token, cache_token)
 
-        mock_request = MagicMock()
-        mock_request.url.path = "/protected-path"
-        mock_request.headers = {}  # This will cause check_headers_token to raise an exception
+        # Assert
+        mock_redis.set.assert_awaited_once_with(token, encode_cache_value(cache_token), ex=60)
 
-        mock_call_next = AsyncMock()
+    @patch('middlewares.token_middleware.r_async')
+    async def test_read_cache_token_async_from_l1_cache(self, mock_redis):
+        # Arrange
+        token = "test-token"
+        token_l1_cache.set(token, {'key': 'value'})
+        mock_redis.get = AsyncMock()
 
         # Act
-        response = await middleware.dispatch(mock_request, mock_call_next)
+        result = await read_cache_token_async(token)
 
         # Assert
-        assert isinstance(response, JSONResponse)
-        assert response.status_code == 401
-        assert response.body == b'{"detail":"Token manquant ou invalide"}'
-        mock_call_next.assert_not_called()
\ No newline at end of file
+        assert result == {'key': 'value'}
+        mock_redis.get.assert_not_called()
+
+    @patch('middlewares.token_middleware.r_async')
+    async def test_delete_cache_token_async(self, mock_redis):
+        # Arrange
+        token = "test-token"
+        mock_redis.delete = AsyncMock()
+
+        # Act
+        await delete_cache_token_async(token)
+
+        # Assert
+        mock_redis.delete.assert_awaited_once_with(token)
+
+    @patch('middlewares.token_middleware.get_http_client')
+    async def test_introspect_token_async_success(self, mock_get_http_client):
+        # Arrange
+        token = "test-token"
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"active": True}
+        mock_get_http_client.return_value.post = AsyncMock(return_value=mock_response)
+
+        # Act
+        result = await introspect_token_async(token)
+
+        # Assert
+        assert result == {"active": True}
+        mock_get_http_client.return_value.post.assert_awaited_once()
+
+    @patch('middlewares.token_middleware.get_http_client')
+    async def test_introspect_token_async_failure(self, mock_get_http_client):
+        # Arrange
+        token = "test-token"
+        mock_response = MagicMock()
+        mock_response.status_code = 500
+        mock_get_http_client.return_value.post = AsyncMock(return_value=mock_response)
+
+        # Act & Assert
+        with pytest.raises(HTTPException) as exc_info:
+            await introspect_token_async(token)
+
+        assert exc_info.value.status_code == 500
+        assert exc_info.value.detail == "Keycloak introspection failed"
+
+    @patch('middlewares.token_middleware.TOKEN_VERIFICATION_MODE', 'introspection')
+    @patch('middlewares.token_middleware.verify_token_locally', new_callable=AsyncMock)
+    @patch('middlewares.token_middleware.introspect_token_async', new_callable=AsyncMock)
+    async def test_verify_token_async_introspection_mode(self, mock_introspect_token, mock_verify_token_locally):
+        # Arrange
+        mock_introspect_token.return_value = {"active": True}
+
+        # Act
+        result = await verify_token_async("test-token")
+
+        # Assert
+        assert result == {"active": True}
+        mock_verify_token_locally.assert_not_called()
+        mock_introspect_token.assert_awaited_once_with("test-token")
+
+    @patch('middlewares.token_middleware.TOKEN_VERIFICATION_MODE', 'local')
+    @patch('middlewares.token_middleware.verify_token_locally', new_callable=AsyncMock)
+    @patch('middlewares.token_middleware.introspect_token_async', new_callable=AsyncMock)
+    async def test_verify_token_async_local_mode(self, mock_introspect_token, mock_verify_token_locally):
+        # Arrange
+        mock_verify_token_locally.return_value = {"sub": "user-123", "active": True}
+
+        # Act
+        result = await verify_token_async("test-token")
+
+        # Assert
+        assert result == {"sub": "user-123", "active": True}
+        mock_introspect_token.assert_not_called()
+
+    @patch('middlewares.token_middleware.TOKEN_VERIFICATION_MODE', 'local')
+    @patch('middlewares.token_middleware.TOKEN_REVOCATION_CHECK_INTERVAL', 60)
+    @patch('middlewares.token_middleware.verify_token_locally', new_callable=AsyncMock)
+    @patch('middlewares.token_middleware.introspect_token_async', new_callable=AsyncMock)
+    async def test_verify_token_async_local_mode_revocation_check(self, mock_introspect_token, mock_verify_token_locally):
+        # Arrange
+        mock_verify_token_locally.return_value = {"sub": "user-123", "active": True}
+        mock_introspect_token.return_value = {"sub": "user-123", "active": True}
+
+        # Act
+        result = await verify_token_async("test-token")
+
+        # Assert
+        assert result == {"sub": "user-123", "active": True}
+        mock_introspect_token.assert_awaited_once_with("test-token")
+
+    @patch('middlewares.token_middleware.TOKEN_VERIFICATION_MODE', 'local')
+    @patch('middlewares.token_middleware.TOKEN_REVOCATION_CHECK_INTERVAL', 60)
+    @patch('middlewares.token_middleware.verify_token_locally', new_callable=AsyncMock)
+    @patch('middlewares.token_middleware.introspect_token_async', new_callable=AsyncMock)
+    async def test_verify_token_async_local_mode_rejects_revoked_token(self, mock_introspect_token,
+                                                                       mock_verify_token_locally):
+        # Arrange
+        now = int(time.time())
+        mock_verify_token_locally.return_value = {"sub": "user-123", "aud": "karned", "iat": now - 10,
+                                                  "exp": now + 3600, "active": True}
+        mock_introspect_token.return_value = {"active": False}
+
+        # Act
+        result = await verify_token_async("revoked-token")
+
+        # Assert
+        assert result == {"active": False}
+        with pytest.raises(HTTPException) as exc_info:
+            check_token(result)
+        assert exc_info.value.status_code == 401
+
+    @patch('middlewares.token_middleware.TOKEN_VERIFICATION_MODE', 'local')
+    @patch('middlewares.token_middleware.verify_token_locally', new_callable=AsyncMock)
+    @patch('middlewares.token_middleware.introspect_token_async', new_callable=AsyncMock)
+    async def test_verify_token_async_local_mode_fallback(self, mock_introspect_token, mock_verify_token_locally):
+        # Arrange
+        mock_verify_token_locally.return_value = None
+        mock_introspect_token.return_value = {"active": True}
+
+        # Act
+        result = await verify_token_async("opaque-token")
+
+        # Assert
+        assert result == {"active": True}
+        mock_introspect_token.assert_awaited_once_with("opaque-token")
+
+    @patch('middlewares.token_middleware.read_cache_token_async', new_callable=AsyncMock)
+    @patch('middlewares.token_middleware.introspect_token_async', new_callable=AsyncMock)
+    @patch('middlewares.token_middleware.write_cache_token_async', new_callable=AsyncMock)
+    async def test_get_token_info_async_from_cache(self, mock_write_cache_token, mock_introspect_token,
+                                                   mock_read_cache_token):
+        # Arrange
+        token = "test-token"
+        mock_read_cache_token.return_value = {"active": True}
+
+        # Act
+        result = await get_token_info_async(token)
+
+        # Assert
+        assert result == {"active": True}
+        mock_read_cache_token.assert_awaited_once_with(token)
+        mock_introspect_token.assert_not_called()
+        mock_write_cache_token.assert_not_called()
+
+    @patch('middlewares.token_middleware.read_cache_token_async', new_callable=AsyncMock)
+    @patch('middlewares.token_middleware.introspect_token_async', new_callable=AsyncMock)
+    @patch('middlewares.token_middleware.prepare_cache_token')
+    @patch('middlewares.token_middleware.write_cache_token_async', new_callable=AsyncMock)
+    async def test_get_token_info_async_from_introspection(self, mock_write_cache_token, mock_prepare_cache_token,
+                                                           mock_introspect_token, mock_read_cache_token):
+        # Arrange
+        token = "test-token"
+        mock_read_cache_token.return_value = None
+        mock_introspect_token.return_value = {"active": True}
+        mock_prepare_cache_token.return_value = {"active": True, "cached_time": 1234567890}
+
+        # Act
+        result = await get_token_info_async(token)
+
+        # Assert
+        assert result == {"active": True}
+        mock_introspect_token.assert_awaited_once_with(token)
+        mock_prepare_cache_token.assert_called_once_with({"active": True})
+        mock_write_cache_token.assert_awaited_once_with(token, {"active": True, "cached_time": 1234567890})
+
+    @patch('middlewares.token_middleware.read_cache_token_async', new_callable=AsyncMock)
+    @patch('middlewares.token_middleware.verify_token_async')
+    @patch('middlewares.token_middleware.write_cache_token_async', new_callable=AsyncMock)
+    async def test_get_token_info_async_coalesces_concurrent_misses(self, mock_write_cache_token,
+                                                                   mock_verify_token, mock_read_cache_token):
+        # Arrange
+        mock_read_cache_token.return_value = None
+
+        async def slow_verify(token):
+            await asyncio.sleep(0.01)
+            return {"active": True}
+
+        mock_verify_token.side_effect = slow_verify
+        coalesced_before = token_flight.coalesced
+
+        # Act
+        results = await asyncio.gather(*(get_token_info_async("test-token") for _ in range(5)))
+
+        # Assert
+        assert all(result["active"] is True for result in results)
+        mock_verify_token.assert_called_once_with("test-token")
+        mock_write_cache_token.assert_awaited_once()
+        assert token_flight.coalesced - coalesced_before == 4
+
+    @patch('middlewares.token_middleware.TOKEN_LOCK_TTL_MS', 1000)
+    @patch('middlewares.token_middleware.r_async')
+    @patch('middlewares.token_middleware.fetch_token_info_async', new_callable=AsyncMock)
+    async def test_fetch_token_info_locked_async_acquires_lock(self, mock_fetch_token_info, mock_redis):
+        # Arrange
+        mock_redis.set = AsyncMock(return_value=True)
+        mock_redis.delete = AsyncMock()
+        mock_fetch_token_info.return_value = {"active": True}
+
+        # Act
+        result = await fetch_token_info_locked_async("test-token")
+
+        # Assert
+        assert result == {"active": True}
+        mock_redis.set.assert_awaited_once_with("lock:test-token", "1", nx=True, px=1000)
+        mock_redis.delete.assert_awaited_once_with("lock:test-token")
+
+    @patch('middlewares.token_middleware.TOKEN_LOCK_TTL_MS', 1000)
+    @patch('middlewares.token_middleware.TOKEN_LOCK_POLL_INTERVAL_MS', 1)
+    @patch('middlewares.token_middleware.r_async')
+    @patch('middlewares.token_middleware.fetch_token_info_async', new_callable=AsyncMock)
+    async def test_fetch_token_info_locked_async_waits_for_other_worker(self, mock_fetch_token_info, mock_redis):
+        # Arrange
+        mock_redis.set = AsyncMock(return_value=None)
+        mock_redis.get = AsyncMock(side_effect=[None, encode_cache_value({"active": True, "exp": int(time.time()) + 60})])
+        mock_redis.exists = AsyncMock(return_value=1)
+        coalesced_before = token_lock_stats["coalesced"]
+
+        # Act
+        result = await fetch_token_info_locked_async("test-token")
+
+        # Assert
+        assert result["active"] is True
+        mock_fetch_token_info.assert_not_called()
+        assert token_lock_stats["coalesced"] - coalesced_before == 1
+        assert "test-token" in token_l1_cache
+
+    @patch('middlewares.token_middleware.TOKEN_LOCK_TTL_MS', 1000)
+    @patch('middlewares.token_middleware.TOKEN_LOCK_POLL_INTERVAL_MS', 1)
+    @patch('middlewares.token_middleware.r_async')
+    @patch('middlewares.token_middleware.fetch_token_info_async', new_callable=AsyncMock)
+    async def test_fetch_token_info_locked_async_lock_released_without_result(self, mock_fetch_token_info,
+                                                                             mock_redis):
+        # Arrange
+        mock_redis.set = AsyncMock(return_value=None)
+        mock_redis.get = AsyncMock(return_value=None)
+        mock_redis.exists = AsyncMock(return_value=0)
+        mock_fetch_token_info.return_value = {"active": True}
+
+        # Act
+        result = await fetch_token_info_locked_async("test-token")
+
+        # Assert
+        assert result == {"active": True}
+        mock_fetch_token_info.assert_awaited_once_with("test-token")
+
+    @patch('middlewares.token_middleware.check_headers_token')
+    @patch('middlewares.token_middleware.extract_token')
+    @patch('middlewares.token_middleware.delete_cache_token_async', new_callable=AsyncMock)
+    @patch('middlewares.token_middleware.fetch_token_info_async', new_callable=AsyncMock)
+    @patch('middlewares.token_middleware.check_token')
+    @patch('middlewares.token_middleware.generate_state_info')
+    @patch('middlewares.token_middleware.store_token_info_in_state')
+    async def test_refresh_cache_token_async(self, mock_store_token_info_in_state, mock_generate_state_info,
+                                             mock_check_token, mock_get_token_info, mock_delete_cache_token,
+                                             mock_extract_token, mock_check_headers_token):
+        # Arrange
+        mock_request = MagicMock()
+        mock_extract_token.return_value = "test-token"
+        mock_get_token_info.return_value = {"active": True}
+        mock_generate_state_info.return_value = {"user_uuid": "user-123"}
+
+        # Act
+        await refresh_cache_token_async(mock_request)
+
+        # Assert
+        mock_delete_cache_token.assert_not_called()
+        mock_get_token_info.assert_awaited_once_with("test-token")
+        mock_check_token.assert_called_once_with({"active": True})
+        mock_store_token_info_in_state.assert_called_once_with({"user_uuid": "user-123"}, mock_request)
@@ -0,0 +1,105 @@
+import tests.env_setup
+import pytest
+from unittest.mock import patch
+
+from utils.ttl_cache import TTLCache
+
+
+class TestTTLCache:
+    def test_get_hit_and_miss(self):
+        # Arrange
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("key", "value")
+
+        # Act
+        hit = cache.get("key")
+        miss = cache.get("other")
+
+        # Assert
+        assert hit == "value"
+        assert miss is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_lru_eviction(self):
+        # Arrange
+        cache = TTLCache(maxsize=2, ttl=60)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+
+        # Act
+        cache.set("c", 3)
+
+        # Assert
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert cache.stats()["evictions"] == 1
+
+    @patch('utils.ttl_cache.time')
+    def test_entry_expires(self, mock_time):
+        # Arrange
+        cache = TTLCache(maxsize=10, ttl=60)
+        mock_time.monotonic.return_value = 1000.0
+        cache.set("key", "value")
+
+        # Act
+        mock_time.monotonic.return_value = 1061.0
+        result = cache.get("key")
+
+        # Assert
+        assert result is None
+        assert len(cache) == 0
+        assert cache.stats()["expirations"] == 1
+
+    @patch('utils.ttl_cache.time')
+    def test_entry_ttl_capped_by_default_ttl(self, mock_time):
+        # Arrange
+        cache = TTLCache(maxsize=10, ttl=60)
+        mock_time.monotonic.return_value = 1000.0
+        cache.set("short", "value", ttl=5)
+        cache.set("long", "value", ttl=3600)
+
+        # Act
+        mock_time.monotonic.return_value = 1010.0
+        short = cache.get("short")
+        long = cache.get("long")
+
+        # Assert
+        assert short is None
+        assert long == "value"
+        assert cache.entries["long"][1] == 1060.0
+
+    def test_set_with_non_positive_ttl_is_ignored(self):
+        # Arrange
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("key", "old")
+
+        # Act
+        cache.set("key", "value", ttl=-1)
+
+        # Assert
+        assert "key" not in cache
+
+    def test_disabled_cache(self):
+        # Arrange
+        cache = TTLCache(maxsize=0, ttl=60)
+
+        # Act
+        cache.set("key", "value")
+
+        # Assert
+        assert cache.get("key") is None
+
+    def test_delete(self):
+        # Arrange
+        cache = TTLCache(maxsize=10, ttl=60)
+        cache.set("key", "value")
+
+        # Act
+        cache.delete("key")
+        cache.delete("missing")
+
+        # Assert
+        assert "key" not in cache
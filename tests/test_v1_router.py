@@ -1,6 +1,7 @@
 import tests.env_setup
+import json
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
@@ -19,8 +20,22 @@ def client(app):
     return TestClient(app)
 
 
+@pytest.fixture
+def entity_client(client):
+    app = client.app
+
+    @app.middleware("http")
+    async def add_test_state(request, call_next):
+        request.state.entity_uuid = "test-entity"
+        request.state.licence_uuid = "test-license"
+        response = await call_next(request)
+        return response
+
+    return client
+
+
 class TestV1Router:
-    @patch('routers.v1.get_secret')
+    @patch('routers.v1.get_secret_async', new_callable=AsyncMock)
     def test_read_secret(self, mock_get_secret, client):
         # Arrange
         mock_get_secret.return_value = {"username": "test_user", "password": "test_password"}
@@ -41,9 +56,9 @@ class TestV1Router:
         # Assert
         assert response.status_code == 200
         assert response.json() == {"username": "test_user", "password": "test_password"}
-        mock_get_secret.assert_called_once_with("test-entity", "test-license", "test-service")
+        mock_get_secret.assert_awaited_once_with("test-entity", "test-license", "test-service")
 
-    @patch('routers.v1.create_secret')
+    @patch('routers.v1.create_secret_async', new_callable=AsyncMock)
     def test_create_new_secret(self, mock_create_secret, client):
         # Arrange
         mock_create_secret.return_value = {"message": "Secret recorded successfully"}
@@ -67,6 +82,211 @@ class TestV1Router:
         # Assert
         assert response.status_code == 200
         assert response.json() == {"message": "Secret recorded successfully"}
-        mock_create_secret.assert_called_once_with(
+        mock_create_secret.assert_awaited_once_with(
             "test-entity", "test-license", "test-service", secret_data
         )
+
+    @patch('routers.v1.get_secrets_async', new_callable=AsyncMock)
+    def test_read_secrets(self, mock_get_secrets, client):
+        # Arrange
+        mock_get_secrets.return_value = {
+            "data": {"service-a": {"password": "a"}},
+            "errors": {"service-b": {"status_code": 404, "detail": "Secret not found"}}
+        }
+        app = client.app
+
+        @app.middleware("http")
+        async def add_test_state(request, call_next):
+            request.state.entity_uuid = "test-entity"
+            request.state.licence_uuid = "test-license"
+            response = await call_next(request)
+            return response
+
+        # Act
+        response = client.post("/credential/v1/batch", json={"services": ["service-a", "service-b"]})
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == mock_get_secrets.return_value
+        mock_get_secrets.assert_awaited_once_with("test-entity", "test-license", ["service-a", "service-b"])
+
+    @patch('routers.v1.SECRET_BATCH_MAX_SIZE', 2)
+    @patch('routers.v1.get_secrets_async', new_callable=AsyncMock)
+    def test_read_secrets_too_many_services(self, mock_get_secrets, client):
+        # Arrange
+        app = client.app
+
+        @app.middleware("http")
+        async def add_test_state(request, call_next):
+            request.state.entity_uuid = "test-entity"
+            request.state.licence_uuid = "test-license"
+            response = await call_next(request)
+            return response
+
+        # Act
+        response = client.post("/credential/v1/batch", json={"services": ["a", "b", "c"]})
+
+        # Assert
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Too many services, maximum is 2"}
+        mock_get_secrets.assert_not_called()
+
+    @pytest.mark.parametrize("service", ["../../../VICTIM/licenses/VL/db", "..", "a/b"])
+    @patch('routers.v1.get_secrets_async', new_callable=AsyncMock)
+    def test_read_secrets_rejects_path_traversal(self, mock_get_secrets, entity_client, service):
+        # Act
+        response = entity_client.post("/credential/v1/batch", json={"services": ["service-a", service]})
+
+        # Assert
+        assert response.status_code == 422
+        mock_get_secrets.assert_not_called()
+
+    def test_read_secrets_empty_list(self, client):
+        # Act
+        response = client.post("/credential/v1/batch", json={"services": []})
+
+        # Assert
+        assert response.status_code == 422
+
+    @patch('routers.v1.create_secrets_async', new_callable=AsyncMock)
+    def test_create_new_secrets(self, mock_create_secrets, entity_client):
+        # Arrange
+        mock_create_secrets.return_value = [
+            {"service": "service-a", "status_code": 200, "detail": "Secret recorded successfully"},
+            {"service": "service-b", "status_code": 500, "detail": "Vault error"}
+        ]
+
+        # Act
+        response = entity_client.post(
+            "/credential/v1/batch/test-license",
+            json={"secrets": [
+                {"service": "service-a", "data": {"password": "a"}},
+                {"service": "service-b", "data": {"password": "b"}}
+            ]}
+        )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == {"results": mock_create_secrets.return_value}
+        mock_create_secrets.assert_awaited_once_with(
+            "test-entity", "test-license", [("service-a", {"password": "a"}), ("service-b", {"password": "b"})]
+        )
+
+    @patch('routers.v1.create_secrets_async', new_callable=AsyncMock)
+    def test_create_new_secrets_invalid_payload(self, mock_create_secrets, entity_client):
+        # Act
+        response = entity_client.post(
+            "/credential/v1/batch/test-license",
+            json={"secrets": [
+                {"service": "service-a", "data": {"password": "a"}},
+                {"service": "service-b", "data": {"password": 12}}
+            ]}
+        )
+
+        # Assert
+        assert response.status_code == 422
+        mock_create_secrets.assert_not_called()
+
+    @patch('routers.v1.create_secrets_async', new_callable=AsyncMock)
+    def test_create_new_secrets_rejects_path_traversal(self, mock_create_secrets, entity_client):
+        # Act
+        response = entity_client.post(
+            "/credential/v1/batch/test-license",
+            json={"secrets": [
+                {"service": "service-a", "data": {"password": "a"}},
+                {"service": "../../../VICTIM/licenses/VL/db", "data": {"password": "pwned"}}
+            ]}
+        )
+
+        # Assert
+        assert response.status_code == 422
+        mock_create_secrets.assert_not_called()
+
+    @patch('routers.v1.create_secrets_async', new_callable=AsyncMock)
+    def test_create_new_secrets_duplicate_services(self, mock_create_secrets, entity_client):
+        # Act
+        response = entity_client.post(
+            "/credential/v1/batch/test-license",
+            json={"secrets": [
+                {"service": "service-a", "data": {"password": "a"}},
+                {"service": "service-a", "data": {"password": "b"}}
+            ]}
+        )
+
+        # Assert
+        assert response.status_code == 400
+        assert response.json() == {"detail": "Duplicate services: service-a"}
+        mock_create_secrets.assert_not_called()
+
+    @patch('routers.v1.create_secret_async', new_callable=AsyncMock)
+    def test_create_new_secret_not_shadowed_by_batch(self, mock_create_secret, entity_client):
+        # Arrange
+        mock_create_secret.return_value = {"message": "Secret recorded successfully"}
+
+        # Act
+        response = entity_client.post("/credential/v1/test-license/batch", json={"password": "a"})
+
+        # Assert
+        assert response.status_code == 200
+        mock_create_secret.assert_awaited_once_with("test-entity", "test-license", "batch", {"password": "a"})
+
+    def test_stream_new_secrets(self, entity_client):
+        # Arrange
+        async def fake_iter_create_secrets(entity_uuid, license_uuid, secrets):
+            for service, _ in reversed(secrets):
+                yield {"service": service, "status_code": 200, "detail": "Secret recorded successfully"}
+
+        body = "\n".join([
+            json.dumps({"service": "service-a", "data": {"password": "a"}}),
+            "",
+            json.dumps({"service": "service-b", "data": {"password": "b"}})
+        ])
+
+        # Act
+        with patch('routers.v1.iter_create_secrets_async', side_effect=fake_iter_create_secrets) as mock_iter:
+            response = entity_client.post(
+                "/credential/v1/batch/test-license/stream",
+                content=body,
+                headers={"Content-Type": "application/x-ndjson"}
+            )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["service"] for line in lines] == ["service-b", "service-a"]
+        mock_iter.assert_called_once_with(
+            "test-entity", "test-license", [("service-a", {"password": "a"}), ("service-b", {"password": "b"})]
+        )
+
+    def test_stream_new_secrets_invalid_line(self, entity_client):
+        # Arrange
+        body = "\n".join([
+            json.dumps({"service": "service-a", "data": {"password": "a"}}),
+            "not json"
+        ])
+
+        # Act
+        with patch('routers.v1.iter_create_secrets_async') as mock_iter:
+            response = entity_client.post("/credential/v1/batch/test-license/stream", content=body)
+
+        # Assert
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["line"] == 2
+        mock_iter.assert_not_called()
+
+    def test_stream_new_secrets_rejects_path_traversal(self, entity_client):
+        # Arrange
+        body = "\n".join([
+            json.dumps({"service": "service-a", "data": {"password": "a"}}),
+            json.dumps({"service": "../../../VICTIM/licenses/VL/db", "data": {"password": "pwned"}})
+        ])
+
+        # Act
+        with patch('routers.v1.iter_create_secrets_async') as mock_iter:
+            response = entity_client.post("/credential/v1/batch/test-license/stream", content=body)
+
+        # Assert
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["line"] == 2
+        mock_iter.assert_not_called()
@@ -0,0 +1,126 @@
+import tests.env_setup
+import threading
+import pytest
+from unittest.mock import patch, MagicMock
+from hvac.exceptions import Forbidden
+
+from services.vault_service import VaultClientManager, create_vault_session, get_vault_token, \
+    run_in_vault_executor, close_vault_client
+
+
+@pytest.fixture
+def manager():
+    manager = VaultClientManager(url="http://test-vault:8200", pool_size=4, token_ttl=300)
+    yield manager
+    manager.close()
+
+
+class TestVaultService:
+    def test_get_vault_token_from_redis(self, mock_redis):
+        # Arrange
+        mock_redis.get.return_value = "redis-token"
+
+        # Act
+        with patch('services.vault_service.r', mock_redis):
+            result = get_vault_token()
+
+        # Assert
+        assert result == "redis-token"
+        mock_redis.set.assert_not_called()
+
+    def test_get_vault_token_from_config(self, mock_redis):
+        # Arrange
+        mock_redis.get.return_value = None
+
+        # Act
+        with patch('services.vault_service.r', mock_redis):
+            result = get_vault_token()
+
+        # Assert
+        assert result == "test-token"
+        mock_redis.set.assert_called_once_with("VAULT_TOKEN", "test-token")
+
+    def test_create_vault_session_pool_size(self):
+        # Act
+        session = create_vault_session(4)
+
+        # Assert
+        adapter = session.get_adapter("https://test-vault")
+        assert adapter._pool_maxsize == 4
+        assert session.get_adapter("http://test-vault") is adapter
+
+    @patch('services.vault_service.get_vault_token')
+    def test_get_client_is_reused(self, mock_get_vault_token, manager):
+        # Arrange
+        mock_get_vault_token.return_value = "vault-token"
+
+        # Act
+        first = manager.get_client()
+        second = manager.get_client()
+
+        # Assert
+        assert first is second
+        assert first.token == "vault-token"
+        mock_get_vault_token.assert_called_once()
+
+    @patch('services.vault_service.time')
+    @patch('services.vault_service.get_vault_token')
+    def test_get_client_reloads_expired_token(self, mock_get_vault_token, mock_time, manager):
+        # Arrange
+        mock_get_vault_token.side_effect = ["old-token", "new-token"]
+        mock_time.monotonic.return_value = 1000.0
+        manager.get_client()
+
+        # Act
+        mock_time.monotonic.return_value = 1300.0
+        client = manager.get_client()
+
+        # Assert
+        assert client.token == "new-token"
+
+    @patch('services.vault_service.get_vault_token')
+    def test_call_retries_once_on_auth_failure(self, mock_get_vault_token, manager):
+        # Arrange
+        mock_get_vault_token.side_effect = ["old-token", "new-token"]
+        func = MagicMock(side_effect=[Forbidden("permission denied"), "secret"])
+
+        # Act
+        result = manager.call(func)
+
+        # Assert
+        assert result == "secret"
+        assert func.call_count == 2
+        assert manager.client.token == "new-token"
+
+    @patch('services.vault_service.get_vault_token')
+    def test_call_raises_when_retry_fails(self, mock_get_vault_token, manager):
+        # Arrange
+        mock_get_vault_token.return_value = "token"
+        func = MagicMock(side_effect=Forbidden("permission denied"))
+
+        # Act & Assert
+        with pytest.raises(Forbidden):
+            manager.call(func)
+
+        assert func.call_count == 2
+
+
+@pytest.mark.asyncio
+class TestVaultExecutor:
+    async def test_run_in_vault_executor_uses_worker_thread(self):
+        # Act
+        thread_name = await run_in_vault_executor(lambda: threading.current_thread().name)
+
+        # Assert
+        assert thread_name.startswith("vault")
+        close_vault_client()
+
+    async def test_run_in_vault_executor_propagates_exceptions(self):
+        # Arrange
+        def fail(message):
+            raise ValueError(message)
+
+        # Act & Assert
+        with pytest.raises(ValueError, match="boom"):
+            await run_in_vault_executor(fail, "boom")
+        close_vault_client()
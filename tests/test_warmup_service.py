@@ -0,0 +1,182 @@
+import tests.env_setup
+import asyncio
+import time
+import pytest
+from unittest.mock import patch, AsyncMock
+from fastapi.testclient import TestClient
+
+import main
+import services.warmup_service as warmup_service
+from config.config import KEYCLOAK_HOST, URL_API_GATEWAY
+from middlewares import licence_middleware, token_middleware
+from services import http_service
+from services.vault_service import vault_client_manager
+from services.warmup_service import run_warmup, is_ready, save_hot_keys, preload_hot_keys, start_warmup, \
+    stop_warmup, warmup_status
+from tests.fakes import FakeAsyncRedis, KeycloakStub, LicenceGatewayStub, VaultStub, build_http_client
+
+
+@pytest.fixture(autouse=True)
+def reset_warmup_status():
+    warmup_status.clear()
+    yield
+    warmup_status.clear()
+
+
+@pytest.fixture
+def redis():
+    redis = FakeAsyncRedis()
+    with patch('services.warmup_service.get_redis_async_api_db', return_value=redis), \
+         patch.object(token_middleware, "r_async", redis), \
+         patch.object(licence_middleware, "r_async", redis):
+        yield redis
+
+
+@pytest.fixture
+def stand_ins(redis):
+    keycloak = KeycloakStub(realm="test-realm")
+    gateway = LicenceGatewayStub()
+    vault = VaultStub(mount="test-path")
+    http_client = build_http_client({KEYCLOAK_HOST: keycloak.app, URL_API_GATEWAY: gateway.app})
+    with patch.object(http_service, "http_client", http_client), \
+         patch.object(vault_client_manager, "get_client", return_value=vault.client()):
+        yield keycloak, vault, redis
+
+
+def build_token_info(subject: str) -> dict:
+    return {"sub": subject, "aud": "karned", "iat": int(time.time()) - 60, "exp": int(time.time()) + 3600}
+
+
+def build_cache_licences() -> dict:
+    licence = {"uuid": "licence-0", "entity_uuid": "entity-0", "exp": int(time.time()) + 3600}
+    return licence_middleware.prepare_cache_licences([licence])
+
+
+@pytest.mark.asyncio
+class TestWarmupService:
+    async def test_run_warmup_opens_every_pool(self, stand_ins):
+        # Arrange
+        keycloak, vault, redis = stand_ins
+
+        # Act
+        await run_warmup()
+
+        # Assert
+        assert is_ready()
+        assert warmup_status == {"redis": "ok", "vault": "ok", "keycloak": "ok", "gateway": "ok"}
+        assert redis.commands["ping"] == warmup_service.WARMUP_REDIS_CONNECTIONS
+        assert vault.health_checks == warmup_service.WARMUP_VAULT_CONNECTIONS
+        assert keycloak.discovery_requests == warmup_service.WARMUP_HTTP_CONNECTIONS
+
+    async def test_failed_step_is_retried_until_it_succeeds(self, stand_ins):
+        # Arrange
+        warm_gateway = AsyncMock(side_effect=[ConnectionError("refused"), None])
+
+        with patch.object(warmup_service, "warm_gateway", warm_gateway), \
+             patch.object(warmup_service, "WARMUP_RETRY_INTERVAL", 0):
+            # Act
+            await run_warmup()
+
+        # Assert
+        assert is_ready()
+        assert warm_gateway.await_count == 2
+
+    async def test_step_timeout_keeps_service_not_ready(self, stand_ins):
+        # Arrange
+        async def hang():
+            await asyncio.sleep(10)
+
+        with patch.object(warmup_service, "warm_vault", hang), \
+             patch.object(warmup_service, "WARMUP_TIMEOUT", 0.01):
+            # Act
+            start_warmup()
+            await asyncio.sleep(0.05)
+
+            # Assert
+            assert not is_ready()
+            assert warmup_status["redis"] == "ok"
+            assert warmup_status["vault"].startswith("TimeoutError")
+            await stop_warmup()
+
+    async def test_start_warmup_is_pending_before_first_step(self, stand_ins):
+        # Act
+        start_warmup()
+
+        # Assert
+        assert not is_ready()
+        assert set(warmup_status.values()) == {"pending"}
+        await stop_warmup()
+
+    async def test_start_warmup_disabled(self):
+        # Arrange
+        with patch.object(warmup_service, "WARMUP_ENABLED", False):
+            # Act
+            start_warmup()
+
+        # Assert
+        assert warmup_service.warmup_task is None
+        assert is_ready()
+
+    async def test_hot_keys_are_saved_and_preloaded(self, redis):
+        # Arrange
+        await token_middleware.write_cache_token_async("token-1", build_token_info("user-1"))
+        await licence_middleware.write_cache_licences_async("user-1", build_cache_licences())
+
+        with patch.object(warmup_service, "WARMUP_PRELOAD_ENABLED", True):
+            await save_hot_keys()
+            token_middleware.token_l1_cache.clear()
+            licence_middleware.licence_l1_cache.clear()
+
+            # Act
+            await preload_hot_keys()
+
+        # Assert
+        assert "token-1" in token_middleware.token_l1_cache
+        assert "user-1" in licence_middleware.licence_l1_cache
+
+    async def test_save_hot_keys_disabled(self, redis):
+        # Arrange
+        token_middleware.write_l1_cache_token("token-1", build_token_info("user-1"))
+
+        # Act
+        await save_hot_keys()
+
+        # Assert
+        assert warmup_service.HOT_KEYS_CACHE_KEY not in redis.values
+
+    async def test_preload_without_saved_keys(self, redis):
+        # Arrange
+        redis.store.flushdb()
+
+        # Act
+        await preload_hot_keys()
+
+        # Assert
+        assert len(token_middleware.token_l1_cache) == 0
+
+
+class TestReadinessRouter:
+    def test_ready(self):
+        # Arrange
+        warmup_status.update({"redis": "ok", "vault": "ok"})
+        client = TestClient(main.app)
+
+        # Act
+        response = client.get("/ready")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json() == {"status": "ready", "checks": {"redis": "ok", "vault": "ok"}}
+
+    def test_warming(self):
+        # Arrange
+        warmup_status.update({"redis": "ok", "vault": "pending"})
+        client = TestClient(main.app)
+
+        # Act
+        response = client.get("/ready")
+
+        # Assert
+        assert response.status_code == 503
+        assert response.json()["status"] == "warming"
+        assert response.json()["checks"]["vault"] == "pending"
@@ -0,0 +1,56 @@
+import ast
+import json
+from typing import Any, Callable
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is listed in requirements.txt
+    orjson = None
+
+# Every payload starts with a single version character so the decoder can pick the right codec and
+# entries written by an older release stay readable. Legacy entries are the repr() of a dict and
+# therefore start with "{".
+JSON_CODEC_VERSION = "\x01"
+
+codecs: dict[str, tuple[Callable[[Any], str], Callable[[str], Any]]] = {}
+
+
+def register_codec( version: str, encode: Callable[[Any], str], decode: Callable[[str], Any] ) -> None:
+    if len(version) != 1 or version == "{":
+        raise ValueError("Codec version must be a single character other than '{'")
+    codecs[version] = (encode, decode)
+
+
+def encode_json( value: Any ) -> str:
+    if orjson is not None:
+        return orjson.dumps(value).decode()
+    return json.dumps(value, separators=(",", ":"))
+
+
+def decode_json( payload: str ) -> Any:
+    if orjson is not None:
+        return orjson.loads(payload)
+    return json.loads(payload)
+
+
+register_codec(JSON_CODEC_VERSION, encode_json, decode_json)
+
+current_codec_version = JSON_CODEC_VERSION
+
+
+def encode_cache_value( value: Any ) -> str:
+    encode, _ = codecs[current_codec_version]
+    return current_codec_version + encode(value)
+
+
+def is_legacy_cache_value( payload: str ) -> bool:
+    return payload[:1] not in codecs
+
+
+def decode_cache_value( payload: str ) -> Any:
+    codec = codecs.get(payload[:1])
+    if codec is not None:
+        _, decode = codec
+        return decode(payload[1:])
+    # Legacy repr() payload: literal_eval only accepts Python literals, unlike the eval() it replaces.
+    return ast.literal_eval(payload)
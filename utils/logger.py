@@ -0,0 +1,54 @@
+import json
+import logging
+
+from config.config import LOG_LEVEL, LOG_LEVELS, LOG_FORMAT
+
+# Call sites pass their values as %-style arguments (logger.debug("cache_token: %s", cache_token)) or as
+# extra={"fields": {...}}: logging checks the level before building the record, so nothing is formatted
+# unless the message is actually emitted.
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, the record "fields" and the exception if any."""
+
+    def format( self, record: logging.LogRecord ) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage()
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """logging.BASIC_FORMAT followed by the record "fields" as key=value pairs."""
+
+    def __init__( self ):
+        super().__init__(logging.BASIC_FORMAT)
+
+    def format( self, record: logging.LogRecord ) -> str:
+        message = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            message += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return message
+
+
+def get_logger( name: str ) -> logging.Logger:
+    return logging.getLogger(name)
+
+
+def configure_logging() -> None:
+    handler = logging.StreamHandler()
+    handler.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+    for name, level in LOG_LEVELS.items():
+        logging.getLogger(name).setLevel(level)
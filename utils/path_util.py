@@ -1,8 +1,75 @@
+import re
+from typing import Iterable
+
+from starlette.types import Scope
+
 from config.config import UNPROTECTED_PATHS, UNLICENSED_PATHS
 
+PATH_ACCESS_SCOPE_KEY = "path_access"
+
+
+def translate_rule( rule: str ) -> str:
+    """Regex for a wildcard rule: a trailing * matches any rest of the path (prefix rule), any other * stays
+    within one path segment and ? matches one character other than "/"."""
+    prefix = rule.endswith("*")
+    if prefix:
+        rule = rule[:-1]
+    pattern = "".join(
+        "[^/]*" if char == "*" else "[^/]" if char == "?" else re.escape(char)
+        for char in rule
+    )
+    return pattern + ".*" if prefix else pattern
+
+
+class PathMatcher:
+    """Case-insensitive path rules compiled once: exact paths go to a frozenset, wildcard rules
+    ("/docs/*", "/credential/v?/health") to a single alternation regex."""
+
+    def __init__( self, rules: Iterable[str] ):
+        exact = set()
+        patterns = []
+        for rule in rules:
+            rule = rule.lower()
+            if "*" in rule or "?" in rule:
+                patterns.append(translate_rule(rule))
+            else:
+                exact.add(rule)
+        self.exact = frozenset(exact)
+        self.pattern = re.compile("|".join(f"(?:{pattern})" for pattern in patterns)) if patterns else None
+
+    def matches( self, path: str ) -> bool:
+        path = path.lower()
+        if path in self.exact:
+            return True
+        return self.pattern is not None and self.pattern.fullmatch(path) is not None
+
+
+unprotected_paths = PathMatcher(UNPROTECTED_PATHS)
+unlicensed_paths = PathMatcher(UNLICENSED_PATHS)
+
 
 def is_unprotected_path( path: str ) -> bool:
-    return path.lower() in UNPROTECTED_PATHS
+    return unprotected_paths.matches(path)
 
 def is_unlicensed_path( path: str ) -> bool:
-    return path.lower() in UNLICENSED_PATHS
\ No newline at end of file
+    return unlicensed_paths.matches(path)
+
+
+def is_path_segment( value: str ) -> bool:
+    """True for a name that stays one segment once joined into a path: no "/" and not "." or ".."."""
+    return bool(value) and "/" not in value and value not in (".", "..")
+
+
+def classify_request( scope: Scope ) -> tuple[bool, bool]:
+    """(unprotected, unlicensed) for the request path, computed once per request and kept on the scope."""
+    path_access = scope.get(PATH_ACCESS_SCOPE_KEY)
+    if path_access is None:
+        path = scope["path"]
+        path_access = scope[PATH_ACCESS_SCOPE_KEY] = (is_unprotected_path(path), is_unlicensed_path(path))
+    return path_access
+
+def is_unprotected_request( scope: Scope ) -> bool:
+    return classify_request(scope)[0]
+
+def is_unlicensed_request( scope: Scope ) -> bool:
+    return classify_request(scope)[1]
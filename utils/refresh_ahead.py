@@ -0,0 +1,131 @@
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable
+
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RefreshAhead:
+    """Refresh hot cache entries in the background shortly before they expire.
+
+    Readers call track() with the entry expiry (epoch seconds) and whatever refresh() needs. A key becomes
+    hot after min_hits reads without a gap longer than hot_ttl; every interval seconds the hot keys expiring
+    within window (plus a per-entry random jitter) are refreshed, at most concurrency at a time. refresh()
+    returns the new expiry; a refresh that does not push the expiry further is not retried for that expiry.
+    """
+
+    def __init__(
+            self,
+            refresh: Callable[[Hashable, Any], Awaitable[float]],
+            window: float,
+            interval: float,
+            jitter: float,
+            concurrency: int,
+            min_hits: int,
+            hot_ttl: float,
+            maxsize: int
+    ):
+        self.refresh = refresh
+        self.window = window
+        self.interval = interval
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.min_hits = min_hits
+        self.hot_ttl = hot_ttl
+        self.maxsize = maxsize
+        self.entries: OrderedDict[Hashable, dict] = OrderedDict()
+        self.refreshing: dict[Hashable, asyncio.Task] = {}
+        self.semaphore: asyncio.Semaphore | None = None
+        self.task: asyncio.Task | None = None
+        self.refreshed = 0
+        self.failed = 0
+
+    def track( self, key: Hashable, expires_at: float, context: Any = None ) -> None:
+        if self.maxsize <= 0:
+            return
+        now = time.time()
+        entry = self.entries.get(key)
+        if entry is None or now - entry["last_seen"] > self.hot_ttl:
+            entry = {"hits": 0, "expires_at": None, "stalled_at": None}
+            self.entries[key] = entry
+        if entry["expires_at"] != expires_at:
+            entry["jitter"] = random.uniform(0, self.jitter)
+        entry["hits"] += 1
+        entry["last_seen"] = now
+        entry["expires_at"] = expires_at
+        entry["context"] = context
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def is_due( self, entry: dict, now: float ) -> bool:
+        return (
+            entry["hits"] >= self.min_hits
+            and entry["expires_at"] != entry["stalled_at"]
+            and entry["expires_at"] - now <= self.window + entry["jitter"]
+        )
+
+    def due_keys( self, now: float ) -> list:
+        due = []
+        for key, entry in list(self.entries.items()):
+            if now - entry["last_seen"] > self.hot_ttl or entry["expires_at"] <= now:
+                # Cold or already expired: the next reader takes the regular path and tracks it again.
+                del self.entries[key]
+            elif key not in self.refreshing and self.is_due(entry, now):
+                due.append(key)
+        return due
+
+    async def refresh_key( self, key: Hashable, entry: dict ) -> None:
+        async with self.semaphore:
+            try:
+                expires_at = await self.refresh(key, entry["context"])
+            except Exception as e:
+                self.failed += 1
+                logger.warning("Refresh ahead failed for %s: %s", key, e)
+                self.entries.pop(key, None)
+                return
+        self.refreshed += 1
+        if expires_at is None or expires_at <= entry["expires_at"]:
+            entry["stalled_at"] = entry["expires_at"]
+        else:
+            entry["expires_at"] = expires_at
+            entry["jitter"] = random.uniform(0, self.jitter)
+
+    def run_once( self ) -> None:
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+        for key in self.due_keys(time.time()):
+            task = asyncio.ensure_future(self.refresh_key(key, self.entries[key]))
+            self.refreshing[key] = task
+            task.add_done_callback(lambda done, key=key: self.refreshing.pop(key, None))
+
+    async def run( self ) -> None:
+        while True:
+            self.run_once()
+            await asyncio.sleep(self.interval)
+
+    def start( self ) -> None:
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+
+    async def stop( self ) -> None:
+        tasks = list(self.refreshing.values())
+        if self.task is not None:
+            tasks.append(self.task)
+            self.task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.semaphore = None
+
+    def stats( self ) -> dict:
+        return {
+            "tracked": len(self.entries),
+            "in_flight": len(self.refreshing),
+            "refreshed": self.refreshed,
+            "failed": self.failed
+        }
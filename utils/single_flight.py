@@ -0,0 +1,37 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers asking for the same key."""
+
+    def __init__( self ):
+        self.calls: dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do( self, key: Hashable, func: Callable[[], Awaitable[Any]] ) -> Any:
+        task = self.calls.get(key)
+        if task is None:
+            # The call runs in its own task so a caller going away does not cancel it for the others.
+            task = asyncio.ensure_future(func())
+            self.calls[key] = task
+            task.add_done_callback(lambda done: self.forget(key, done))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def forget( self, key: Hashable, task: asyncio.Task ) -> None:
+        if self.calls.get(key) is task:
+            del self.calls[key]
+        if not task.cancelled():
+            # Every waiter may have been cancelled; retrieve the exception so asyncio does not log it.
+            task.exception()
+
+    def stats( self ) -> dict:
+        return {
+            "in_flight": len(self.calls),
+            "executed": self.executed,
+            "coalesced": self.coalesced
+        }